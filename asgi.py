@@ -0,0 +1,6 @@
+# Needs the asgi extra: pip install jobbergate[asgi]
+from asgiref.wsgi import WsgiToAsgi
+
+from jobbergate import create_app
+
+app = WsgiToAsgi(create_app())
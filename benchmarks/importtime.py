@@ -0,0 +1,97 @@
+"""
+importtime
+==========
+
+Reports what starting jobbergate imports, and how long it takes, with
+``python -X importtime``. Every run is a fresh interpreter::
+
+    python benchmarks/importtime.py cli
+    python benchmarks/importtime.py web --top 30
+
+``cli`` creates the app like ``wrapper.sh`` does
+(:func:`jobbergate.create_cli_app`), ``web`` like uwsgi does
+(:func:`jobbergate.create_app`). ``run.py`` records the total times as
+``import_time/cli`` and ``import_time/web``."""
+
+import os
+import subprocess
+import sys
+
+import click
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.dirname(here)
+
+#: Code that starts jobbergate, by startup mode
+startups = {
+    "cli": "import jobbergate; jobbergate.create_cli_app()",
+    "web": "import jobbergate; jobbergate.create_app()",
+}
+
+
+def parse(output):
+    """Parses the output of ``-X importtime``.
+
+    :param str output: What the interpreter wrote to stderr
+    :returns: ``(module, self, cumulative, depth)`` for every import, with
+        the times in seconds and depth 0 for the imports of the startup code
+    :rtype: list[tuple]
+    """
+    imports = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self, cumulative, name = line.partition(":")[2].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(self) / 1e6, int(cumulative) / 1e6, depth))
+    return imports
+
+
+def importtime(startup, env=None):
+    """Starts jobbergate in a new interpreter with ``-X importtime``.
+
+    :param str startup: The startup mode, see :data:`startups`
+    :param dict env: (optional) Environment of the interpreter
+    :returns: the imports, see :func:`parse`
+    :rtype: list[tuple]
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", startups[startup]],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    return parse(result.stderr)
+
+
+def total(imports):
+    """Returns the time of all imports, in seconds.
+
+    :param list[tuple] imports: The imports, see :func:`parse`
+    :rtype: float
+    """
+    return sum(cumulative for _, _, cumulative, depth in imports if depth == 0)
+
+
+@click.command()
+@click.argument("startup", type=click.Choice(list(startups)), default="cli")
+@click.option("--top", help="Number of imports listed", default=20, show_default=True)
+def main(startup, top):
+    """Lists what jobbergate and its modules import directly, by cumulative
+    time."""
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    imports = importtime(startup, env)
+    toplevel = sorted(
+        (item for item in imports if item[3] == 1), key=lambda item: -item[2]
+    )
+    click.echo(f"{'module':<50}{'self [s]':>10}{'total [s]':>11}")
+    for name, self, cumulative, _ in toplevel[:top]:
+        click.echo(f"{name:<50}{self:>10.4f}{cumulative:>11.4f}")
+    click.echo(f"{len(imports)} modules imported in {total(imports):.4f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+"""
+measure
+=======
+
+Runs one benchmark in a fresh process and prints the timings, in seconds,
+or the allocated bytes as a JSON list. Started by ``run.py`` with ``JOBBERGATE_PATH`` pointing to a
+synthetic workspace::
+
+    python benchmarks/measure.py BENCHMARK APPLICATION REPEAT ANSWERFILE"""
+
+import json
+import sys
+import time
+from html.parser import HTMLParser
+
+
+class FormParser(HTMLParser):
+    """Collects the fields of a html form, with their values."""
+
+    def __init__(self):
+        super().__init__()
+        self.fields = []
+        self._select = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "input" and "name" in attrs:
+            self.fields.append((attrs["name"], attrs.get("type"), attrs.get("value")))
+        elif tag == "select":
+            self._select = attrs.get("name")
+        elif tag == "option" and self._select and attrs.get("value"):
+            self.fields.append((self._select, "select", attrs["value"]))
+            self._select = None
+
+    def handle_endtag(self, tag):
+        if tag == "select":
+            self._select = None
+
+
+def fill_form(html, answers):
+    """Answers all fields of a questionnaire form.
+
+    Fields of ``BooleanList`` sub forms are named ``<list>_trueform-<name>``,
+    so answers are looked up by the part after the last ``-``.
+
+    :param str html: The page with the form
+    :param dict answers: Answers by variable name
+    :rtype: dict
+    """
+    parser = FormParser()
+    parser.feed(html)
+    formdata = {}
+    for name, fieldtype, value in parser.fields:
+        answer = answers.get(name.rpartition("-")[2])
+        if fieldtype in ("hidden", "submit", "select"):
+            formdata[name] = value or ""
+        elif fieldtype == "checkbox":
+            if answer is None or answer:
+                formdata[name] = "y"
+        else:
+            formdata[name] = "1" if answer is None else str(answer)
+    return formdata
+
+
+def web(application, repeat, answers):
+    """Answers the whole questionnaire through the Flask test client.
+
+    :returns: the time of every request to the application
+    :rtype: list[float]
+    """
+    from jobbergate import create_app
+
+    client = create_app().test_client()
+    timings = []
+    for _ in range(repeat):
+        client.get("/")
+        client.post("/apps/", data={"application": application})
+        url = f"/app/{application}"
+        while True:
+            started = time.perf_counter()
+            page = client.get(url)
+            timings.append(time.perf_counter() - started)
+            formdata = fill_form(page.get_data(as_text=True), answers)
+            started = time.perf_counter()
+            response = client.post(url, data=formdata)
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 302:
+                break
+            url = response.headers["Location"]
+        if response.mimetype != "text/x-shellscript":
+            raise RuntimeError(f"{application} did not render: {response.status}")
+    return timings
+
+
+def render(application, repeat, answers):
+    """Renders the application from answers, like ``jobbergate batch``.
+
+    :returns: the time of every render
+    :rtype: list[float]
+    """
+    from jobbergate import create_app
+    from jobbergate.cli import render_answers
+
+    timings = []
+    with create_app().app_context():
+        for _ in range(repeat):
+            started = time.perf_counter()
+            render_answers(application, dict(answers))
+            timings.append(time.perf_counter() - started)
+    return timings
+
+
+def allocations(application, repeat, answers):
+    """Creates the questions and form of ``mainflow`` like a web request
+    does, with the form class already cached.
+
+    :returns: the peak memory allocated, in bytes, by every request
+    :rtype: list[int]
+    """
+    import tracemalloc
+
+    from jobbergate import create_app
+    from jobbergate.lib import read_config
+    from jobbergate.registry import registry
+    from jobbergate.views import form_generator
+
+    loaded = registry.get(application)
+    sizes = []
+    with create_app().test_request_context(f"/app/{application}"):
+        for _ in range(repeat + 1):
+            data = read_config(application)
+            tracemalloc.start()
+            form_generator(application, [], loaded.views.mainflow, data=data)
+            sizes.append(tracemalloc.get_traced_memory()[1])
+            tracemalloc.stop()
+    # The first request creates the form class
+    return sizes[1:]
+
+
+def app_factory(application, repeat, answers):
+    """Creates the commands of all applications.
+
+    :returns: the time of every scan
+    :rtype: list[float]
+    """
+    from jobbergate.cli import app_factory
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        app_factory()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def help_listing(application, repeat, answers):
+    """Lists all application commands with their help, like
+    ``flask --help``.
+
+    :returns: the time of every listing
+    :rtype: list[float]
+    """
+    import click
+
+    from jobbergate.catalog import Catalog
+    from jobbergate.cli import ApplicationGroup
+
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        group = ApplicationGroup("flask", applications=Catalog())
+        ctx = click.Context(group)
+        for name in group.list_commands(ctx):
+            group.get_command(ctx, name).get_short_help_str()
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+benchmarks = {
+    "web": web,
+    "render": render,
+    "allocations": allocations,
+    "app_factory": app_factory,
+    "help_listing": help_listing,
+}
+
+
+if __name__ == "__main__":
+    benchmark, application, repeat, answerfile = sys.argv[1:5]
+    with open(answerfile) as jsonfile:
+        answers = json.load(jsonfile)
+    json.dump(benchmarks[benchmark](application, int(repeat), answers), sys.stdout)
@@ -0,0 +1,292 @@
+"""
+run
+===
+
+Benchmarks the questionnaire pipeline with synthetic applications of
+growing size, and saves the results as JSON::
+
+    python benchmarks/run.py -o before.json
+    python benchmarks/run.py -o after.json --compare before.json
+
+Every benchmark runs in a fresh process, see ``measure.py``."""
+
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import click
+
+import importtime
+import synthetic
+
+here = os.path.dirname(os.path.abspath(__file__))
+root = os.path.dirname(here)
+
+#: Synthetic applications, with the sizes that are benchmarked
+suites = {
+    "questions": (synthetic.questions_app, (10, 100, 1000)),
+    "nested": (synthetic.nested_app, (2, 8, 24)),
+    "chain": (synthetic.chain_app, (1, 10, 50)),
+    "template": (synthetic.template_app, (100, 1000, 10000)),
+    "choices": (synthetic.choices_app, (10, 100, 1000)),
+}
+
+#: Number of applications in the apps directory for the scan benchmarks
+appcounts = (10, 100, 1000)
+
+
+def environment(workspace):
+    """Environment for jobbergate processes using `workspace`."""
+    env = dict(os.environ)
+    env.update(
+        {
+            "JOBBERGATE_PATH": workspace,
+            "FLASK_APP": "jobbergate:create_cli_app",
+            "APP_SETTINGS": "jobbergate.config.TestingConfig",
+            "PYTHONPATH": os.pathsep.join(
+                filter(None, [root, os.environ.get("PYTHONPATH")])
+            ),
+        }
+    )
+    return env
+
+
+def summary(timings, unit="s"):
+    """Summarizes timings in seconds, or other measurements.
+
+    :param list[float] timings: The timings
+    :param str unit: (optional) Unit of the measurements
+    :rtype: dict
+    """
+    return {
+        "unit": unit,
+        "count": len(timings),
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+        "max": max(timings),
+    }
+
+
+def measure(workspace, benchmark, application, repeat, answerfile):
+    """Runs ``measure.py`` in a new process.
+
+    :returns: the timings
+    :rtype: list[float]
+    """
+    result = subprocess.run(
+        [
+            sys.executable,
+            os.path.join(here, "measure.py"),
+            benchmark,
+            application,
+            str(repeat),
+            answerfile,
+        ],
+        env=environment(workspace),
+        cwd=workspace,
+        stdout=subprocess.PIPE,
+        check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def cold_start(workspace, arguments, repeat):
+    """Times complete cli runs, from starting the interpreter.
+
+    :param list[str] arguments: Arguments to ``flask``
+    :returns: the timings
+    :rtype: list[float]
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run(
+            [sys.executable, "-m", "flask"] + arguments,
+            env=environment(workspace),
+            cwd=workspace,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            check=True,
+        )
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def metadata(repeat):
+    """Describes where and on what the benchmarks ran."""
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            cwd=root,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            universal_newlines=True,
+        ).stdout.strip()
+    except OSError:
+        commit = ""
+    with open(os.path.join(root, "VERSION")) as versionfile:
+        version = versionfile.read().strip()
+    return {
+        "date": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "jobbergate": version,
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "repeat": repeat,
+    }
+
+
+def run_suite(workspace, suite, size, repeat, results):
+    """Benchmarks one synthetic application."""
+    generator, _ = suites[suite]
+    application = f"{suite}_{size}"
+    apps = synthetic.workspace(workspace)
+    answers = generator(apps, application, size)
+    answerfile = os.path.join(workspace, f"{application}.json")
+    with open(answerfile, "w") as jsonfile:
+        json.dump(answers, jsonfile)
+
+    click.echo(f"{application}: cli", err=True)
+    results[f"cli_cold_start/{application}"] = summary(
+        cold_start(
+            workspace,
+            [application, "-a", answerfile, os.path.join(workspace, "out.sh")],
+            repeat,
+        )
+    )
+    click.echo(f"{application}: web", err=True)
+    results[f"web_request/{application}"] = summary(
+        measure(workspace, "web", application, repeat, answerfile)
+    )
+    click.echo(f"{application}: render", err=True)
+    timings = measure(workspace, "render", application, repeat * 10, answerfile)
+    results[f"render/{application}"] = summary(timings)
+    results[f"render/{application}"]["per_second"] = len(timings) / sum(timings)
+    click.echo(f"{application}: allocations", err=True)
+    results[f"form_allocations/{application}"] = summary(
+        measure(workspace, "allocations", application, repeat, answerfile), "B"
+    )
+
+
+def run_scan(workspace, count, repeat, results):
+    """Benchmarks finding and listing `count` applications."""
+    apps = synthetic.workspace(workspace)
+    for number in range(count):
+        synthetic.questions_app(apps, f"app{number:04d}", 1)
+    answerfile = os.path.join(workspace, "empty.json")
+    with open(answerfile, "w") as jsonfile:
+        json.dump({}, jsonfile)
+
+    case = f"apps_{count}"
+    click.echo(f"{case}: scan", err=True)
+    results[f"cli_help_cold_start/{case}"] = summary(
+        cold_start(workspace, ["--help"], repeat)
+    )
+    for benchmark in ("app_factory", "help_listing"):
+        results[f"{benchmark}/{case}"] = summary(
+            measure(workspace, benchmark, "", repeat, answerfile)
+        )
+
+
+def run_imports(workspace, repeat, results):
+    """Benchmarks what starting the cli and the web app imports."""
+    synthetic.workspace(workspace)
+    for startup in importtime.startups:
+        click.echo(f"{startup}: imports", err=True)
+        results[f"import_time/{startup}"] = summary(
+            [
+                importtime.total(importtime.importtime(startup, environment(workspace)))
+                for _ in range(repeat)
+            ]
+        )
+
+
+def compare(results, previous, threshold):
+    """Prints the change of every median since `previous`.
+
+    :returns: the number of benchmarks that got slower than `threshold`
+    :rtype: int
+    """
+    slower = 0
+    click.echo(f"{'benchmark':<40}{'before':>10}{'after':>10}{'ratio':>8}")
+    for key, result in results.items():
+        if key not in previous:
+            continue
+        before = previous[key]["median"]
+        ratio = result["median"] / before if before else float("inf")
+        flag = ""
+        if ratio > threshold:
+            flag = " slower"
+            slower += 1
+        click.echo(
+            f"{key:<40}{before:>10.4f}{result['median']:>10.4f}{ratio:>8.2f}{flag}"
+        )
+    return slower
+
+
+@click.command()
+@click.option(
+    "-o",
+    "--output",
+    help="File to save results in",
+    default="benchmark.json",
+    show_default=True,
+    type=click.Path(dir_okay=False),
+)
+@click.option("-r", "--repeat", help="Runs per benchmark", default=5, show_default=True)
+@click.option(
+    "-s",
+    "--suite",
+    help="Only run these suites",
+    multiple=True,
+    type=click.Choice(list(suites) + ["apps", "imports"]),
+)
+@click.option("--quick", help="Only the two smallest sizes", is_flag=True)
+@click.option(
+    "--compare",
+    "previous",
+    help="Results to compare with",
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option(
+    "--threshold",
+    help="Ratio of medians that counts as slower when comparing",
+    default=1.25,
+    show_default=True,
+)
+def main(output, repeat, suite, quick, previous, threshold):
+    """Benchmarks jobbergate with synthetic applications."""
+    results = {}
+    selected = suite or list(suites) + ["apps", "imports"]
+    for name in selected:
+        if name == "imports":
+            with tempfile.TemporaryDirectory(prefix="jobbergate-bench-") as workspace:
+                run_imports(workspace, repeat, results)
+            continue
+        sizes = appcounts if name == "apps" else suites[name][1]
+        for size in sizes[:2] if quick else sizes:
+            with tempfile.TemporaryDirectory(prefix="jobbergate-bench-") as workspace:
+                if name == "apps":
+                    run_scan(workspace, size, repeat, results)
+                else:
+                    run_suite(workspace, name, size, repeat, results)
+
+    with open(output, "w") as jsonfile:
+        json.dump({"meta": metadata(repeat), "results": results}, jsonfile, indent=2)
+    click.echo(f"Saved {len(results)} results to {output}", err=True)
+
+    if previous:
+        with open(previous) as jsonfile:
+            if compare(results, json.load(jsonfile)["results"], threshold):
+                sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
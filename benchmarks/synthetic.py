@@ -0,0 +1,232 @@
+"""
+synthetic
+=========
+
+Writes synthetic applications of growing size for the benchmarks. Every
+generator writes an application to `apps` and returns the answers that
+render it without asking anything."""
+
+import os
+
+import yaml
+
+
+def write_app(apps, name, views, template, controller=None):
+    """Writes an application with a single template.
+
+    :param str apps: Directory with all applications
+    :param str name: Name of the application
+    :param str views: Content of ``views.py``
+    :param str template: Content of ``templates/job_template.j2``
+    :param str controller: (optional) Content of ``controller.py``
+    """
+    appdir = os.path.join(apps, name)
+    os.makedirs(os.path.join(appdir, "templates"), exist_ok=True)
+    with open(os.path.join(appdir, "views.py"), "w") as viewsfile:
+        viewsfile.write(views)
+    if controller is not None:
+        with open(os.path.join(appdir, "controller.py"), "w") as controllerfile:
+            controllerfile.write(controller)
+    with open(os.path.join(appdir, "templates", "job_template.j2"), "w") as templ:
+        templ.write(template)
+    with open(os.path.join(appdir, "README"), "w") as readme:
+        readme.write(f"Synthetic application {name}\n")
+
+
+def questions_app(apps, name, count):
+    """An application with `count` text and integer questions in
+    ``mainflow``."""
+    questions = []
+    answers = {}
+    for number in range(count):
+        if number % 2:
+            questions.append(
+                f'        appform.Integer("q{number}", "Question {number}", minval=0),'
+            )
+            answers[f"q{number}"] = number
+        else:
+            questions.append(f'        appform.Text("q{number}", "Question {number}"),')
+            answers[f"q{number}"] = f"answer{number}"
+    views = "\n".join(
+        [
+            "from jobbergate import appform",
+            "",
+            "",
+            "def mainflow(data):",
+            "    return [",
+            *questions,
+            "    ]",
+            "",
+        ]
+    )
+    template = "".join(
+        f"#SBATCH --q{number}={{{{ data.q{number} }}}}\n" for number in range(count)
+    )
+    write_app(apps, name, views, template)
+    return answers
+
+
+def nested_app(apps, name, depth):
+    """An application with `depth` levels of ``BooleanList``, every level
+    inside ``whentrue`` of the level above."""
+    answers = {}
+
+    def level(number):
+        answers[f"b{number}"] = True
+        answers[f"t{number}"] = f"true{number}"
+        answers[f"f{number}"] = f"false{number}"
+        whentrue = f'appform.Text("t{number}", "When true {number}")'
+        if number + 1 < depth:
+            whentrue += ", " + level(number + 1)
+        return (
+            f'appform.BooleanList("b{number}", "Level {number}", default=True, '
+            f"whentrue=[{whentrue}], "
+            f'whenfalse=[appform.Text("f{number}", "When false {number}")])'
+        )
+
+    views = "\n".join(
+        [
+            "from jobbergate import appform",
+            "",
+            "",
+            "def mainflow(data):",
+            f"    return [{level(0)}]",
+            "",
+        ]
+    )
+    template = "".join(
+        f"{{% if data.b{number} %}}{{{{ data.t{number} }}}}{{% endif %}}\n"
+        for number in range(depth)
+    )
+    write_app(apps, name, views, template)
+    return answers
+
+
+def chain_app(apps, name, length):
+    """An application where ``mainflow`` leads through `length` workflows
+    with ``nextworkflow``, every workflow with a ``post_`` function."""
+    functions = []
+    controller = ["from jobbergate import workflow", ""]
+    answers = {}
+    for number in range(length + 1):
+        function = "mainflow" if number == 0 else f"step{number}"
+        questions = [f'appform.Text("s{number}", "Step {number}")']
+        if number < length:
+            questions.append(
+                f'appform.Const("nextworkflow", default="step{number + 1}")'
+            )
+        functions.extend(
+            [
+                "",
+                f"def {function}(data):",
+                f"    return [{', '.join(questions)}]",
+                "",
+            ]
+        )
+        controller.extend(
+            [
+                "",
+                "@workflow.logic",
+                f"def post_{function}(data):",
+                f'    return {{"p{number}": data["s{number}"].upper()}}',
+                "",
+            ]
+        )
+        answers[f"s{number}"] = f"step{number}"
+    views = "\n".join(["from jobbergate import appform", ""] + functions)
+    template = "".join(
+        f"{{{{ data.s{number} }}}} {{{{ data.p{number} }}}}\n"
+        for number in range(length + 1)
+    )
+    write_app(apps, name, views, template, "\n".join(controller))
+    return answers
+
+
+def choices_app(apps, name, count):
+    """An application with `count` ``List`` and ``Checkbox`` questions,
+    all with the same list of 100 partitions, created anew by every call of
+    ``mainflow`` like generated questionnaires do."""
+    views = "\n".join(
+        [
+            "from jobbergate import appform",
+            "",
+            "",
+            "def mainflow(data):",
+            '    partitions = [f"partition{number}" for number in range(100)]',
+            "    questions = []",
+            f"    for number in range({count}):",
+            "        if number % 2:",
+            "            questions.append(appform.Checkbox(",
+            '                f"c{number}", f"Question {number}", partitions,',
+            '                default=["partition0"],',
+            "            ))",
+            "        else:",
+            "            questions.append(appform.List(",
+            '                f"c{number}", f"Question {number}", partitions,',
+            '                default="partition0",',
+            "            ))",
+            "    return questions",
+            "",
+        ]
+    )
+    answers = {}
+    for number in range(count):
+        answers[f"c{number}"] = ["partition0"] if number % 2 else "partition0"
+    template = "".join(
+        f"#SBATCH --c{number}={{{{ data.c{number} }}}}\n" for number in range(count)
+    )
+    write_app(apps, name, views, template)
+    return answers
+
+
+def template_app(apps, name, lines):
+    """An application with a template of about `lines` lines, with loops,
+    conditions and filters over a few answers."""
+    views = "\n".join(
+        [
+            "from jobbergate import appform",
+            "",
+            "",
+            "def mainflow(data):",
+            "    return [",
+            '        appform.Text("jobname", "Job name"),',
+            '        appform.Integer("tasks", "Tasks", minval=1),',
+            '        appform.Confirm("debug", "Debug?"),',
+            "    ]",
+            "",
+        ]
+    )
+    block = (
+        "# section {number}\n"
+        "#SBATCH --job-name={{{{ data.jobname }}}}-{number}\n"
+        "{{% for task in range(data.tasks) %}}"
+        "srun --ntasks=1 step{number}.sh {{{{ task }}}}\n"
+        "{{% endfor %}}"
+        "{{% if data.debug %}}echo {{{{ data.jobname | upper }}}}\n{{% endif %}}"
+        "{{{{ data.jobbergateconfig.slurm.partitions | join(',') }}}}\n"
+    )
+    sections = max(1, lines // 8)
+    template = "".join(block.format(number=number) for number in range(sections))
+    write_app(apps, name, views, template)
+    return {"jobname": "bench", "tasks": 4, "debug": True}
+
+
+def workspace(path, apps=None):
+    """Writes a ``jobbergate.yaml`` for an apps directory in `path`.
+
+    :param str path: Directory to use as ``JOBBERGATE_PATH``
+    :param str apps: (optional) Directory with all applications, defaults
+        to ``apps`` in `path`
+    :returns: the apps directory
+    :rtype: str
+    """
+    apps = apps or os.path.join(path, "apps")
+    os.makedirs(apps, exist_ok=True)
+    config = {
+        "apps": {"path": apps},
+        "answers": {"backend": "file", "path": os.path.join(path, "answers")},
+        "slurm": {"partitions": [f"partition{number}" for number in range(8)]},
+    }
+    with open(os.path.join(path, "jobbergate.yaml"), "w") as ymlfile:
+        yaml.safe_dump(config, ymlfile)
+    return apps
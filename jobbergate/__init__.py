@@ -1,35 +1,53 @@
 # __init__.py
 
 
+import importlib
 import os
+import threading
 
 from flask import Flask, render_template
-from flask_login import LoginManager
-from flask_bcrypt import Bcrypt
-from flask_debugtoolbar import DebugToolbarExtension
-from flask_bootstrap import Bootstrap
-from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
-from flask_ldap3_login import LDAP3LoginManager
-
-
-# instantiate the extensions
-login_manager = LoginManager()
-bcrypt = Bcrypt()
-toolbar = DebugToolbarExtension()
-bootstrap = Bootstrap()
-db = SQLAlchemy()
-migrate = Migrate()
-ldap_manager = LDAP3LoginManager()
+
+
+# the extensions, instantiated on first use so the cli doesn't import them
+extensions = {
+    "login_manager": ("flask_login", "LoginManager"),
+    "bcrypt": ("flask_bcrypt", "Bcrypt"),
+    "toolbar": ("flask_debugtoolbar", "DebugToolbarExtension"),
+    "bootstrap": ("flask_bootstrap", "Bootstrap"),
+    "db": ("flask_sqlalchemy", "SQLAlchemy"),
+    "migrate": ("flask_migrate", "Migrate"),
+    "ldap_manager": ("flask_ldap3_login", "LDAP3LoginManager"),
+}
+_extensions_lock = threading.Lock()
 
 users = {}
 
 
-def create_app(script_info=None):
+def __getattr__(name):
+    if name not in extensions:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    with _extensions_lock:
+        if name not in globals():
+            module, cls = extensions[name]
+            globals()[name] = getattr(importlib.import_module(module), cls)()
+    return globals()[name]
+
+
+def create_app(script_info=None, web=True):
+    """Creates the app.
+
+    :param script_info: Unused, for older versions of flask
+    :param bool web: (optional) Set up the web extensions, the views and the
+        error handlers. Without them only the cli commands work, see
+        :func:`create_cli_app`
+    :rtype: flask.Flask
+    """
     import jobbergate.cli
 
     # instantiate the app
     app = Flask(__name__, template_folder="../apps", static_folder="static")
+    # Application commands are created on demand by the group
+    app.cli = jobbergate.cli.ApplicationGroup(app.name)
 
     # set config
     app_settings = os.getenv("APP_SETTINGS", "jobbergate.config.ProductionConfig")
@@ -38,6 +56,41 @@ def create_app(script_info=None):
 
     app.config.update(jobbergateconfig)
 
+    app.cli.add_command(jobbergate.cli.tools)
+    if web:
+        _init_web(app)
+    return app
+
+
+def create_cli_app(script_info=None):
+    """Creates the app for the cli only: the questionnaires, rendering and
+    the ``jobbergate`` commands. Flask-SQLAlchemy, Flask-Migrate, LDAP, the
+    login manager, the forms and the views aren't imported, which halves the
+    start of a cli run. ``wrapper.sh`` uses it:
+
+    .. code-block:: console
+
+        $ flask --app jobbergate:create_cli_app <application> [options]
+
+    :param script_info: Unused, for older versions of flask
+    :rtype: flask.Flask
+    """
+    return create_app(script_info, web=False)
+
+
+def _init_web(app):
+    """Sets up the extensions, views and error handlers of the web app."""
+    from jobbergate import (
+        bcrypt,
+        bootstrap,
+        db,
+        ldap_manager,
+        login_manager,
+        migrate,
+        toolbar,
+    )
+    from jobbergate.lib import jobbergateconfig
+
     # set up extensions
     login_manager.init_app(app)
     if "LDAP_HOST" in app.config:
@@ -48,6 +101,21 @@ def create_app(script_info=None):
     db.init_app(app)
     migrate.init_app(app, db)
 
+    # server side storage for questionnaire answers
+    from jobbergate import answerstore
+
+    app.extensions["answerstore"] = answerstore.from_config(jobbergateconfig)
+
+    # background submission of rendered scripts
+    from jobbergate import submit
+
+    app.extensions["submitter"] = submit.from_config(jobbergateconfig)
+
+    # timing of requests and /metrics
+    from jobbergate import profiling
+
+    profiling.init_app(app)
+
     # register blueprints
     from jobbergate.views import main_blueprint
 
@@ -92,8 +160,3 @@ def create_app(script_info=None):
     @app.shell_context_processor
     def ctx():
         return {"app": app, "db": db}
-
-    for cmd in jobbergate.cli.cmds:
-        app.cli.add_command(cmd)
-
-    return app
@@ -0,0 +1,243 @@
+"""
+answerstore
+===========
+
+Keeps the answers of a web questionnaire on the server, so the session
+cookie only holds an id. Every step of a questionnaire appends the answers
+it changed (a delta), and loading merges the deltas in order.
+
+The backend is configured in ``jobbergate.yaml``:
+
+.. code-block:: yaml
+
+    answers:
+      backend: file   # file, memory or sqlalchemy
+      path: /var/tmp/jobbergate-answers
+      max_age: 86400
+      prune_interval: 600
+
+Unused answers are removed after `max_age` seconds, at most every
+`prune_interval` seconds when a questionnaire starts.
+
+``memory`` only works with a single worker process. ``sqlalchemy`` uses the
+database configured with ``SQLALCHEMY_DATABASE_URI``."""
+
+import json
+import os
+import re
+import secrets
+import tempfile
+import threading
+import time
+
+_validid = re.compile(r"^[0-9a-f]{32}$")
+
+
+def dumps(delta):
+    """Serializes a delta as JSON.
+
+    :param dict delta: answers that changed
+    :rtype: str
+    """
+    return json.dumps(delta)
+
+
+class AnswerStore:
+    """Baseclass for answer stores.
+
+    :param int max_age: Seconds before unused answers are removed
+    :param int prune_interval: Seconds between removing unused answers
+    """
+
+    def __init__(self, max_age=86400, prune_interval=600):
+        self.max_age = max_age
+        self.prune_interval = prune_interval
+        self._pruned = 0
+
+    def create(self):
+        """Creates an empty set of answers, and removes unused answers if
+        they weren't removed for `prune_interval` seconds.
+
+        :returns: id of the answers
+        :rtype: str
+        """
+        now = time.monotonic()
+        if not self._pruned or now - self._pruned >= self.prune_interval:
+            self._pruned = now
+            self.prune()
+        return secrets.token_hex(16)
+
+    def append(self, answersid, delta):
+        """Adds changed answers.
+
+        :param str answersid: id of the answers
+        :param dict delta: answers that changed
+        """
+        raise NotImplementedError
+
+    def deltas(self, answersid):
+        """Returns all stored deltas in order.
+
+        :param str answersid: id of the answers
+        :rtype: list[dict]
+        """
+        raise NotImplementedError
+
+    def load(self, answersid):
+        """Returns all answers, with later deltas overriding earlier.
+
+        :param str answersid: id of the answers
+        :rtype: dict
+        """
+        answers = {}
+        for delta in self.deltas(answersid):
+            answers.update(delta)
+        return answers
+
+    def delete(self, answersid):
+        """Removes stored answers.
+
+        :param str answersid: id of the answers
+        """
+        raise NotImplementedError
+
+    def prune(self):
+        """Removes answers that haven't been used for `max_age` seconds."""
+
+
+class MemoryStore(AnswerStore):
+    """Keeps answers in the memory of the process."""
+
+    def __init__(self, max_age=86400, prune_interval=600):
+        super().__init__(max_age, prune_interval)
+        self._answers = {}
+        self._lock = threading.Lock()
+
+    def append(self, answersid, delta):
+        with self._lock:
+            deltas = self._answers.setdefault(answersid, [0, []])
+            deltas[0] = time.time()
+            deltas[1].append(dumps(delta))
+
+    def deltas(self, answersid):
+        _, deltas = self._answers.get(answersid, (0, []))
+        return [json.loads(delta) for delta in list(deltas)]
+
+    def delete(self, answersid):
+        with self._lock:
+            self._answers.pop(answersid, None)
+
+    def prune(self):
+        oldest = time.time() - self.max_age
+        with self._lock:
+            for answersid, (used, _) in list(self._answers.items()):
+                if used < oldest:
+                    del self._answers[answersid]
+
+
+class FileStore(AnswerStore):
+    """Keeps answers as JSON lines files, one file per set of answers.
+
+    :param str path: Directory for the files
+    """
+
+    def __init__(self, path=None, max_age=86400, prune_interval=600):
+        super().__init__(max_age, prune_interval)
+        self.path = path or os.path.join(tempfile.gettempdir(), "jobbergate-answers")
+        os.makedirs(self.path, exist_ok=True)
+
+    def _filename(self, answersid):
+        if not _validid.match(answersid):
+            raise ValueError(f"Invalid answers id {answersid!r}")
+        return os.path.join(self.path, f"{answersid}.jsonl")
+
+    def append(self, answersid, delta):
+        with open(self._filename(answersid), "a") as answersfile:
+            answersfile.write(dumps(delta) + "\n")
+
+    def deltas(self, answersid):
+        try:
+            with open(self._filename(answersid)) as answersfile:
+                return [json.loads(line) for line in answersfile]
+        except FileNotFoundError:
+            return []
+
+    def delete(self, answersid):
+        try:
+            os.remove(self._filename(answersid))
+        except FileNotFoundError:
+            pass
+
+    def prune(self):
+        oldest = time.time() - self.max_age
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                try:
+                    if entry.stat().st_mtime < oldest:
+                        os.remove(entry.path)
+                except FileNotFoundError:
+                    pass
+
+
+class SQLAlchemyStore(AnswerStore):
+    """Keeps answers in the database, as rows of
+    :class:`jobbergate.models.AnswerDelta`.
+
+    Must be used inside an application context."""
+
+    def __init__(self, max_age=86400, prune_interval=600):
+        super().__init__(max_age, prune_interval)
+        self._created = False
+
+    def _model(self):
+        from jobbergate import db
+        from jobbergate.models import AnswerDelta
+
+        if not self._created:
+            AnswerDelta.__table__.create(db.engine, checkfirst=True)
+            self._created = True
+        return db, AnswerDelta
+
+    def append(self, answersid, delta):
+        db, AnswerDelta = self._model()
+        db.session.add(
+            AnswerDelta(answers=answersid, created=time.time(), delta=dumps(delta))
+        )
+        db.session.commit()
+
+    def deltas(self, answersid):
+        _, AnswerDelta = self._model()
+        rows = (
+            AnswerDelta.query.filter_by(answers=answersid)
+            .order_by(AnswerDelta.id)
+            .all()
+        )
+        return [json.loads(row.delta) for row in rows]
+
+    def delete(self, answersid):
+        db, AnswerDelta = self._model()
+        AnswerDelta.query.filter_by(answers=answersid).delete()
+        db.session.commit()
+
+    def prune(self):
+        db, AnswerDelta = self._model()
+        AnswerDelta.query.filter(
+            AnswerDelta.created < time.time() - self.max_age
+        ).delete()
+        db.session.commit()
+
+
+backends = {"memory": MemoryStore, "file": FileStore, "sqlalchemy": SQLAlchemyStore}
+
+
+def from_config(config):
+    """Creates the answer store configured in `config`.
+
+    :param dict config: ``jobbergate.yaml`` configuration
+    :rtype: AnswerStore
+    """
+    options = dict(config.get("answers") or {})
+    backend = options.pop("backend", "file")
+    if backend not in backends:
+        raise ValueError(f"Unknown answer store backend {backend!r}")
+    return backends[backend](**options)
@@ -3,15 +3,68 @@ Appform
 =======
 
 Abstraction layer for questions. Each classe represents different question
-types, and QuestionBase"""
+types, and QuestionBase
 
-from collections import deque
+Questionnaires could have thousands of questions, so questions have
+``__slots__`` instead of a ``__dict__``, and equal choice lists are kept once,
+as a shared tuple, see :func:`shared_choices`."""
+
+from collections.abc import Mapping
 from functools import partial, wraps
 
+from jobbergate.lib import LRUCache, loading
 
-questions = deque()
+# Workflows from modules that are not loaded through jobbergate.registry
 workflows = {}
 
+# Shared choice tuples and their fingerprints, by the choices they equal
+_choices = LRUCache(maxsize=4096)
+_slotnames = {}
+
+
+def shared_choices(choices):
+    """Returns `choices` as a tuple, the same tuple for all equal choice
+    lists. Choices that compare equal but differ in type, like ``[1, 2]``
+    and ``[1.0, 2.0]``, are kept apart.
+
+    :param choices: The choices
+    :rtype: tuple
+    """
+    choices = tuple(choices)
+    try:
+        candidates = _choices.get(choices, ())
+    except TypeError:
+        # Unhashable choices are not shared
+        return choices
+    frozen = _freeze(choices)
+    for shared, sharedfrozen in candidates:
+        if sharedfrozen == frozen:
+            return shared
+    _choices.set(choices, candidates + ((choices, frozen),))
+    return choices
+
+
+def attributes(question):
+    """Returns the attributes of a question.
+
+    :param QuestionBase question: The question
+    :returns: pairs of attribute name and value
+    :rtype: list[tuple]
+    """
+    cls = type(question)
+    names = _slotnames.get(cls)
+    if names is None:
+        names = _slotnames[cls] = tuple(
+            name
+            for klass in reversed(cls.__mro__)
+            for name in klass.__dict__.get("__slots__", ())
+            if name != "__dict__"
+        )
+    result = [(name, getattr(question, name)) for name in names]
+    # Questions of subclasses without __slots__ could have more
+    result.extend(getattr(question, "__dict__", {}).items())
+    return result
+
 
 class QuestionBase:
     """Baseclass for questions.
@@ -22,6 +75,8 @@ class QuestionBase:
     :param default: Default value
     """
 
+    __slots__ = ("variablename", "message", "default")
+
     def __init__(self, variablename, message, default):
         self.variablename = variablename
         self.message = message
@@ -36,6 +91,8 @@ class Text(QuestionBase):
     :param default: Default value
     """
 
+    __slots__ = ()
+
     def __init__(self, variablename, message, default=None):
         super().__init__(variablename, message, default)
 
@@ -50,6 +107,8 @@ class Integer(QuestionBase):
     :param default: Default value
     """
 
+    __slots__ = ("maxval", "minval")
+
     def __init__(self, variablename, message, minval=None, maxval=None, default=None):
         super().__init__(variablename, message, default)
         self.maxval = maxval
@@ -73,9 +132,11 @@ class List(QuestionBase):
     :param choices: List with choices
     :param default: Default value"""
 
+    __slots__ = ("choices",)
+
     def __init__(self, variablename, message, choices, default=None):
         super().__init__(variablename, message, default)
-        self.choices = choices
+        self.choices = shared_choices(choices)
 
 
 class Directory(QuestionBase):
@@ -86,6 +147,8 @@ class Directory(QuestionBase):
     :param default: Default value
     :param exists: Checks if given directory exists"""
 
+    __slots__ = ("exists",)
+
     def __init__(self, variablename, message, default=None, exists=None):
         super().__init__(variablename, message, default)
         self.exists = exists
@@ -99,6 +162,8 @@ class File(QuestionBase):
     :param default: Default value
     :param exists: Checks if given file exists"""
 
+    __slots__ = ("exists",)
+
     def __init__(self, variablename, message, default=None, exists=None):
         super().__init__(variablename, message, default)
         self.exists = exists
@@ -112,9 +177,11 @@ class Checkbox(QuestionBase):
     :param choices: List with choices
     :param default: Default value(s)"""
 
+    __slots__ = ("choices",)
+
     def __init__(self, variablename, message, choices, default=None):
         super().__init__(variablename, message, default)
-        self.choices = choices
+        self.choices = shared_choices(choices)
 
 
 class Confirm(QuestionBase):
@@ -125,6 +192,8 @@ class Confirm(QuestionBase):
     :param default: Default value
     """
 
+    __slots__ = ()
+
     def __init__(self, variablename, message, default=None):
         super().__init__(variablename, message, default)
 
@@ -141,6 +210,8 @@ class BooleanList(QuestionBase):
     :param whentrue: List of questions to show if user answers no/false on this question
     """
 
+    __slots__ = ("whentrue", "whenfalse")
+
     def __init__(
         self, variablename, message, default=None, whentrue=None, whenfalse=None
     ):
@@ -149,8 +220,14 @@ class BooleanList(QuestionBase):
             raise ValueError("Empty questions lists")
         self.whentrue = whentrue
         self.whenfalse = whenfalse
-        self.ignore = lambda a: a[self.variablename]
-        self.noignore = lambda a: not a[self.variablename]
+
+    def ignore(self, answers):
+        """Hides the `whenfalse` questions if this question is answered true."""
+        return answers[self.variablename]
+
+    def noignore(self, answers):
+        """Hides the `whentrue` questions if this question is answered false."""
+        return not answers[self.variablename]
 
 
 class Const(QuestionBase):
@@ -161,10 +238,53 @@ class Const(QuestionBase):
     :param default: Value that variable is set to
     """
 
+    __slots__ = ()
+
     def __init__(self, variablename, default):
         super().__init__(variablename, None, default)
 
 
+def _freeze(value):
+    """Turns questions and their attributes into nested tuples."""
+    if isinstance(value, QuestionBase):
+        return (type(value),) + tuple(
+            (name, _freeze_choices(attr) if name == "choices" else _freeze(attr))
+            for name, attr in attributes(value)
+            if not callable(attr)
+        )
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    if isinstance(value, Mapping):
+        return tuple((key, _freeze(item)) for key, item in value.items())
+    try:
+        hash(value)
+    except TypeError:
+        return repr(value)
+    # Keep 1, 1.0 and True apart
+    return (type(value), value)
+
+
+def _freeze_choices(choices):
+    """Like :func:`_freeze`, but only once for shared choices."""
+    try:
+        candidates = _choices.get(choices, ())
+    except TypeError:
+        candidates = ()
+    for shared, frozen in candidates:
+        if shared is choices:
+            return frozen
+    return _freeze(choices)
+
+
+def fingerprint(questions):
+    """Returns a hashable value that is equal for lists of equal questions.
+
+    :param list[QuestionBase] questions: The questions
+    :rtype: tuple
+    """
+    return _freeze(questions)
+
+
 def workflow(func=None, *, name=None):
     """A decorator for workflows. Adds an workflow question and all questions
     added in the decorated question is asked after selecting workflow.
@@ -195,6 +315,8 @@ def workflow(func=None, *, name=None):
     def wrapper(*args, **kvargs):
         return func(*args, **kvargs)
 
-    workflows[name or func.__name__] = func
+    application = loading.get()
+    registered = workflows if application is None else application.workflows
+    registered[name or func.__name__] = func
 
     return wrapper
@@ -0,0 +1,341 @@
+"""
+catalog
+=======
+
+Finds the applications in the apps directory and the first line of their
+``README``, their ``parameters``, templates and workflows, without reading
+anything more than needed. Workflows are found by parsing ``views.py``, not
+by importing it.
+
+With many applications, especially on a network filesystem, the info could
+be kept in an index file. When applications are added or removed (the
+modification time of the apps directory changes) the index is updated,
+reading again only the applications whose files have changed. Changes
+inside an application are picked up with ``flask jobbergate index``. The
+index is configured in ``jobbergate.yaml``:
+
+.. code-block:: yaml
+
+    apps:
+      path: apps/
+      index: /var/tmp/jobbergate-apps.json
+
+Applications are found with :meth:`Catalog.search`, ``/apps/search?q=``
+or ``flask jobbergate search``.
+"""
+
+import ast
+import json
+import os
+
+from jobbergate.lib import jobbergateconfig
+
+
+def read_readme(appdir):
+    """Returns the first line of an application's ``README``.
+
+    :param str appdir: Directory of the application
+    :rtype: str
+    """
+    try:
+        with open(os.path.join(appdir, "README")) as readmefile:
+            return readmefile.readline()
+    except FileNotFoundError:
+        return ""
+
+
+def read_parameters(appdir):
+    """Returns the content of an application's ``parameters`` file.
+
+    :param str appdir: Directory of the application
+    :rtype: str
+    """
+    try:
+        with open(os.path.join(appdir, "parameters")) as paramsfile:
+            return paramsfile.read()
+    except FileNotFoundError:
+        return ""
+
+
+def read_templates(appdir):
+    """Lists the templates of an application.
+
+    :param str appdir: Directory of the application
+    :rtype: list[str]
+    """
+    try:
+        with os.scandir(os.path.join(appdir, "templates")) as entries:
+            return sorted(
+                entry.name
+                for entry in entries
+                if entry.name.endswith(".j2") and entry.is_file()
+            )
+    except (FileNotFoundError, NotADirectoryError):
+        return []
+
+
+def _workflow_name(decorator):
+    """Returns the name a ``@workflow`` decorator registers, ``""`` for the
+    name of the function or ``None`` if it is another decorator."""
+    keywords = []
+    if isinstance(decorator, ast.Call):
+        keywords = decorator.keywords
+        decorator = decorator.func
+    if isinstance(decorator, ast.Attribute):
+        name = decorator.attr
+    else:
+        name = getattr(decorator, "id", None)
+    if name != "workflow":
+        return None
+    for keyword in keywords:
+        if keyword.arg == "name" and isinstance(keyword.value, ast.Constant):
+            return keyword.value.value
+    return ""
+
+
+def read_workflows(appdir):
+    """Lists the workflows of an application, by parsing its ``views.py``.
+
+    :param str appdir: Directory of the application
+    :rtype: list[str]
+    """
+    try:
+        with open(os.path.join(appdir, "views.py")) as viewsfile:
+            tree = ast.parse(viewsfile.read())
+    except (FileNotFoundError, SyntaxError, ValueError):
+        return []
+    workflows = []
+    for node in tree.body:
+        if not isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        for decorator in node.decorator_list:
+            name = _workflow_name(decorator)
+            if name is not None:
+                workflows.append(name or node.name)
+    return workflows
+
+
+def signature(appdir):
+    """Returns ``[mtime, size]`` of the files the info of an application is
+    read from, ``None`` for missing files.
+
+    :param str appdir: Directory of the application
+    :rtype: list
+    """
+    result = []
+    for name in ("", "README", "parameters", "views.py", "templates"):
+        try:
+            stat = os.stat(os.path.join(appdir, name))
+            result.append([stat.st_mtime_ns, stat.st_size])
+        except FileNotFoundError:
+            result.append(None)
+    return result
+
+
+def write_json(filename, content):
+    """Writes `content` as JSON, replacing `filename` atomically."""
+    tmpfile = f"{filename}.{os.getpid()}.tmp"
+    with open(tmpfile, "w") as jsonfile:
+        json.dump(content, jsonfile)
+    os.replace(tmpfile, filename)
+
+
+class Catalog:
+    """The applications in the apps directory.
+
+    :param str path: (optional) Directory with all applications, defaults to
+        ``apps: path:`` from ``jobbergate.yaml``
+    :param str indexfile: (optional) Index file, defaults to ``apps: index:``
+        from ``jobbergate.yaml``
+    """
+
+    def __init__(self, path=None, indexfile=None):
+        self._path = path
+        self._indexfile = indexfile
+        self._index = None
+        self._info = {}
+
+    @property
+    def path(self):
+        return self._path or (jobbergateconfig.get("apps") or {}).get("path")
+
+    @property
+    def indexfile(self):
+        return self._indexfile or (jobbergateconfig.get("apps") or {}).get("index")
+
+    def scan(self):
+        """Lists the application directories.
+
+        :rtype: list[str]
+        """
+        if not self.path or not os.path.isdir(self.path):
+            return []
+        with os.scandir(self.path) as entries:
+            return sorted(entry.name for entry in entries if entry.is_dir())
+
+    def exists(self, name):
+        """Checks if there is an application called `name`.
+
+        :rtype: bool
+        """
+        return bool(self.path) and os.path.isdir(os.path.join(self.path, name))
+
+    def read(self, name):
+        """Reads the info of one application from its directory.
+
+        :param str name: Name of the application
+        :returns: ``help``, ``parameters``, ``templates`` and ``workflows``
+            of the application
+        :rtype: dict
+        """
+        appdir = os.path.join(self.path, name)
+        return {
+            "help": read_readme(appdir),
+            "parameters": read_parameters(appdir),
+            "templates": read_templates(appdir),
+            "workflows": read_workflows(appdir),
+        }
+
+    def update(self, index=None, mtime=None):
+        """Brings `index` up to date, reading again only the applications
+        that have been added or whose files have changed, and writes the
+        index file if one is configured.
+
+        :param dict index: (optional) The previous index
+        :param int mtime: (optional) Modification time of the apps directory
+        :returns: the index
+        :rtype: dict
+        """
+        index = index or {"apps": {}, "signatures": {}}
+        apps = {}
+        signatures = {}
+        for name in self.scan():
+            signatures[name] = signature(os.path.join(self.path, name))
+            if name in index["apps"] and index["signatures"].get(name) == (
+                signatures[name]
+            ):
+                apps[name] = index["apps"][name]
+            else:
+                apps[name] = self.read(name)
+        index = {
+            "mtime": mtime or os.stat(self.path).st_mtime_ns,
+            "apps": apps,
+            "signatures": signatures,
+        }
+        if self.indexfile:
+            write_json(self.indexfile, index)
+        self._index = index
+        return index
+
+    def build(self, mtime=None):
+        """Reads all applications and writes the index file.
+
+        :param int mtime: (optional) Modification time of the apps directory
+        :returns: the index
+        :rtype: dict
+        """
+        return self.update(None, mtime)
+
+    def _read_index(self):
+        try:
+            with open(self.indexfile) as jsonfile:
+                index = json.load(jsonfile)
+        except (FileNotFoundError, ValueError):
+            return None
+        # Index files written before signatures were kept are read again
+        keys = {"mtime", "apps", "signatures"}
+        if not isinstance(index, dict) or not keys <= index.keys():
+            return None
+        return index
+
+    def refresh(self):
+        """Updates the index with the applications that have changed since
+        it was written, also when the apps directory itself has not.
+
+        :returns: the index
+        :rtype: dict
+        """
+        previous = self._read_index() if self.indexfile else self._index
+        return self.update(previous)
+
+    def load(self):
+        """Returns the index, rebuilt if applications have been added or
+        removed since it was written.
+
+        :returns: the index or ``None`` if no index file is configured
+        :rtype: dict
+        """
+        if not self.indexfile or not self.path or not os.path.isdir(self.path):
+            return None
+        mtime = os.stat(self.path).st_mtime_ns
+        if self._index is not None and self._index["mtime"] == mtime:
+            return self._index
+        index = self._read_index()
+        if index is not None and index["mtime"] == mtime:
+            self._index = index
+            return index
+        return self.update(index, mtime)
+
+    def index(self):
+        """Returns the index, kept in memory if no index file is configured.
+
+        :returns: the index or ``None`` if there is no apps directory
+        :rtype: dict
+        """
+        if self.indexfile:
+            return self.load()
+        if not self.path or not os.path.isdir(self.path):
+            return None
+        mtime = os.stat(self.path).st_mtime_ns
+        if self._index is not None and self._index["mtime"] == mtime:
+            return self._index
+        return self.update(self._index, mtime)
+
+    def names(self):
+        """Lists the names of all applications.
+
+        :rtype: list[str]
+        """
+        index = self.index()
+        if index is None:
+            return []
+        return sorted(index["apps"])
+
+    def info(self, name):
+        """Returns the info of an application, see :meth:`read`, from the
+        index.
+
+        :param str name: Name of the application
+        :rtype: dict
+        """
+        index = self.index()
+        if index is not None and name in index["apps"]:
+            return index["apps"][name]
+        if name not in self._info:
+            self._info[name] = self.read(name)
+        return self._info[name]
+
+    def search(self, query):
+        """Finds the applications that have all words of `query` in their
+        name, ``README`` line, templates or workflows. Applications with the
+        words in their name come first.
+
+        :param str query: Words to search for
+        :returns: names of the applications found
+        :rtype: list[str]
+        """
+        index = self.index()
+        if index is None:
+            return []
+        words = query.lower().split()
+        found = []
+        for name, info in index["apps"].items():
+            text = " ".join(
+                [name, info["help"]] + info["templates"] + info["workflows"]
+            ).lower()
+            if all(word in text for word in words):
+                found.append((not all(word in name.lower() for word in words), name))
+        return [name for _, name in sorted(found)]
+
+
+catalog = Catalog()
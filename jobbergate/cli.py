@@ -3,18 +3,23 @@ cli
 ===
 
 Creates dynamic CLI's for all apps"""
+import csv
+import os
 import subprocess
-from copy import deepcopy
-from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 import json
 import click
 import inquirer
-import yaml
-from jinja2 import Environment, FileSystemLoader
-from flask.cli import with_appcontext
+from flask.cli import AppGroup, with_appcontext
+from jinja2 import TemplateNotFound
 
-from jobbergate.lib import jobbergateconfig, fullpath_import
-from jobbergate import appform
+from jobbergate.catalog import catalog
+from jobbergate.lib import jobbergateconfig, read_config
+from jobbergate.profiling import phase
+from jobbergate.registry import registry
+from jobbergate import graph, hooks, memoize, outputcache, profiling, render, submit
+from jobbergate import appform, validate
 
 
 def flatten(deeplist):
@@ -134,12 +139,14 @@ def parse_field(field, ignore=None):
         )
 
 
-def ask_questions(fields, answerfile, use_defaults=False):
+def ask_questions(fields, answerfile, use_defaults=False, interactive=True):
     """Asks the questions from all the fields.
 
     :param list[jobbergate.appform.QuestionBase] fields: List with questions
     :param dict answerfile: dict with prepopulated answers
     :param bool use_defaults: option to use default value instead of asking, when possible
+    :param bool interactive: if ``False``, use defaults and raise
+        ``click.UsageError`` instead of asking for missing answers
     :returns: all answers
     :rtype: dict
     """
@@ -147,8 +154,9 @@ def ask_questions(fields, answerfile, use_defaults=False):
     questionstoask = []
     retval = {}
 
-    while fields:
-        field = fields.pop(0)
+    # Don't consume `fields`, applications are cached and may return the
+    # same list every time
+    for field in fields:
         question = parse_field(field)
         questions.append(question)
 
@@ -161,6 +169,10 @@ def ask_questions(fields, answerfile, use_defaults=False):
             print(f"Default used: {question.name}={question.default}")
         else:
             questionstoask.append(question)
+
+    if not interactive:
+        return _answer_questions(questionstoask, answerfile, retval)
+
     try:
         retval.update(inquirer.prompt(questionstoask))
     except TypeError:
@@ -169,6 +181,47 @@ def ask_questions(fields, answerfile, use_defaults=False):
     return retval
 
 
+def _answer_questions(questions, answerfile, retval):
+    """Answers questions with their defaults, like inquirer does for ignored
+    questions, without prompting."""
+    missing = []
+    for question in questions:
+        question.answers = {**answerfile, **retval}
+        try:
+            ignored = question.ignore
+        except KeyError:
+            # Depends on a BooleanList answer that is missing as well
+            ignored = False
+        if ignored or question.default is not None:
+            retval[question.name] = question.default
+        else:
+            missing.append(question.name)
+    if missing:
+        raise click.UsageError(f"Missing answers for: {', '.join(missing)}")
+    return retval
+
+
+def parse_value(value):
+    """Converts a command line string to bool, int or float when possible.
+
+    :param string value: The value to convert
+    :returns: converted value
+    """
+    if value.lower() == "true":
+        return True
+    if value.lower() == "false":
+        return False
+    # Save as number if possible
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
 def parse_prefill(arguments):
     """Parses ``-p/--prefill`` command line arguments.
 
@@ -179,210 +232,543 @@ def parse_prefill(arguments):
     retval = {}
     for arg in arguments:
         key, value = arg.split("=")
-        if value.lower() == "true":
-            value = True
-        elif value.lower() == "false":
-            value = False
-        else:
-            # Save as number if possible
-            try:
-                original = value
-                value = float(original)
-                value = int(original)
-            except ValueError:
-                pass
-        retval.update({key: value})
+        retval.update({key: parse_value(value)})
     return retval
 
 
-def app_factory():
+def run_questionnaire(loaded, answerfile, use_defaults=False, interactive=True):
+    """Runs all workflows of an application, with their pre_- and
+    post_-functions, and asks the questions not found in `answerfile`.
+
+    :param jobbergate.registry.Application loaded: The application
+    :param dict answerfile: dict with prepopulated answers
+    :param bool use_defaults: option to use default value instead of asking, when possible
+    :param bool interactive: if ``False``, never prompt, see :func:`ask_questions`
+    :returns: all data and the answers that should be saved
+    :rtype: tuple(dict, dict)
     """
-    This is the workhorse of cli module.
+    appview = loaded.views
+    prefuncs = loaded.prefuncs
+    postfuncs = loaded.postfuncs
+
+    with phase("config"):
+        data = read_config(loaded.name)
+    data.update(answerfile)
+
+    # If the is a pre_-function in the controller, run that before all
+    # questions
+    if "" in prefuncs.keys():
+        with phase("pre"):
+            data.update(hooks.call(prefuncs[""], data) or {})
+
+    # Ask the questions
+    with phase("questions"):
+        questions = appview.mainflow(data)
+    with phase("ask"):
+        answers = ask_questions(questions, answerfile, use_defaults, interactive)
+    savedanswers = answers
+
+    data.update(answers)
+
+    if "mainflow" in postfuncs.keys():
+        with phase("post"):
+            data.update(hooks.call(postfuncs["mainflow"], data) or {})
+
+    if "nextworkflow" in data or (
+        "flows" in answerfile and "mainflow" in answerfile["flows"]
+    ):
+        savedanswers["flow"] = {}
+        currentworkflow = "mainflow"
+        while True:
+            if "flows" in answerfile:
+                workflow = answerfile["flows"].get(currentworkflow) or data.pop(
+                    "nextworkflow"
+                )
+                if workflow in answerfile["flows"]:
+                    answerfile["nextworkflow"] = answerfile["flows"][workflow]
+            else:
+                workflow = data.pop("nextworkflow")
+            savedanswers["flow"].update({currentworkflow: workflow})
+            currentworkflow = workflow
+            # If nextworkflow isn't defined, raise exception
+            if workflow not in appview.__dict__:
+                raise NameError(f"Couldn't find workflow {workflow}")
+
+            # If selected workflow have a pre_-function, run that now
+            if workflow in prefuncs.keys():
+                with phase("pre"):
+                    data.update(hooks.call(prefuncs[workflow], data) or {})
+
+            # "Instantiate" workflow questions
+            wfquestions = appview.__dict__[workflow]
+            with phase("questions"):
+                questions = wfquestions(data)
+            with phase("ask"):
+                answers = ask_questions(
+                    questions, answerfile, use_defaults, interactive
+                )
+            savedanswers.update(answers)
+            data.update(answers)
 
-    Click needs to have the code as a callback so we need to create the
-    _callback function, which in turn returns a wrapper for each application.
-    The app factory loops throug all the applications in the configed
-    directory, and creates callbacks for each of them. This is the real
-    workhorse in cli."""
+            # If selected workflow have a post_-function, run that now
+            if workflow in postfuncs.keys():
+                with phase("post"):
+                    data.update(hooks.call(postfuncs[workflow], data) or {})
 
-    def _callback(application):
-        """Callback for the cli"""
+            if "nextworkflow" not in data:
+                break
 
-        @with_appcontext
-        def _wrapper(**kvargs):
-            """The callback needs to be wrapped"""
+    # Check if workflows is defined
+    if loaded.workflows:
+        if "workflow" in answerfile:
+            workflow = answerfile["workflow"]
+        elif not interactive:
+            raise click.UsageError("Missing answers for: workflow")
+        else:
+            workflows = [
+                inquirer.List(
+                    "workflow",
+                    message="What workflow should be used",
+                    choices=loaded.workflows.keys(),
+                )
+            ]
 
-            appview = fullpath_import(f"{application}", "views")
+            try:
+                wfdata = inquirer.prompt(workflows)
+            except TypeError:
+                exit(0)
+            if "mainflow" in postfuncs.keys():
+                with phase("post"):
+                    data.update(hooks.call(postfuncs["mainflow"], data) or {})
+            workflow = wfdata["workflow"]
 
-            data = {}
-            data["jobbergateconfig"] = deepcopy(jobbergateconfig)
-            saveanswers = kvargs["saveanswers"]
-            if kvargs["answerfile"]:
-                with open(kvargs["answerfile"]) as jsonfile:
-                    answerfile = json.load(jsonfile)
-            else:
-                answerfile = {}
+        savedanswers.update({"workflow": workflow})
 
-            # Update data from answerfile with command line arguments
-            answerfile.update(parse_prefill(kvargs["prefill"]))
-            data.update(answerfile)
-            # Check if the app has a controller file
-            try:
-                appcontroller = fullpath_import(f"{application}", "controller")
+        # If selected workflow have a pre_-function, run that now
+        if workflow in prefuncs.keys():
+            with phase("pre"):
+                data.update(hooks.call(prefuncs[workflow], data) or {})
 
-                prefuncs = appcontroller.workflow.prefuncs
-                postfuncs = appcontroller.workflow.postfuncs
-            except ModuleNotFoundError:
-                prefuncs = {}
-                postfuncs = {}
+        # "Instantiate" workflow questions
+        wfquestions = loaded.workflows[workflow]
+        with phase("questions"):
+            questions = wfquestions(data)
 
-            outputfile = kvargs["output"]
-            use_defaults = kvargs["fast"]
+        # Ask workflow questions
+        with phase("ask"):
+            answers = ask_questions(questions, answerfile, use_defaults, interactive)
+        savedanswers.update(answers)
+        data.update(answers)
 
-            try:
-                with open(
-                    f"{jobbergateconfig['apps']['path']}/{application}/config.yaml", "r"
-                ) as ymlfile:
-                    data.update(yaml.safe_load(ymlfile))
-            except FileNotFoundError:
-                pass
-
-            # If the is a pre_-function in the controller, run that before all
-            # questions
-            if "" in prefuncs.keys():
-                data.update(prefuncs[""](data) or {})
-
-            # Ask the questions
-            questions = appview.mainflow(data)
-            answers = ask_questions(questions, answerfile, use_defaults)
-            if saveanswers:
-                savedanswers = answers
+        # If selected workflow have a post_-function, run that now
+        if workflow in postfuncs.keys():
+            with phase("post"):
+                data.update(hooks.call(postfuncs[workflow], data) or {})
 
-            data.update(answers)
+    # If there is a global post_-function, run that now
+    if "" in postfuncs.keys():
+        with phase("post"):
+            data.update(hooks.call(postfuncs[""], data) or {})
 
-            if "mainflow" in postfuncs.keys():
-                data.update(postfuncs["mainflow"](data) or {})
-
-            if "nextworkflow" in data or (
-                "flows" in answerfile and "mainflow" in answerfile["flows"]
-            ):
-                if saveanswers:
-                    savedanswers["flow"] = {}
-                currentworkflow = "mainflow"
-                while True:
-                    if "flows" in answerfile:
-                        workflow = answerfile["flows"].get(currentworkflow) or data.pop(
-                            "nextworkflow"
-                        )
-                        if workflow in answerfile["flows"]:
-                            answerfile["nextworkflow"] = answerfile["flows"][workflow]
-                    else:
-                        workflow = data.pop("nextworkflow")
-                    if saveanswers:
-                        savedanswers["flow"].update({currentworkflow: workflow})
-                    currentworkflow = workflow
-                    # If nextworkflow isn't defined, raise exception
-                    if workflow not in appview.__dict__:
-                        raise NameError(f"Couldn't find workflow {workflow}")
-
-                    # If selected workflow have a pre_-function, run that now
-                    if workflow in prefuncs.keys():
-                        data.update(prefuncs[workflow](data) or {})
-
-                    # "Instantiate" workflow questions
-                    wfquestions = appview.__dict__[workflow]
-                    questions = wfquestions(data)
-                    answers = ask_questions(questions, answerfile, use_defaults)
-                    if saveanswers:
-                        savedanswers.update(answers)
-                    data.update(answers)
-
-                    # If selected workflow have a post_-function, run that now
-                    if workflow in postfuncs.keys():
-                        data.update(postfuncs[workflow](data) or {})
-
-                    if "nextworkflow" not in data:
-                        break
-
-            # Check if workflows is defined
-            if appview.appform.workflows:
-                if "workflow" in answerfile:
-                    workflow = answerfile["workflow"]
-                else:
-                    workflows = [
-                        inquirer.List(
-                            "workflow",
-                            message="What workflow should be used",
-                            choices=appview.appform.workflows.keys(),
-                        )
-                    ]
+    return data, savedanswers
 
-                    try:
-                        wfdata = inquirer.prompt(workflows)
-                    except TypeError:
-                        exit(0)
-                    if "mainflow" in postfuncs.keys():
-                        data.update(postfuncs["mainflow"](data) or {})
-                    workflow = wfdata["workflow"]
 
-                if saveanswers:
-                    savedanswers.update({"workflow": workflow})
+def answer_application(application, answerfile, templatefile=None):
+    """Runs an application without prompting and finds its template.
 
-                # If selected workflow have a pre_-function, run that now
-                if workflow in prefuncs.keys():
-                    data.update(prefuncs[workflow](data) or {})
+    :param string application: Name of the application
+    :param dict answerfile: dict with prepopulated answers
+    :param string templatefile: (optional) Full path to template file
+    :returns: all data and the template to render
+    :rtype: tuple(dict, jinja2.Template)
+    """
+    data, _ = run_questionnaire(
+        registry.get(application), answerfile, interactive=False
+    )
+    templatedir, template = render.template_path(application, data, templatefile)
+    return data, render.get_template(templatedir, template)
 
-                # "Instantiate" workflow questions
-                wfquestions = appview.appform.workflows[workflow]
-                questions = wfquestions(data)
 
-                # Ask workflow questions
-                answers = ask_questions(questions, answerfile, use_defaults)
-                if saveanswers:
-                    savedanswers.update(answers)
-                data.update(answers)
+def render_answers(application, answerfile, templatefile=None):
+    """Runs an application without prompting and renders its template.
+
+    :param string application: Name of the application
+    :param dict answerfile: dict with prepopulated answers
+    :param string templatefile: (optional) Full path to template file
+    :returns: all data and the rendered template
+    :rtype: tuple(dict, string)
+    """
+    data, jinjatemplate = answer_application(application, answerfile, templatefile)
+    return data, outputcache.rendered(registry.get(application), jinjatemplate, data)
 
-                # If selected workflow have a post_-function, run that now
-                if workflow in postfuncs.keys():
-                    data.update(postfuncs[workflow](data) or {})
-                appview.appform.workflows = {}
 
-            if kvargs["template"]:
-                templatedir = str(Path(kvargs["template"]).parent)
-                template = Path(kvargs["template"]).name
+def write_script(outputfile, jinjatemplate, data, application=None):
+    """Renders a template to a file, in chunks if ``jinja: stream:`` is set.
+
+    :param outputfile: File to write to
+    :param jinja2.Template jinjatemplate: The template
+    :param dict data: All data
+    :param jobbergate.registry.Application application: (optional) The
+        application, to take the script from :mod:`jobbergate.outputcache`
+    :returns: number of characters written
+    :rtype: int
+    """
+    if not render.streaming():
+        if application is None:
+            return outputfile.write(render.render(jinjatemplate, data))
+        return outputfile.write(outputcache.rendered(application, jinjatemplate, data))
+    written = 0
+    for chunk in render.generate(jinjatemplate, data):
+        written += outputfile.write(chunk)
+    return written
+
+
+def read_manifest(manifest):
+    """Reads answer sets from a manifest file.
+
+    A ``.csv`` manifest has one column per variable, and values are converted
+    like ``-p/--prefill``. Empty cells are left out. Any other manifest is read
+    as JSON lines, with one answer file per line.
+
+    :param string manifest: Path to the manifest
+    :returns: all answer sets
+    :rtype: list[dict]
+    """
+    with open(manifest, newline="") as manifestfile:
+        if manifest.endswith(".csv"):
+            return [
+                {key: parse_value(value) for key, value in row.items() if value != ""}
+                for row in csv.DictReader(manifestfile)
+            ]
+        return [json.loads(line) for line in manifestfile if line.strip()]
+
+
+def _batch_row(application, outputdir, name, templatefile, job):
+    """Renders one answer set of a batch to a temporary file in `outputdir`,
+    see :func:`_place_rows`.
+
+    Returns the row number, the file to move it to, the temporary file and an
+    error message, if any."""
+    row, answerfile = job
+    try:
+        data, jinjatemplate = answer_application(application, answerfile, templatefile)
+        root = os.path.realpath(outputdir)
+        filename = os.path.realpath(
+            os.path.join(outputdir, name.format(row=row, data=data))
+        )
+        if filename == root or os.path.commonpath([root, filename]) != root:
+            raise ValueError(f"{filename} is not in {outputdir}")
+        tmpfile = os.path.join(root, f".{row}.{os.getpid()}.tmp")
+        with open(tmpfile, "w") as outputfile:
+            write_script(outputfile, jinjatemplate, data, registry.get(application))
+    except Exception as err:
+        return row, None, None, f"{type(err).__name__}: {err}"
+    return row, filename, tmpfile, None
+
+
+def _place_rows(results):
+    """Moves the scripts rendered by :func:`_batch_row` to their files. Rows
+    that got the same file as an earlier row fail instead of overwriting it.
+
+    :returns: the row number, the file and an error message, if any, of
+        every row
+    :rtype: list[tuple]
+    """
+    placed = []
+    rows = {}
+    for row, filename, tmpfile, error in results:
+        if error is None and filename in rows:
+            os.unlink(tmpfile)
+            error = f"Same file as row {rows[filename]}: {filename}"
+            filename = None
+        elif error is None:
+            try:
+                os.replace(tmpfile, filename)
+                rows[filename] = row
+            except OSError as err:
+                os.unlink(tmpfile)
+                error = f"{type(err).__name__}: {err}"
+                filename = None
+        placed.append((row, filename, error))
+    return placed
+
+
+def get_submitter():
+    """Creates the submitter configured with ``submit:`` in
+    ``jobbergate.yaml``.
+
+    :rtype: jobbergate.submit.Submitter
+    :raises click.UsageError: if submission isn't configured
+    """
+    submitter = submit.from_config(jobbergateconfig)
+    if submitter is None:
+        raise click.UsageError("No submit backend configured in submit:")
+    return submitter
+
+
+@click.group(name="jobbergate")
+def tools():
+    """Tools for working with jobbergate applications."""
+
+
+@tools.command()
+@click.argument("application")
+@click.argument("manifest", type=click.Path(exists=True, dir_okay=False))
+@click.argument("outputdir", type=click.Path(file_okay=False))
+@click.option(
+    "-t",
+    "--template",
+    help="Full path to template file",
+    type=click.Path(exists=True),
+)
+@click.option(
+    "-p", "--prefill", help="Answers used for all rows", multiple=True, type=str
+)
+@click.option(
+    "-n",
+    "--name",
+    help="Output file name, formatted with `row` and `data`",
+    default="{row:05d}.sh",
+    show_default=True,
+)
+@click.option(
+    "-j",
+    "--processes",
+    help="Number of worker processes",
+    default=1,
+    show_default=True,
+)
+@click.option(
+    "--submit",
+    "submitjobs",
+    help="Submit the scripts with the backend configured in submit:",
+    is_flag=True,
+)
+@click.pass_context
+def batch(
+    ctx,
+    application,
+    manifest,
+    outputdir,
+    template,
+    prefill,
+    name,
+    processes,
+    submitjobs,
+):
+    """Renders APPLICATION once for every answer set in MANIFEST, without
+    asking any questions, and writes the scripts to OUTPUTDIR."""
+    submitter = get_submitter() if submitjobs else None
+    answersets = read_manifest(manifest)
+    prefilled = parse_prefill(prefill)
+    for answerfile in answersets:
+        answerfile.update(prefilled)
+    os.makedirs(outputdir, exist_ok=True)
+
+    # Load the application once, forked workers inherit it
+    registry.get(application)
+    job = partial(_batch_row, application, outputdir, name, template)
+    rows = enumerate(answersets, 1)
+    if processes > 1:
+        chunksize = max(1, len(answersets) // (processes * 4))
+        with ProcessPoolExecutor(processes) as executor:
+            results = list(executor.map(job, rows, chunksize=chunksize))
+    else:
+        results = [job(row) for row in rows]
+    results = _place_rows(results)
+
+    failed = [(row, error) for row, _, error in results if error]
+
+    if submitter is not None:
+        submissions = []
+        for row, filename, error in results:
+            if not error:
+                with open(filename) as scriptfile:
+                    submissions.append(
+                        # Waits for earlier rows when the queue is full
+                        (
+                            row,
+                            submitter.submit(
+                                scriptfile.read(), application, block=True
+                            ),
+                        )
+                    )
+        for row, submission in submissions:
+            submission.wait()
+            if submission.state == "submitted":
+                click.echo(f"Row {row}: submitted job {submission.jobid}")
             else:
-                templatedir = (
-                    f"{jobbergateconfig['apps']['path']}/{application}/templates/"
-                )
-                template = data.get("template", None) or data.get(
-                    "default_template", "job_template.j2"
-                )
+                failed.append((row, f"Submission failed: {submission.error}"))
+        submitter.shutdown()
+        failed.sort()
+
+    for row, error in failed:
+        click.echo(f"Row {row}: {error}", err=True)
+    click.echo(
+        f"Rendered {len(results) - len(failed)} of {len(results)} answer sets"
+        f" to {outputdir}"
+    )
+    if failed:
+        ctx.exit(1)
+
+
+@tools.command(name="render")
+@click.argument("application")
+@click.argument("outputdir", type=click.Path(file_okay=False))
+@click.option(
+    "-T",
+    "--template",
+    "names",
+    help="Template of the application to render, all if not given",
+    multiple=True,
+)
+@click.option(
+    "-a",
+    "--answerfile",
+    help="Full path to pre-populate answer file.",
+    type=click.Path(exists=True, dir_okay=False),
+)
+@click.option("-p", "--prefill", help="Prefill answers", multiple=True, type=str)
+@click.option(
+    "-f",
+    "--fast",
+    help="Fast-forward by using defaults instead of asking when possible.",
+    is_flag=True,
+)
+@click.option("-j", "--workers", help="Number of render threads", type=int)
+@with_appcontext
+def render_templates(application, outputdir, names, answerfile, prefill, fast, workers):
+    """Answers the questions of APPLICATION once and renders all, or the
+    chosen, templates of it with the same answers to OUTPUTDIR."""
+    if answerfile:
+        with open(answerfile) as jsonfile:
+            answers = json.load(jsonfile)
+    else:
+        answers = {}
+    answers.update(parse_prefill(prefill))
+
+    with phase("import"):
+        loaded = registry.get(application)
+    data, _ = run_questionnaire(loaded, answers, fast)
+    try:
+        outputs = render.render_many(application, data, names, workers)
+    except TemplateNotFound as err:
+        raise click.UsageError(f"No template {err.name} in {application}")
+    if not outputs:
+        raise click.UsageError(f"{application} has no templates")
+
+    os.makedirs(outputdir, exist_ok=True)
+    for template, output in outputs.items():
+        with open(os.path.join(outputdir, render.output_name(template)), "w") as out:
+            out.write(output)
+    click.echo(f"Rendered {len(outputs)} templates to {outputdir}")
+
+
+@tools.command(name="validate")
+@click.argument("application")
+@click.argument(
+    "sources", nargs=-1, required=True, type=click.Path(exists=True, dir_okay=False)
+)
+@click.option(
+    "-p", "--prefill", help="Answers used for all rows", multiple=True, type=str
+)
+@click.pass_context
+def validate_answers(ctx, application, sources, prefill):
+    """Checks the answer sets in SOURCES against the questions of
+    APPLICATION, without running or rendering anything. SOURCES are answer
+    files (``.json``) or manifests like for ``jobbergate batch``."""
+    prefilled = parse_prefill(prefill)
+    rows = []
+    answersets = []
+    for source in sources:
+        if source.endswith(".json"):
+            with open(source) as jsonfile:
+                found = [(source, json.load(jsonfile))]
+        else:
+            found = [
+                (f"{source}:{row}", answers)
+                for row, answers in enumerate(read_manifest(source), 1)
+            ]
+        for row, answers in found:
+            answers.update(prefilled)
+            rows.append(row)
+            answersets.append(answers)
+
+    checks = validate.validator(application)
+    results = checks.validate_many(answersets)
+    invalid = 0
+    for row, errors in zip(rows, results):
+        if errors:
+            invalid += 1
+        for error in errors:
+            click.echo(f"{row}: {error}")
+    click.echo(f"Checked {len(answersets)} answer sets, {invalid} with errors")
+    if invalid:
+        ctx.exit(1)
+
+
+def _callback(application):
+    """Callback for the cli"""
+
+    @with_appcontext
+    def _wrapper(**kvargs):
+        """The callback needs to be wrapped"""
+
+        saveanswers = kvargs["saveanswers"]
+        if kvargs["answerfile"]:
+            with open(kvargs["answerfile"]) as jsonfile:
+                answerfile = json.load(jsonfile)
+        else:
+            answerfile = {}
 
-            # If there is a global post_-function, run that now
-            if "" in postfuncs.keys():
-                data.update(postfuncs[""](data) or {})
+        # Update data from answerfile with command line arguments
+        answerfile.update(parse_prefill(kvargs["prefill"]))
 
-            if saveanswers:
-                with open(kvargs["saveanswers"], "w") as jsonfile:
-                    json.dump(savedanswers, jsonfile, indent=4)
+        outputfile = kvargs["output"]
+        use_defaults = kvargs["fast"]
+        # Fails before the questions if submission isn't configured
+        submitter = get_submitter() if kvargs["submit"] else None
 
-            jinjaenv = Environment(loader=FileSystemLoader(templatedir))
-            jinjatemplate = jinjaenv.get_template(template)
-            file = outputfile.write(jinjatemplate.render(data=data))
-            outputfile.flush()
-            if "cmd_command" in data.keys() and not kvargs["no_cmd"]:
-                subprocess.run(data["cmd_command"], shell=True)
-            return file
+        if kvargs["profile"]:
+            recorder = profiling.start(application)
 
-        return _wrapper
+        with phase("import"):
+            loaded = registry.get(application)
+        data, savedanswers = run_questionnaire(loaded, answerfile, use_defaults)
 
-    if not Path(jobbergateconfig["apps"]["path"]).is_dir():
-        return []
+        if saveanswers:
+            with open(kvargs["saveanswers"], "w") as jsonfile:
+                json.dump(savedanswers, jsonfile, indent=4)
 
-    apps = [
-        x.name for x in Path(jobbergateconfig["apps"]["path"]).iterdir() if x.is_dir()
-    ]
-    default_options = [
+        templatedir, template = render.template_path(
+            application, data, kvargs["template"]
+        )
+        with phase("render"):
+            jinjatemplate = render.get_template(templatedir, template)
+            if kvargs["submit"]:
+                # The whole script is needed for submission anyway
+                script = outputcache.rendered(loaded, jinjatemplate, data)
+                file = outputfile.write(script)
+            else:
+                file = write_script(outputfile, jinjatemplate, data, loaded)
+            outputfile.flush()
+        if kvargs["profile"]:
+            click.echo(profiling.report(recorder), err=True)
+        if submitter is not None:
+            submission = submitter.submit(script, application).wait()
+            if submission.state != "submitted":
+                raise click.ClickException(f"Submission failed: {submission.error}")
+            click.echo(f"Submitted job {submission.jobid}", err=True)
+        if "cmd_command" in data.keys() and not kvargs["no_cmd"]:
+            subprocess.run(data["cmd_command"], shell=True)
+        return file
+
+    return _wrapper
+
+
+def default_options():
+    """Options that all application commands have."""
+    return [
         click.Option(
             param_decls=("-t", "--template"),
             help="Full path to template file",
@@ -413,46 +799,188 @@ def app_factory():
             required=False,
             is_flag=True,
         ),
+        click.Option(
+            param_decls=["--submit"],
+            help="Submits the script with the backend configured in submit:",
+            required=False,
+            is_flag=True,
+        ),
+        click.Option(
+            param_decls=["--profile"],
+            help="Prints the time spent in each phase of the run",
+            required=False,
+            is_flag=True,
+        ),
         click.Argument(param_decls=["output"], type=click.File("w")),
     ]
-    readmefirstline = {}
-    params = {}
-    for app in apps:
-        try:
-            with open(f"{jobbergateconfig['apps']['path']}/{app}/README") as readmefile:
-                readmefirstline[app] = readmefile.readline()
-        except FileNotFoundError:
-            readmefirstline[app] = ""
 
-        try:
-            with open(
-                f"{jobbergateconfig['apps']['path']}/{app}/parameters"
-            ) as paramsfile:
-                params[app] = paramsfile.read()
-        except FileNotFoundError:
-            params[app] = ""
 
-    return [
-        click.Command(
-            name=app,
-            help=readmefirstline[app],
-            callback=_callback(app),
-            params=default_options
-            + [
+class ApplicationCommand(click.Command):
+    """Command for one application.
+
+    The application's ``README`` and ``parameters`` are only read when help
+    or options are needed, so listing many commands stays cheap.
+
+    :param str name: Name of the application
+    :param jobbergate.catalog.Catalog applications: (optional) Catalog to
+        read help and parameters from
+    """
+
+    def __init__(self, name, applications=None):
+        self._help = None
+        self._params = None
+        self.applications = applications or catalog
+        super().__init__(name=name, callback=_callback(name))
+
+    @property
+    def help(self):
+        if self._help is None:
+            return self.applications.info(self.name)["help"]
+        return self._help
+
+    @help.setter
+    def help(self, value):
+        self._help = value
+
+    @property
+    def params(self):
+        if not self._params:
+            parameters = self.applications.info(self.name)["parameters"]
+            self._params = default_options() + [
                 click.Option(
                     param_decls=("-p", "--prefill"),
-                    help=params[app] or "Prefill answers",
+                    help=parameters or "Prefill answers",
                     required=False,
                     multiple=True,
                     type=click.STRING,
                 )
-            ],
-        )
-        for app in apps
-    ]
+            ]
+        return self._params
+
+    @params.setter
+    def params(self, value):
+        self._params = value
+
+
+class ApplicationGroup(AppGroup):
+    """Flask cli group with a command for every application.
 
+    Application commands are created when click asks for them, so running one
+    application never reads anything from the others.
 
-try:
-    cmds = app_factory()
-except KeyError:
-    pass
+    :param jobbergate.catalog.Catalog applications: (optional) Catalog with
+        the applications
+    """
+
+    def __init__(self, *args, applications=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.applications = applications or catalog
+        self._appcommands = {}
+
+    def list_commands(self, ctx):
+        return sorted(set(super().list_commands(ctx)) | set(self.applications.names()))
+
+    def get_command(self, ctx, name):
+        command = super().get_command(ctx, name)
+        if command is not None:
+            return command
+        if name not in self._appcommands:
+            if not self.applications.exists(name):
+                return None
+            self._appcommands[name] = ApplicationCommand(name, self.applications)
+        return self._appcommands[name]
+
+
+def app_factory():
+    """Creates commands for all the applications in the configured directory.
+
+    :returns: one command per application
+    :rtype: list[ApplicationCommand]
+    """
+    return [ApplicationCommand(name) for name in catalog.names()]
+
+
+@tools.command()
+@click.option("--rebuild", is_flag=True, help="Read all applications again")
+def index(rebuild):
+    """Updates the application index configured with ``apps: index:`` with
+    the applications that have changed."""
+    if not catalog.indexfile:
+        raise click.UsageError("No index file configured in apps: index:")
+    built = catalog.build() if rebuild else catalog.refresh()
+    click.echo(f"Indexed {len(built['apps'])} applications in {catalog.indexfile}")
+
+
+def _echo_applications(names):
+    for name in names:
+        info = catalog.info(name)
+        click.echo(f"{name}\t{info['help'].strip()}")
+
+
+@tools.command(name="list")
+def list_applications():
+    """Lists all applications with the first line of their README."""
+    _echo_applications(catalog.names())
+
+
+@tools.command()
+@click.argument("query", nargs=-1, required=True)
+def search(query):
+    """Finds the applications with all words of QUERY in their name, README
+    line, templates or workflows."""
+    _echo_applications(catalog.search(" ".join(query)))
+
+
+@tools.command()
+@click.argument("application", required=False, default="")
+@click.option("--function", help="Only the results of this function")
+def invalidate(application, function):
+    """Forgets the remembered results of pre- and post-functions, of all
+    applications or only APPLICATION."""
+    if function and not application:
+        raise click.UsageError("--function needs an APPLICATION")
+    memoize.invalidate(application, function)
+
+
+@tools.command(name="compile")
+@click.argument("applications", nargs=-1)
+@click.option("--check", is_flag=True, help="Exit with 1 if any application has errors")
+@click.option("--no-hooks", is_flag=True, help="Don't run pre- and post-functions")
+@click.pass_context
+def compile_graphs(ctx, applications, check, no_hooks):
+    """Compiles and keeps the question graphs of APPLICATIONS, or of all
+    applications, and reports their errors."""
+    failed = False
+    for name in applications or catalog.names():
+        try:
+            built = graph.build(name, run_hooks=not no_hooks)
+        except Exception as error:
+            errors = [f"{type(error).__name__}: {error}"]
+        else:
+            errors = built["errors"]
+            click.echo(f"{name}: {len(built['nodes'])} workflows")
+        for error in errors:
+            click.echo(f"{name}: {error}", err=True)
+        failed = failed or bool(errors)
+    if check and failed:
+        ctx.exit(1)
+
+
+@tools.command()
+@click.option("--socket", "path", help="Socket to listen on")
+@click.option(
+    "--workers", default=2, show_default=True, help="Workers forked in advance"
+)
+def daemon(path, workers):
+    """Keeps a warm jobbergate process that runs cli commands for
+    ``python -m jobbergate.client``."""
+    from jobbergate import daemon
+
+    daemon.serve(path, workers)
+
+
+def __getattr__(name):
+    # The commands used to be created at import time as `cmds`
+    if name == "cmds":
+        return app_factory()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,100 @@
+"""
+client
+======
+
+Thin client for :mod:`jobbergate.daemon`. Runs ``flask <arguments>`` in a
+warm daemon process, with the terminal, the working directory and the
+environment of the caller, and exits with its exit status::
+
+    python -m jobbergate.client <application> [options]
+
+Only the standard library is imported here. If no daemon is listening, or
+it serves another ``JOBBERGATE_PATH``, ``flask`` is run as usual."""
+
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+
+#: Signals passed on to the command running in the daemon
+forwarded = (signal.SIGINT, signal.SIGTERM, signal.SIGHUP)
+
+
+def socket_path():
+    """Returns the path of the daemon's socket: ``JOBBERGATE_SOCKET`` or
+    ``jobbergate-<uid>.sock`` in ``XDG_RUNTIME_DIR`` or ``TMPDIR``.
+
+    :rtype: str
+    """
+    if os.environ.get("JOBBERGATE_SOCKET"):
+        return os.environ["JOBBERGATE_SOCKET"]
+    directory = os.environ.get("XDG_RUNTIME_DIR") or os.environ.get("TMPDIR", "/tmp")
+    return os.path.join(directory, f"jobbergate-{os.getuid()}.sock")
+
+
+def send_request(connection, request, fds):
+    """Sends a request, with file descriptors, to the daemon.
+
+    :param socket.socket connection: Connection to the daemon
+    :param dict request: ``argv``, ``cwd`` and ``env``
+    :param fds: stdin, stdout and stderr for the command
+    """
+    payload = json.dumps(request).encode()
+    connection.sendmsg(
+        [struct.pack("!I", len(payload)) + payload],
+        [(socket.SOL_SOCKET, socket.SCM_RIGHTS, struct.pack(f"{len(fds)}i", *fds))],
+    )
+
+
+def run(argv, path=None, fds=(0, 1, 2)):
+    """Runs ``flask <argv>`` in the daemon.
+
+    :param list[str] argv: Arguments to ``flask``
+    :param str path: (optional) Socket of the daemon, see :func:`socket_path`
+    :param fds: (optional) stdin, stdout and stderr for the command
+    :returns: the exit status, or ``None`` if the daemon couldn't run it
+    :rtype: int
+    """
+    connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        connection.connect(path or socket_path())
+    except OSError:
+        connection.close()
+        return None
+
+    def forward(signum, frame):
+        try:
+            connection.sendall(json.dumps({"signal": signum}).encode() + b"\n")
+        except OSError:
+            pass
+
+    previous = {signum: signal.signal(signum, forward) for signum in forwarded}
+    try:
+        request = {"argv": list(argv), "cwd": os.getcwd(), "env": dict(os.environ)}
+        send_request(connection, request, fds)
+        for line in connection.makefile("rb"):
+            reply = json.loads(line)
+            if "exit" in reply:
+                return reply["exit"]
+            if "fallback" in reply:
+                return None
+        print("jobbergate: the daemon closed the connection", file=sys.stderr)
+        return 1
+    finally:
+        for signum, handler in previous.items():
+            signal.signal(signum, handler)
+        connection.close()
+
+
+def main():
+    argv = sys.argv[1:]
+    status = run(argv)
+    if status is None:
+        os.execvp("flask", ["flask"] + argv)
+    sys.exit(status)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+"""
+daemon
+======
+
+Keeps a warm jobbergate process, with Flask, inquirer and jobbergate itself
+imported and the cli app created, behind a Unix socket, so cli runs start in
+milliseconds instead of seconds. Start it once per user, for example in the
+login scripts::
+
+    flask jobbergate daemon --workers 2 &
+
+and run applications with the thin client, :mod:`jobbergate.client`, which
+``wrapper.sh`` uses when the socket exists.
+
+The daemon forks `workers` processes in advance. Each worker takes one
+connection, runs the command with the caller's stdin, stdout and stderr
+(passed over the socket), working directory and environment, reports the
+exit status and exits, and the daemon forks a new one. Every run starts from
+the same warm state and nothing leaks between runs.
+
+Only the user running the daemon could connect: the socket is only
+accessible by its owner and, on Linux, the peer's uid is checked as well.
+The socket is ``JOBBERGATE_SOCKET`` or ``jobbergate-<uid>.sock`` in
+``XDG_RUNTIME_DIR`` or ``TMPDIR``."""
+
+import json
+import os
+import signal
+import socket
+import struct
+import sys
+import threading
+import traceback
+
+from flask.cli import ScriptInfo
+
+from jobbergate import create_cli_app, lib
+from jobbergate.client import forwarded, socket_path
+
+
+def warm(app):
+    """Imports and reads what most runs need, before workers are forked.
+
+    :param flask.Flask app: The app
+    """
+    import inquirer  # noqa: F401
+
+    from jobbergate import cli, render  # noqa: F401
+    from jobbergate.catalog import catalog
+
+    catalog.names()
+
+
+def receive_request(connection):
+    """Receives a request and its file descriptors, see
+    :func:`jobbergate.client.send_request`.
+
+    :param socket.socket connection: Connection from a client
+    :returns: the request and the file descriptors
+    :rtype: tuple(dict, list[int])
+    """
+    fdsize = struct.calcsize("3i")
+    data, ancillary, _, _ = connection.recvmsg(65536, socket.CMSG_SPACE(fdsize))
+    if not data:
+        raise ConnectionError("No request")
+    fds = []
+    for level, kind, payload in ancillary:
+        if level == socket.SOL_SOCKET and kind == socket.SCM_RIGHTS:
+            count = len(payload) // struct.calcsize("i")
+            fds.extend(struct.unpack(f"{count}i", payload[: count * 4]))
+    while len(data) < 4 or len(data) < 4 + struct.unpack("!I", data[:4])[0]:
+        chunk = connection.recv(65536)
+        if not chunk:
+            raise ConnectionError("Incomplete request")
+        data += chunk
+    end = 4 + struct.unpack("!I", data[:4])[0]
+    return json.loads(data[4:end]), fds
+
+
+def _peer_uid(connection):
+    """Returns the uid of the connected process, ``None`` if unknown."""
+    if not hasattr(socket, "SO_PEERCRED"):
+        return None
+    credentials = connection.getsockopt(
+        socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize("3i")
+    )
+    return struct.unpack("3i", credentials)[1]
+
+
+def _reply(connection, reply):
+    connection.sendall(json.dumps(reply).encode() + b"\n")
+
+
+def _forward_signals(connection):
+    """Raises the signals the client forwards, and ends the run if the
+    client goes away."""
+    for line in connection.makefile("rb"):
+        signum = json.loads(line).get("signal")
+        if signum in forwarded:
+            os.kill(os.getpid(), signum)
+    os.kill(os.getpid(), signal.SIGTERM)
+
+
+def run_command(app, connection):
+    """Runs one command for a connected client.
+
+    :param flask.Flask app: The app
+    :param socket.socket connection: Connection from a client
+    :returns: the exit status, ``None`` if the command wasn't run
+    :rtype: int
+    """
+    uid = _peer_uid(connection)
+    if uid is not None and uid != os.getuid():
+        return None
+    request, fds = receive_request(connection)
+    root = os.path.join(request["cwd"], request["env"].get("JOBBERGATE_PATH", "./"))
+    if os.path.normpath(root) != os.path.abspath(lib.jobbergatepath):
+        for fd in fds:
+            os.close(fd)
+        _reply(connection, {"fallback": f"The daemon serves {lib.jobbergatepath}"})
+        return None
+
+    sys.stdout.flush()
+    sys.stderr.flush()
+    for target, fd in enumerate(fds[:3]):
+        os.dup2(fd, target)
+        os.close(fd)
+    sys.stdin = open(0, closefd=False)
+    sys.stdout = open(1, "w", buffering=1, closefd=False)
+    sys.stderr = open(2, "w", buffering=1, closefd=False)
+    os.chdir(request["cwd"])
+    os.environ.clear()
+    os.environ.update(request["env"])
+    sys.argv = ["flask"] + request["argv"]
+    threading.Thread(target=_forward_signals, args=(connection,), daemon=True).start()
+
+    try:
+        app.cli.main(
+            args=request["argv"],
+            prog_name="flask",
+            obj=ScriptInfo(create_app=lambda: app),
+        )
+        status = 0
+    except SystemExit as exit:
+        if exit.code is None or isinstance(exit.code, int):
+            status = exit.code or 0
+        else:
+            print(exit.code, file=sys.stderr)
+            status = 1
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    sys.stdout.flush()
+    sys.stderr.flush()
+    _reply(connection, {"exit": status})
+    return status
+
+
+def _worker(app, listener):
+    """Serves one connection in a forked worker."""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+    connection, _ = listener.accept()
+    listener.close()
+    with connection:
+        try:
+            run_command(app, connection)
+        except ConnectionError:
+            # The client went away before sending a request
+            pass
+
+
+def serve(path=None, workers=2, app=None):
+    """Listens on a Unix socket and runs the commands of clients, until
+    terminated.
+
+    :param str path: (optional) The socket, see
+        :func:`jobbergate.client.socket_path`
+    :param int workers: (optional) Number of workers forked in advance
+    :param flask.Flask app: (optional) The app, created if not given
+    """
+    path = path or socket_path()
+    app = app or create_cli_app()
+    warm(app)
+
+    if os.path.exists(path):
+        os.unlink(path)
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    previous = os.umask(0o177)
+    try:
+        listener.bind(path)
+    finally:
+        os.umask(previous)
+    listener.listen(64)
+
+    def terminate(signum, frame):
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, terminate)
+    children = set()
+    try:
+        while True:
+            while len(children) < workers:
+                # Handlers run in the at-fork callbacks, where the exit of
+                # terminate() would be ignored
+                signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGTERM})
+                pid = os.fork()
+                if pid == 0:
+                    status = 0
+                    try:
+                        _worker(app, listener)
+                    except BaseException:
+                        traceback.print_exc()
+                        status = 1
+                    finally:
+                        os._exit(status)
+                children.add(pid)
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGTERM})
+            pid, _ = os.wait()
+            children.discard(pid)
+    finally:
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        listener.close()
+        if os.path.exists(path):
+            os.unlink(path)
@@ -0,0 +1,235 @@
+"""
+graph
+=====
+
+Compiles the question graph of an application ahead of time: every workflow
+reachable from ``mainflow``, through ``nextworkflow`` (set by a
+:class:`jobbergate.appform.Const` question or a ``post_``-function) or the
+workflows registered with :func:`jobbergate.appform.workflow`, with its
+questions and the branches of its :class:`jobbergate.appform.BooleanList`'s.
+
+Workflows are run against representative data: the application's
+configuration and the default answers of the questions asked before them.
+Workflows that are missing, raise or don't return questions are reported as
+errors, instead of failing when a user gets there:
+
+.. code-block:: console
+
+    $ flask jobbergate compile --check
+
+Compiled graphs are kept as JSON, one file per application, until the
+application's source files change. The directory is a per-user cache
+directory, or configured in ``jobbergate.yaml``:
+
+.. code-block:: yaml
+
+    graph:
+      path: /var/tmp/jobbergate-graphs
+
+The web only serves graphs compiled before, since compiling runs the
+application's ``pre_``/``post_``-functions."""
+
+import json
+import os
+
+from jobbergate import appform, hooks
+from jobbergate.catalog import write_json
+from jobbergate.lib import jobbergateconfig, read_config, usercachedir
+from jobbergate.registry import registry
+
+
+def graphdir():
+    """Returns the directory compiled graphs are kept in.
+
+    :rtype: str
+    """
+    return (jobbergateconfig.get("graph") or {}).get("path") or usercachedir("graphs")
+
+
+def _jsonable(value):
+    try:
+        json.dumps(value)
+    except (TypeError, ValueError):
+        return repr(value)
+    return value
+
+
+def serialize(question):
+    """Turns a question into a dict of its type and attributes, with the
+    questions of :class:`jobbergate.appform.BooleanList` branches nested.
+
+    :param jobbergate.appform.QuestionBase question: The question
+    :rtype: dict
+    """
+    result = {"type": type(question).__name__}
+    for name, value in appform.attributes(question):
+        if callable(value):
+            continue
+        if name in ("whentrue", "whenfalse"):
+            result[name] = [serialize(item) for item in value or ()]
+        else:
+            result[name] = _jsonable(value)
+    return result
+
+
+def _walk(questions):
+    """Yields all questions, including the ones in branches."""
+    for question in questions:
+        yield question
+        if isinstance(question, appform.BooleanList):
+            yield from _walk(question.whentrue or ())
+            yield from _walk(question.whenfalse or ())
+
+
+def defaults(questions):
+    """Returns the answers a user that accepts all defaults would give,
+    following the branches the defaults select.
+
+    :param list questions: The questions
+    :rtype: dict
+    """
+    answers = {}
+    for question in questions:
+        answers[question.variablename] = question.default
+        if isinstance(question, appform.BooleanList):
+            branch = question.whentrue if question.default else question.whenfalse
+            answers.update(defaults(branch or ()))
+    return answers
+
+
+def _find(loaded, workflow):
+    if workflow in loaded.workflows:
+        return loaded.workflows[workflow]
+    function = vars(loaded.views).get(workflow)
+    return function if callable(function) else None
+
+
+def _signature(loaded):
+    """Returns the signature of the application as it is kept in JSON."""
+    return [list(item) if item is not None else None for item in loaded.signature]
+
+
+def _call(hooklist, data):
+    if hooklist is not None:
+        data.update(hooks.call(hooklist, data) or {})
+
+
+def compile_application(loaded, run_hooks=True):
+    """Runs the workflows of an application and records its question graph.
+
+    :param jobbergate.registry.Application loaded: The application
+    :param bool run_hooks: (optional) Run ``pre_``/``post_``-functions, like
+        the front ends do
+    :returns: ``nodes`` by workflow name, with their ``questions`` and the
+        workflows they lead to (``next``), and ``errors``
+    :rtype: dict
+    """
+    nodes = {}
+    errors = []
+    prefuncs = loaded.prefuncs if run_hooks else {}
+    postfuncs = loaded.postfuncs if run_hooks else {}
+
+    data = read_config(loaded.name)
+    try:
+        _call(prefuncs.get(""), data)
+    except Exception as error:
+        errors.append(f"pre_: {type(error).__name__}: {error}")
+
+    pending = [("mainflow", data)]
+    while pending:
+        workflow, data = pending.pop(0)
+        if workflow in nodes:
+            continue
+        function = _find(loaded, workflow)
+        if function is None:
+            # Reported below for the workflows leading here
+            if workflow == "mainflow":
+                errors.append("Couldn't find workflow mainflow")
+            continue
+        node = nodes[workflow] = {"questions": [], "next": []}
+        data = dict(data)
+        data.pop("nextworkflow", None)
+        try:
+            if workflow != "mainflow":
+                _call(prefuncs.get(workflow), data)
+            questions = function(data)
+            if not all(isinstance(item, appform.QuestionBase) for item in questions):
+                raise TypeError("Not a list of questions")
+            node["questions"] = [serialize(question) for question in questions]
+            data.update(defaults(questions))
+            _call(postfuncs.get(workflow), data)
+        except Exception as error:
+            errors.append(f"{workflow}: {type(error).__name__}: {error}")
+            continue
+
+        following = [
+            question.default
+            for question in _walk(questions)
+            if isinstance(question, appform.Const)
+            and question.variablename == "nextworkflow"
+        ]
+        following.append(data.get("nextworkflow"))
+        if workflow == "mainflow":
+            following.extend(loaded.workflows)
+        for name in following:
+            if name and name not in node["next"]:
+                node["next"].append(name)
+                pending.append((name, data))
+
+    for name, node in nodes.items():
+        for following in node["next"]:
+            if following not in nodes:
+                errors.append(f"{name} leads to missing workflow {following}")
+    return {
+        "application": loaded.name,
+        "signature": _signature(loaded),
+        "nodes": nodes,
+        "errors": errors,
+    }
+
+
+def build(application, run_hooks=True):
+    """Compiles the question graph of an application and keeps it, see
+    :func:`compile_application`.
+
+    :param str application: Name of the application
+    :param bool run_hooks: (optional) Run ``pre_``/``post_``-functions
+    :returns: the graph
+    :rtype: dict
+    """
+    graph = compile_application(registry.get(application), run_hooks)
+    os.makedirs(graphdir(), exist_ok=True)
+    write_json(os.path.join(graphdir(), f"{application}.json"), graph)
+    return graph
+
+
+def kept(application):
+    """Returns the kept question graph of an application, without compiling
+    it.
+
+    :param str application: Name of the application
+    :returns: the graph, or ``None`` if it wasn't compiled or the application
+        has changed since
+    :rtype: dict
+    """
+    try:
+        with open(os.path.join(graphdir(), f"{application}.json")) as graphfile:
+            graph = json.load(graphfile)
+    except (FileNotFoundError, ValueError):
+        return None
+    if graph.get("signature") != _signature(registry.get(application)):
+        return None
+    return graph
+
+
+def load(application):
+    """Returns the kept question graph of an application, compiled again if
+    the application has changed since.
+
+    :param str application: Name of the application
+    :rtype: dict
+    """
+    graph = kept(application)
+    if graph is None:
+        return build(application)
+    return graph
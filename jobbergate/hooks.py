@@ -0,0 +1,254 @@
+"""
+hooks
+=====
+
+Calls the ``pre_``/``post_``-functions registered with
+:func:`jobbergate.workflow.logic`.
+
+Functions could be coroutine functions (``async def``), for example to
+query a scheduler or a directory service without blocking:
+
+.. code-block:: python
+
+    @workflow.logic
+    async def pre_(data):
+        partitions = await fetch_partitions()
+        return {"partitions": partitions}
+
+Coroutines run on one event loop in a background thread, shared by all
+requests and cli runs in the process, so clients and connection pools
+could be kept between calls. The calling thread waits for the result,
+while the loop runs the coroutines of all requests concurrently.
+
+Several functions could be registered for the same workflow and phase.
+Functions that declare the keys of ``data`` they read (``requires``) and
+return (``provides``) are run in parallel when they don't depend on each
+other:
+
+.. code-block:: python
+
+    @workflow.logic(name="", prepost="pre", provides=["groups"])
+    def ldap_groups(data):
+        ...
+
+    @workflow.logic(name="", prepost="pre", provides=["quota"])
+    def quota(data):
+        ...
+
+    @workflow.logic(name="", prepost="pre", requires=["groups"], provides=["accounts"])
+    def accounts(data):
+        ...
+
+Here ``ldap_groups`` and ``quota`` run at the same time, and ``accounts``
+after both. Results are merged in the order the functions were registered.
+Functions without declarations run alone, in registration order, and see
+everything registered before them. The thread pool is configured in
+``jobbergate.yaml``:
+
+.. code-block:: yaml
+
+    hooks:
+      workers: 8"""
+
+import asyncio
+import inspect
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from jobbergate.lib import jobbergateconfig
+
+_loop = None
+_executor = None
+_pid = None
+_executorpid = None
+_lock = threading.Lock()
+
+
+def event_loop():
+    """Returns the event loop that runs coroutine functions, started in a
+    daemon thread on first use (and again in forked workers).
+
+    :rtype: asyncio.AbstractEventLoop
+    """
+    global _loop, _pid
+    if _loop is None or _pid != os.getpid():
+        with _lock:
+            if _loop is None or _pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(
+                    target=loop.run_forever, name="jobbergate-hooks", daemon=True
+                ).start()
+                _loop, _pid = loop, os.getpid()
+    return _loop
+
+
+async def _wait(awaitable):
+    return await awaitable
+
+
+def call(hook, data):
+    """Calls a ``pre_``/``post_``-function and returns its result.
+
+    :param hook: The function, plain or coroutine function
+    :param dict data: All data
+    :returns: what the function returned, a dict or ``None``
+    """
+    result = hook(data)
+    if inspect.isawaitable(result):
+        return asyncio.run_coroutine_threadsafe(_wait(result), event_loop()).result()
+    return result
+
+
+def executor():
+    """Returns the thread pool that runs independent functions in parallel.
+
+    :rtype: concurrent.futures.ThreadPoolExecutor
+    """
+    global _executor, _executorpid
+    if _executor is None or _executorpid != os.getpid():
+        with _lock:
+            if _executor is None or _executorpid != os.getpid():
+                workers = (jobbergateconfig.get("hooks") or {}).get("workers", 8)
+                _executor = ThreadPoolExecutor(
+                    workers, thread_name_prefix="jobbergate-hooks"
+                )
+                _executorpid = os.getpid()
+    return _executor
+
+
+class Hook:
+    """A registered ``pre_``/``post_``-function.
+
+    :param func: The function
+    :param requires: (optional) Keys of ``data`` the function reads
+    :param provides: (optional) Keys the function returns
+    :param bool deterministic: (optional) ``False`` if the function could
+        return something else for the same data
+    """
+
+    def __init__(self, func, requires=None, provides=None, deterministic=True):
+        self.func = func
+        self.deterministic = deterministic
+        self.declared = requires is not None or provides is not None
+        self.requires = frozenset(requires or ())
+        self.provides = frozenset(provides or ())
+
+
+class HookList:
+    """All functions registered for one workflow and phase. Calling it calls
+    them all, see the module documentation, and returns the merged result.
+    """
+
+    def __init__(self):
+        self.hooks = []
+        self._steps = None
+
+    def add(self, hook):
+        """Registers a function.
+
+        :param Hook hook: The function
+        """
+        self.hooks.append(hook)
+        self._steps = None
+
+    @property
+    def deterministic(self):
+        """``False`` if any of the functions is marked non-deterministic."""
+        return all(hook.deterministic for hook in self.hooks)
+
+    def steps(self):
+        """Orders the functions in steps that are run one after the other.
+        The functions in each step are run in parallel.
+
+        :rtype: list[list[Hook]]
+        :raises ValueError: if declared functions depend on each other in a
+            cycle
+        """
+        if self._steps is None:
+            steps = []
+            declared = []
+            for hook in self.hooks + [None]:
+                if hook is not None and hook.declared:
+                    declared.append(hook)
+                    continue
+                steps.extend(_waves(declared))
+                declared = []
+                if hook is not None:
+                    steps.append([hook])
+            self._steps = steps
+        return self._steps
+
+    def __call__(self, data):
+        result = {}
+        for step in self.steps():
+            if len(step) == 1:
+                results = [call(step[0].func, data)]
+            else:
+                results = _parallel(step, data)
+            for returned in results:
+                returned = returned or {}
+                result.update(returned)
+                data.update(returned)
+        return result
+
+
+def _waves(hooks):
+    """Orders declared functions in waves, every function after the ones
+    that provide keys it requires."""
+    waves = []
+    done = set()
+    remaining = list(hooks)
+    while remaining:
+        wave = [
+            hook
+            for hook in remaining
+            if not any(
+                other is not hook
+                and other not in done
+                and hook.requires & other.provides
+                for other in remaining
+            )
+        ]
+        if not wave:
+            names = ", ".join(hook.func.__name__ for hook in remaining)
+            raise ValueError(f"Functions depend on each other in a cycle: {names}")
+        waves.append(wave)
+        done.update(wave)
+        remaining = [hook for hook in remaining if hook not in done]
+    return waves
+
+
+def _parallel(step, data):
+    """Calls functions at the same time, each with its own copy of `data`,
+    coroutine functions on the event loop and others in the thread pool.
+
+    :returns: the results, in the order of `step`
+    :rtype: list
+    """
+    futures = []
+    for hook in step:
+        if inspect.iscoroutinefunction(hook.func):
+            futures.append(
+                asyncio.run_coroutine_threadsafe(hook.func(dict(data)), event_loop())
+            )
+        else:
+            futures.append(executor().submit(call, hook.func, dict(data)))
+    return [future.result() for future in futures]
+
+
+def register(registered, name, func, requires=None, provides=None, deterministic=True):
+    """Adds a function to the functions registered for a workflow.
+
+    :param dict registered: Functions by workflow name
+    :param str name: Name of the workflow
+    :param func: The function
+    :param requires: (optional) Keys of ``data`` the function reads
+    :param provides: (optional) Keys the function returns
+    :param bool deterministic: (optional) ``False`` if the function could
+        return something else for the same data
+    """
+    hooklist = registered.setdefault(name, HookList())
+    hooklist.add(Hook(func, requires, provides, deterministic))
+    # Fail when the application is loaded, not when it is run
+    hooklist.steps()
@@ -6,7 +6,10 @@ Reads jobbergateconfig and declares functions neede for both web and cli
 version.
 """
 
+import contextvars
 import importlib
+import threading
+from collections import OrderedDict
 import os
 import sys
 import yaml
@@ -33,6 +36,10 @@ else:
         jobbergateconfig = {}
         sys.exit(1)
 
+#: The :class:`jobbergate.registry.Application` that is currently being
+#: loaded. ``appform.workflow`` and ``workflow.logic`` register into it.
+loading = contextvars.ContextVar("loading", default=None)
+
 
 def fullpath_import(path, lib):
     """Imports a file from absolute path.
@@ -48,3 +55,177 @@ def fullpath_import(path, lib):
     finally:
         sys.path.remove(f"{jobbergateconfig['apps']['path']}/{path}/")
     return module
+
+
+def usercachedir(name):
+    """Returns a directory only the current user could access, in
+    ``XDG_CACHE_HOME`` or ``~/.cache``, created if needed.
+
+    :param str name: Name of the directory in ``jobbergate/``
+    :rtype: str
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    directory = os.path.join(base, "jobbergate", name)
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    return directory
+
+
+def _readonly(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only, copy it first")
+
+
+class FrozenDict(dict):
+    """A dict that can't be changed.
+
+    Copies, also with :func:`copy.copy`, :func:`copy.deepcopy` and
+    :mod:`pickle`, are plain dicts, and it is serialized as JSON like any
+    dict."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __ior__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+
+    def __reduce_ex__(self, protocol):
+        return dict, (dict(self),)
+
+
+class FrozenList(list):
+    """A list that can't be changed, copied like :class:`FrozenDict` as a
+    plain list."""
+
+    __slots__ = ()
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _readonly
+    append = clear = extend = insert = pop = remove = reverse = sort = _readonly
+
+    def __reduce_ex__(self, protocol):
+        return list, (list(self),)
+
+
+def freeze(value):
+    """Returns an immutable version of parsed YAML, with dicts as
+    :class:`FrozenDict` and lists as :class:`FrozenList`.
+
+    :param value: Parsed YAML
+    """
+    if isinstance(value, dict):
+        return FrozenDict((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return FrozenList(freeze(item) for item in value)
+    return value
+
+
+class ConfigCache:
+    """Parsed YAML files, parsed again only when they change on disk.
+
+    Files are handed out frozen, see :func:`freeze`, so the same parsed
+    content could be shared by all requests without copying."""
+
+    def __init__(self):
+        self.parses = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, filename, default=None):
+        """Returns the frozen content of a YAML file.
+
+        :param str filename: The YAML file
+        :param default: (optional) Returned if the file doesn't exist
+        """
+        try:
+            stat = os.stat(filename)
+        except FileNotFoundError:
+            self._entries.pop(filename, None)
+            return default
+        signature = (stat.st_mtime_ns, stat.st_size)
+        entry = self._entries.get(filename)
+        if entry is not None and entry[0] == signature:
+            return entry[1]
+        with self._lock:
+            entry = self._entries.get(filename)
+            if entry is None or entry[0] != signature:
+                with open(filename) as ymlfile:
+                    entry = (signature, freeze(yaml.safe_load(ymlfile)))
+                self._entries[filename] = entry
+                self.parses += 1
+        return entry[1]
+
+
+#: Parsed ``jobbergate.yaml`` and ``config.yaml`` of applications
+configcache = ConfigCache()
+_jobbergateconfig = freeze(jobbergateconfig)
+
+
+def read_config(application):
+    """Returns the data every run of an application starts with.
+
+    The configuration is shared between runs and read-only, applications that
+    want to change parts of it must copy them first.
+
+    :param application: Name of the application
+    :returns: ``jobbergateconfig`` and the application's ``config.yaml``
+    :rtype: dict
+    """
+    data = {}
+    data["jobbergateconfig"] = configcache.get(
+        f"{jobbergatepath}/jobbergate.yaml", _jobbergateconfig
+    )
+    data.update(
+        configcache.get(
+            f"{jobbergateconfig['apps']['path']}/{application}/config.yaml"
+        )
+        or {}
+    )
+    return data
+
+
+class LRUCache:
+    """A thread safe dict that forgets the least recently used entries.
+
+    :param int maxsize: Maximum number of entries
+    """
+
+    def __init__(self, maxsize=256):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        """Returns the value for `key`, or `default` if not cached."""
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return default
+            self.hits += 1
+            return self._entries[key]
+
+    def set(self, key, value):
+        """Caches `value` for `key`."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def pop(self, key, default=None):
+        """Forgets `key` and returns its value."""
+        with self._lock:
+            return self._entries.pop(key, default)
+
+    def prune(self, predicate):
+        """Forgets the entries for which ``predicate(key, value)`` is true."""
+        with self._lock:
+            for key, value in list(self._entries.items()):
+                if predicate(key, value):
+                    del self._entries[key]
+
+    def clear(self):
+        """Forgets all entries."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,241 @@
+"""
+memoize
+=======
+
+Remembers the results of ``pre_``/``post_``-functions that compute data
+that rarely changes, like available partitions or allowed accounts:
+
+.. code-block:: python
+
+    @workflow.logic(ttl=3600)
+    def pre_(data):
+        return {"partitions": query_partitions()}
+
+    @workflow.logic(ttl=600, key=["username"])
+    def pre_accounts(data):
+        return {"accounts": query_accounts(data["username"])}
+
+Results are remembered for `ttl` seconds, separately for every value of the
+`key` keys in ``data``. They are kept as JSON, so they must be JSON
+serializable.
+
+By default results are kept in memory, per process. To share them between
+all uwsgi workers and cli runs, keep them in SQLite:
+
+.. code-block:: yaml
+
+    memoize:
+      backend: sqlite    # memory or sqlite
+      path: /var/tmp/jobbergate-memoize.sqlite
+      maxsize: 1024      # entries kept in memory
+
+Results are forgotten with :func:`invalidate`, the ``invalidate`` attribute
+of the decorated function or ``flask jobbergate invalidate``."""
+
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections.abc import Mapping
+from functools import wraps
+
+from jobbergate.lib import LRUCache, jobbergateconfig, usercachedir
+
+
+def _jsonable(value):
+    if isinstance(value, Mapping):
+        return dict(value)
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class MemoryBackend:
+    """Keeps results in the memory of the process.
+
+    :param int maxsize: (optional) Maximum number of results
+    """
+
+    def __init__(self, maxsize=1024):
+        self._entries = LRUCache(maxsize)
+
+    def get(self, key):
+        """Returns a result as JSON, or ``None`` if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires, _, value = entry
+        if expires < time.time():
+            self._entries.pop(key)
+            return None
+        return value
+
+    def set(self, key, namespace, value, expires):
+        """Keeps a JSON result until `expires`."""
+        self._entries.set(key, (expires, namespace, value))
+
+    def invalidate(self, namespace=""):
+        """Forgets all results with a namespace starting with `namespace`."""
+        self._entries.prune(lambda key, entry: entry[1].startswith(namespace))
+
+
+class SQLiteBackend:
+    """Keeps results in a SQLite database shared by all processes.
+
+    :param str path: (optional) The database file, by default only
+        accessible by the current user
+    """
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(usercachedir("memoize"), "memoize.sqlite")
+            # Results could be private, like a user's accounts
+            os.close(os.open(path, os.O_CREAT | os.O_WRONLY, 0o600))
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS memoize "
+                "(key TEXT PRIMARY KEY, namespace TEXT, expires REAL, value TEXT)"
+            )
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, key):
+        connection = self._connect()
+        try:
+            row = connection.execute(
+                "SELECT value FROM memoize WHERE key = ? AND expires >= ?",
+                (key, time.time()),
+            ).fetchone()
+        finally:
+            connection.close()
+        return row[0] if row else None
+
+    def set(self, key, namespace, value, expires):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "INSERT OR REPLACE INTO memoize VALUES (?, ?, ?, ?)",
+                    (key, namespace, expires, value),
+                )
+                connection.execute(
+                    "DELETE FROM memoize WHERE expires < ?", (time.time(),)
+                )
+        finally:
+            connection.close()
+
+    def invalidate(self, namespace=""):
+        connection = self._connect()
+        try:
+            with connection:
+                connection.execute(
+                    "DELETE FROM memoize WHERE substr(namespace, 1, ?) = ?",
+                    (len(namespace), namespace),
+                )
+        finally:
+            connection.close()
+
+
+backends = {"memory": MemoryBackend, "sqlite": SQLiteBackend}
+
+_backend = None
+_lock = threading.Lock()
+
+
+def from_config(config):
+    """Creates the backend configured in `config`.
+
+    :param dict config: ``jobbergate.yaml`` configuration
+    """
+    options = dict(config.get("memoize") or {})
+    backend = options.pop("backend", "memory")
+    if backend not in backends:
+        raise ValueError(f"Unknown memoize backend {backend!r}")
+    if backend == "sqlite":
+        options.pop("maxsize", None)
+    return backends[backend](**options)
+
+
+def get_backend():
+    """Returns the backend configured in ``jobbergate.yaml``, created on
+    first use."""
+    global _backend
+    if _backend is None:
+        with _lock:
+            if _backend is None:
+                _backend = from_config(jobbergateconfig)
+    return _backend
+
+
+def _namespace(application, function=None):
+    if function is None:
+        return f"{application}:"
+    return f"{application}:{function}:"
+
+
+def memoize(func, ttl, key=(), application=""):
+    """Wraps a ``pre_``/``post_``-function so its results are remembered.
+
+    :param func: The function, plain or coroutine function
+    :param float ttl: Seconds to remember a result
+    :param list[str] key: (optional) Keys of ``data`` results depend on
+    :param str application: (optional) Name of the application
+    :returns: the wrapped function, with an ``invalidate()`` method
+    """
+    namespace = _namespace(application, func.__name__)
+
+    def cachekey(data):
+        values = json.dumps(
+            [data.get(name) for name in key], sort_keys=True, default=_jsonable
+        )
+        return namespace + hashlib.sha256(values.encode()).hexdigest()
+
+    def remember(cached, result):
+        get_backend().set(
+            cached,
+            namespace,
+            json.dumps(result, default=_jsonable),
+            time.time() + ttl,
+        )
+        return result
+
+    if inspect.iscoroutinefunction(func):
+
+        @wraps(func)
+        async def memoized(data):
+            cached = cachekey(data)
+            value = get_backend().get(cached)
+            if value is not None:
+                return json.loads(value)
+            return remember(cached, await func(data))
+
+    else:
+
+        @wraps(func)
+        def memoized(data):
+            cached = cachekey(data)
+            value = get_backend().get(cached)
+            if value is not None:
+                return json.loads(value)
+            return remember(cached, func(data))
+
+    memoized.invalidate = lambda: get_backend().invalidate(namespace)
+    return memoized
+
+
+def invalidate(application="", function=None):
+    """Forgets remembered results.
+
+    :param str application: (optional) Only results of this application
+    :param str function: (optional) Only results of the function with this
+        name
+    """
+    if not application:
+        get_backend().invalidate()
+    else:
+        get_backend().invalidate(_namespace(application, function))
@@ -3,6 +3,8 @@
 
 from flask_login import UserMixin
 
+from jobbergate import db
+
 
 class User(UserMixin):
     def __init__(self, dn, username, data):
@@ -15,3 +17,12 @@ class User(UserMixin):
 
     def get_id(self):
         return self.dn
+
+
+class AnswerDelta(db.Model):
+    """Answers changed in one step of a web questionnaire."""
+
+    id = db.Column(db.Integer, primary_key=True)
+    answers = db.Column(db.String(32), index=True, nullable=False)
+    created = db.Column(db.Float, nullable=False)
+    delta = db.Column(db.Text, nullable=False)
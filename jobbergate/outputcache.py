@@ -0,0 +1,254 @@
+"""
+outputcache
+===========
+
+Keeps rendered scripts on disk, so answer sets that were rendered before, for
+example a resubmitted job or a CI pipeline that runs the same answer file
+again, aren't rendered again. The cache is off unless it is configured in
+``jobbergate.yaml``:
+
+.. code-block:: yaml
+
+    render_cache:
+      path: /var/tmp/jobbergate-render   # true for a per-user directory
+      maxsize: 268435456                 # bytes, 256 MB by default
+
+Scripts are kept by the application, a hash of the template source and the
+final ``data``, after all ``pre_``/``post_``-functions ran, so changing the
+template or any answer renders again. When the scripts in the directory grow
+beyond `maxsize` the least recently used are removed.
+
+Applications with ``pre_``/``post_``-functions that return different data
+every time, for example a unique job name or the current time, would only
+fill the cache with scripts that are never used again. Marking such a
+function with ``deterministic=False`` leaves the application out of the
+cache:
+
+.. code-block:: python
+
+    @workflow.logic(deterministic=False)
+    def post_(data):
+        return {"jobname": f"run-{uuid.uuid4()}"}
+
+Streamed output, ``jinja: stream:``, isn't cached."""
+
+import hashlib
+import json
+import os
+import threading
+from collections.abc import Mapping
+
+from jobbergate import render
+from jobbergate.lib import LRUCache, jobbergateconfig, usercachedir
+
+_cache = None
+_lock = threading.Lock()
+_sources = LRUCache(1024)
+
+
+def canonical(value):
+    """Converts `value` to JSON types that tell apart what renders
+    differently: lists, tuples and sets are tagged, and ``1``, ``1.0`` and
+    ``True`` stay different.
+
+    :param value: The value, usually all data
+    :raises TypeError: if `value` contains objects that aren't plain data, or
+        mappings with keys that aren't strings
+    """
+    if value is None or isinstance(value, (str, bool, int, float)):
+        return value
+    if isinstance(value, Mapping):
+        if not all(isinstance(key, str) for key in value):
+            raise TypeError("Only mappings with str keys could be cached")
+        return {key: canonical(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [0] + [canonical(item) for item in value]
+    if isinstance(value, tuple):
+        return [1] + [canonical(item) for item in value]
+    if isinstance(value, (set, frozenset)):
+        return [2] + sorted(
+            json.dumps(canonical(item), sort_keys=True) for item in value
+        )
+    raise TypeError(f"Objects of type {type(value).__name__} could not be cached")
+
+
+def source_hash(filename):
+    """Returns the SHA-256 of a template's source, kept until the file
+    changes.
+
+    :param str filename: The template file
+    :rtype: str
+    """
+    stat = os.stat(filename)
+    key = (filename, stat.st_mtime_ns, stat.st_size)
+    digest = _sources.get(key)
+    if digest is None:
+        with open(filename, "rb") as source:
+            digest = hashlib.sha256(source.read()).hexdigest()
+        _sources.set(key, digest)
+    return digest
+
+
+def output_key(application, template, data):
+    """Returns the key a rendered script is kept by.
+
+    :param str application: Name of the application
+    :param jinja2.Template template: The template
+    :param dict data: All data
+    :rtype: str
+    :raises TypeError: if `data` couldn't be cached, see :func:`canonical`
+    """
+    content = json.dumps(
+        [application, source_hash(template.filename), canonical(data)],
+        sort_keys=True,
+        separators=(",", ":"),
+    )
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class OutputCache:
+    """Rendered scripts in a directory, one file per script.
+
+    :param str path: The directory
+    :param int maxsize: (optional) Total size in bytes of the scripts kept
+    """
+
+    def __init__(self, path, maxsize=256 * 2**20):
+        self.path = path
+        self.maxsize = maxsize
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        self._size = None
+        self._lock = threading.Lock()
+
+    def _filename(self, key):
+        return os.path.join(self.path, key)
+
+    def get(self, key):
+        """Returns a script, or ``None`` if it isn't kept.
+
+        :param str key: The key, see :func:`output_key`
+        :rtype: str
+        """
+        filename = self._filename(key)
+        try:
+            with open(filename, encoding="utf-8", newline="") as scriptfile:
+                script = scriptfile.read()
+            # Recently used
+            os.utime(filename)
+        except FileNotFoundError:
+            return None
+        return script
+
+    def set(self, key, script):
+        """Keeps a script, and removes the least recently used if the cache
+        grows beyond `maxsize`.
+
+        :param str key: The key, see :func:`output_key`
+        :param str script: The rendered script
+        """
+        filename = self._filename(key)
+        tmpfile = f"{filename}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmpfile, "w", encoding="utf-8", newline="") as scriptfile:
+            scriptfile.write(script)
+        size = os.stat(tmpfile).st_size
+        os.replace(tmpfile, filename)
+        with self._lock:
+            if self._size is None:
+                self._size = self.evict()
+            else:
+                self._size += size
+                if self._size > self.maxsize:
+                    self._size = self.evict()
+
+    def evict(self):
+        """Removes the least recently used scripts until the rest fit in
+        `maxsize`. Other processes could share the directory, so the sizes
+        are read from it.
+
+        :returns: the total size of the scripts left
+        :rtype: int
+        """
+        entries = []
+        with os.scandir(self.path) as scan:
+            for entry in scan:
+                if entry.name.endswith(".tmp"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.maxsize:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+    def clear(self):
+        """Removes all scripts."""
+        with self._lock:
+            with os.scandir(self.path) as scan:
+                for entry in scan:
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
+            self._size = 0
+
+
+def from_config(config):
+    """Creates the cache configured in `config`.
+
+    :param dict config: ``jobbergate.yaml`` configuration
+    :returns: the cache or ``None`` if not configured
+    :rtype: OutputCache
+    """
+    options = dict(config.get("render_cache") or {})
+    path = options.pop("path", None)
+    if not path:
+        return None
+    if path is True:
+        path = usercachedir("render")
+    return OutputCache(path, **options)
+
+
+def get_cache():
+    """Returns the cache configured in ``jobbergate.yaml``, created on first
+    use, or ``None`` if not configured.
+
+    :rtype: OutputCache
+    """
+    global _cache
+    if _cache is None:
+        with _lock:
+            if _cache is None:
+                _cache = from_config(jobbergateconfig) or False
+    return _cache or None
+
+
+def rendered(application, template, data):
+    """Renders a template with `data`, or returns the script rendered before
+    from the same template and data.
+
+    :param jobbergate.registry.Application application: The application
+    :param jinja2.Template template: The template
+    :param dict data: All data
+    :rtype: str
+    """
+    cache = get_cache()
+    if cache is None or not application.deterministic or template.filename is None:
+        return render.render(template, data)
+    try:
+        key = output_key(application.name, template, data)
+    except TypeError:
+        return render.render(template, data)
+    script = cache.get(key)
+    if script is None:
+        script = render.render(template, data)
+        cache.set(key, script)
+    return script
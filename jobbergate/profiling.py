@@ -0,0 +1,246 @@
+"""
+profiling
+=========
+
+Times the phases of a web request or cli run: loading the application,
+reading configuration, pre_/post_-functions, creating questions, generating
+forms and rendering the template.
+
+Timings of the current request are sent as a ``Server-Timing`` header, and
+all timings are collected per application and phase. ``/metrics`` publishes
+them in Prometheus text format to anyone who could reach the server, so it
+is off unless it is turned on in ``jobbergate.yaml``:
+
+.. code-block:: yaml
+
+    profiling:
+      server_timing: false
+      metrics: true
+
+Requests for applications that don't exist are collected as application
+``unknown``.
+
+The cli prints the timings of a run with ``--profile``.
+
+Metrics are kept per process, so with several uwsgi workers every scrape
+only sees one of them."""
+
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+from jobbergate.catalog import catalog
+from jobbergate.lib import jobbergateconfig
+from jobbergate.registry import registry
+
+#: Upper bounds, in seconds, of the histogram buckets
+buckets = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+_recorder = contextvars.ContextVar("recorder", default=None)
+_histograms = {}
+_lock = threading.Lock()
+
+
+class Recorder:
+    """Timings of one request or cli run.
+
+    :param str application: Name of the application
+    """
+
+    def __init__(self, application):
+        self.application = application
+        self.timings = []
+
+    def totals(self):
+        """Returns the total time of every phase, in the order first seen.
+
+        :rtype: dict
+        """
+        totals = {}
+        for name, seconds in self.timings:
+            totals[name] = totals.get(name, 0) + seconds
+        return totals
+
+
+def start(application):
+    """Starts recording timings for `application` in the current context.
+
+    :param str application: Name of the application
+    :rtype: Recorder
+    """
+    recorder = Recorder(application)
+    _recorder.set(recorder)
+    return recorder
+
+
+def current():
+    """Returns the recorder of the current context, if any.
+
+    :rtype: Recorder
+    """
+    return _recorder.get()
+
+
+def observe(application, name, seconds):
+    """Adds a timing to the metrics.
+
+    :param str application: Name of the application
+    :param str name: Name of the phase
+    :param float seconds: Time spent
+    """
+    with _lock:
+        histogram = _histograms.setdefault(
+            (application, name), [[0] * len(buckets), 0, 0.0]
+        )
+        for index, bound in enumerate(buckets):
+            if seconds <= bound:
+                histogram[0][index] += 1
+        histogram[1] += 1
+        histogram[2] += seconds
+
+
+@contextmanager
+def phase(name):
+    """Times the code in the with-block as phase `name`.
+
+    Does nothing unless recording is started with :func:`start`.
+
+    :param str name: Name of the phase
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        recorder.timings.append((name, seconds))
+        observe(recorder.application, name, seconds)
+
+
+def server_timing(recorder):
+    """Formats timings as a ``Server-Timing`` header value.
+
+    :param Recorder recorder: The timings
+    :rtype: str
+    """
+    return ", ".join(
+        f"{name};dur={seconds * 1000:.2f}"
+        for name, seconds in recorder.totals().items()
+    )
+
+
+def report(recorder):
+    """Formats timings as a table for the cli.
+
+    :param Recorder recorder: The timings
+    :rtype: str
+    """
+    totals = recorder.totals()
+    total = sum(totals.values())
+    lines = [f"{'Phase':<12}{'Seconds':>10}{'%':>7}"]
+    for name, seconds in totals.items():
+        share = 100 * seconds / total if total else 0
+        lines.append(f"{name:<12}{seconds:>10.4f}{share:>7.1f}")
+    lines.append(f"{'total':<12}{total:>10.4f}")
+    return "\n".join(lines)
+
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def metrics():
+    """Returns all collected metrics in Prometheus text format.
+
+    :rtype: str
+    """
+    lines = [
+        "# HELP jobbergate_phase_seconds Time spent in each phase",
+        "# TYPE jobbergate_phase_seconds histogram",
+    ]
+    with _lock:
+        histograms = sorted(
+            (key, ([*counts], count, total))
+            for key, (counts, count, total) in _histograms.items()
+        )
+    for (application, name), (counts, count, total) in histograms:
+        labels = f'application="{_label(application)}",phase="{_label(name)}"'
+        for bound, bucketcount in zip(buckets, counts):
+            lines.append(
+                f'jobbergate_phase_seconds_bucket{{{labels},le="{bound}"}} {bucketcount}'
+            )
+        lines.append(f'jobbergate_phase_seconds_bucket{{{labels},le="+Inf"}} {count}')
+        lines.append(f"jobbergate_phase_seconds_sum{{{labels}}} {total}")
+        lines.append(f"jobbergate_phase_seconds_count{{{labels}}} {count}")
+
+    stats = registry.stats()
+    lines.extend(
+        [
+            "# HELP jobbergate_registry_lookups_total Application registry lookups",
+            "# TYPE jobbergate_registry_lookups_total counter",
+        ]
+        + [
+            f'jobbergate_registry_lookups_total{{result="{result}"}} {stats[key]}'
+            for result, key in (
+                ("hit", "hits"),
+                ("miss", "misses"),
+                ("reload", "reloads"),
+            )
+        ]
+        + [
+            "# HELP jobbergate_registry_loaded Loaded applications",
+            "# TYPE jobbergate_registry_loaded gauge",
+            f"jobbergate_registry_loaded {stats['loaded']}",
+        ]
+    )
+    return "\n".join(lines) + "\n"
+
+
+def application_label(name):
+    """Returns the application to collect the timings of a request for
+    application `name` under, ``unknown`` if there is no such application.
+
+    :param str name: Name of the application in the URL
+    :rtype: str
+    """
+    if not name:
+        return ""
+    if name.startswith(".") or not catalog.exists(name):
+        return "unknown"
+    return name
+
+
+def init_app(app):
+    """Adds timing of requests, the ``Server-Timing`` header and ``/metrics``
+    to a Flask app.
+
+    :param flask.Flask app: The app
+    """
+    from flask import Response, request
+
+    options = jobbergateconfig.get("profiling") or {}
+
+    @app.before_request
+    def start_recording():
+        name = (request.view_args or {}).get("application_name", "")
+        start(application_label(name))
+
+    if options.get("server_timing", True):
+
+        @app.after_request
+        def add_server_timing(response):
+            recorder = current()
+            if recorder is not None and recorder.timings:
+                response.headers["Server-Timing"] = server_timing(recorder)
+            return response
+
+    if options.get("metrics", False):
+
+        def metrics_endpoint():
+            return Response(metrics(), mimetype="text/plain; version=0.0.4")
+
+        app.add_url_rule("/metrics", "metrics", metrics_endpoint)
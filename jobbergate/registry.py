@@ -0,0 +1,209 @@
+"""
+registry
+========
+
+Keeps the ``views.py`` and ``controller.py`` of every application loaded once
+and hands out the cached modules. An application is only reloaded when the
+modification time or size of one of its source files changes."""
+
+import importlib.util
+import os
+import sys
+import threading
+from types import MappingProxyType
+
+from jobbergate.lib import jobbergateconfig, loading
+
+
+class Application:
+    """A loaded application with its own module namespace.
+
+    Workflows and pre/post functions are registered here while the
+    application is loaded, and are read-only afterwards so one application
+    could be shared by many threads.
+
+    :param str name: Name of the application
+    :param tuple signature: ``(mtime, size)`` of the loaded source files
+    """
+
+    def __init__(self, name, signature=None):
+        self.name = name
+        self.signature = signature
+        #: Helper modules the application imported from its directory
+        self.helpers = {}
+        self.views = None
+        self.controller = None
+        self.workflows = {}
+        self.prefuncs = {}
+        self.postfuncs = {}
+
+    def freeze(self):
+        """Makes the registered workflows and functions read-only."""
+        self.workflows = MappingProxyType(self.workflows)
+        self.prefuncs = MappingProxyType(self.prefuncs)
+        self.postfuncs = MappingProxyType(self.postfuncs)
+
+    @property
+    def deterministic(self):
+        """``False`` if any ``pre_``/``post_``-function is marked
+        non-deterministic, see :func:`jobbergate.workflow.logic`."""
+        return all(
+            hooklist.deterministic
+            for registered in (self.prefuncs, self.postfuncs)
+            for hooklist in registered.values()
+        )
+
+    def __repr__(self):
+        return f"<Application {self.name}>"
+
+
+class ApplicationRegistry:
+    """Cache of loaded applications.
+
+    :param str path: (optional) Directory with all applications, defaults to
+        ``apps: path:`` from ``jobbergate.yaml``
+    """
+
+    sources = ("views", "controller")
+
+    def __init__(self, path=None):
+        self._path = path
+        self._applications = {}
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.reloads = 0
+
+    @property
+    def path(self):
+        return self._path or jobbergateconfig["apps"]["path"]
+
+    def _signature(self, name, helpers=()):
+        """Returns ``(mtime, size)`` for each source file, and each file of
+        `helpers`, ``None`` if missing."""
+        filenames = [os.path.join(self.path, name, f"{lib}.py") for lib in self.sources]
+        signature = []
+        for filename in filenames + list(helpers):
+            try:
+                stat = os.stat(filename)
+                signature.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                signature.append(None)
+        return tuple(signature)
+
+    def _exec(self, name, lib):
+        """Executes ``<lib>.py`` of application `name` as a new module."""
+        filename = os.path.join(self.path, name, f"{lib}.py")
+        modulename = f"jobbergate.apps.{name}.{lib}"
+        spec = importlib.util.spec_from_file_location(modulename, filename)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[modulename] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[modulename]
+            raise
+        return module
+
+    def _load(self, name, signature):
+        """Loads an application, collecting everything it registers.
+
+        Helper modules the application imports from its own directory are
+        taken out of ``sys.modules`` again, so applications with helpers of
+        the same name each get their own."""
+        viewsig, controllersig = signature[:2]
+        if viewsig is None:
+            raise ModuleNotFoundError(
+                f"No module named 'views' in application {name}", name="views"
+            )
+
+        appdir = os.path.join(self.path, name)
+        application = Application(name, signature)
+        token = loading.set(application)
+        # Let the application import helper modules from its own directory
+        sys.path.append(appdir)
+        before = set(sys.modules)
+        try:
+            application.views = self._exec(name, "views")
+            if controllersig is not None:
+                application.controller = self._exec(name, "controller")
+        finally:
+            sys.path.remove(appdir)
+            loading.reset(token)
+            application.helpers = self._purge(name, appdir, before)
+        application.signature = self._signature(name, self._helperfiles(application))
+        application.freeze()
+        return application
+
+    @staticmethod
+    def _purge(name, appdir, before):
+        """Removes the modules imported from `appdir` since `before` from
+        ``sys.modules``, and returns them."""
+        prefix = os.path.join(os.path.abspath(appdir), "")
+        helpers = {}
+        for modulename in set(sys.modules) - before:
+            if modulename.startswith(f"jobbergate.apps.{name}."):
+                continue
+            filename = getattr(sys.modules[modulename], "__file__", None) or ""
+            if os.path.abspath(filename).startswith(prefix):
+                helpers[modulename] = sys.modules.pop(modulename)
+        return helpers
+
+    @staticmethod
+    def _helperfiles(application):
+        return sorted(module.__file__ for module in application.helpers.values())
+
+    def get(self, name):
+        """Returns the application `name`, loading or reloading it if needed.
+
+        :param str name: Name of the application
+        :returns: The loaded application
+        :rtype: Application
+        """
+        application = self._applications.get(name)
+        helpers = self._helperfiles(application) if application is not None else ()
+        signature = self._signature(name, helpers)
+        if application is not None and application.signature == signature:
+            self.hits += 1
+            return application
+
+        with self._lock:
+            # Another thread could have loaded it while we waited
+            application = self._applications.get(name)
+            if application is not None and application.signature == signature:
+                self.hits += 1
+                return application
+            if application is None:
+                self.misses += 1
+            else:
+                self.reloads += 1
+            application = self._load(name, signature)
+            self._applications[name] = application
+            return application
+
+    def invalidate(self, name=None):
+        """Forgets one or all loaded applications.
+
+        :param str name: (optional) Application to forget, all if omitted
+        """
+        with self._lock:
+            if name is None:
+                self._applications.clear()
+            else:
+                self._applications.pop(name, None)
+
+    def stats(self):
+        """Returns the cache counters.
+
+        :returns: hits, misses, reloads and number of loaded applications
+        :rtype: dict
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "reloads": self.reloads,
+            "loaded": len(self._applications),
+        }
+
+
+registry = ApplicationRegistry()
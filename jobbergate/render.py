@@ -0,0 +1,388 @@
+"""
+render
+======
+
+Keeps one Jinja2 environment per template directory so templates are only
+parsed and compiled once. Compiled templates could also be shared between
+processes with an on-disk bytecode cache, configured in ``jobbergate.yaml``:
+
+.. code-block:: yaml
+
+    jinja:
+      bytecode_cache: /var/tmp/jobbergate-jinja
+
+``bytecode_cache: true`` uses a per-user directory in the system temp
+directory.
+
+Large templates could be split in ``{% block %}``'s and rendered
+incrementally: the output of every block is cached, and only blocks that
+read answers that changed are rendered again.
+
+.. code-block:: yaml
+
+    jinja:
+      incremental: true
+      block_cache: 1024   # number of cached block outputs
+
+A block is only cached if everything it reads comes from ``data``. Scoped
+blocks and blocks with ``include`` or ``import`` are always rendered.
+
+Very large output could be streamed, to the web response or the cli output
+file, instead of being rendered to one string first:
+
+.. code-block:: yaml
+
+    jinja:
+      stream: true
+      stream_buffer: 65536   # characters per chunk
+
+The templates of every application are listed once, and again only when the
+modification time of its template directory changes, see :func:`templates`.
+
+Several templates of an application, for example the prepare, compute and
+postprocess scripts of a pipeline, could be rendered from the same answers in
+one pass with :func:`render_many`. The templates are loaded and rendered in a
+thread pool:
+
+.. code-block:: yaml
+
+    jinja:
+      workers: 4   # defaults to the number of CPUs
+"""
+
+import os
+import threading
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from itertools import repeat
+from pathlib import Path
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, nodes
+
+from jobbergate.appform import fingerprint
+from jobbergate.catalog import read_templates
+from jobbergate.lib import LRUCache, jobbergateconfig
+
+_environments = {}
+_templates = {}
+_lock = threading.Lock()
+
+#: Rendered output of template blocks, see :func:`render`
+blockcache = LRUCache(
+    maxsize=(jobbergateconfig.get("jinja") or {}).get("block_cache", 1024)
+)
+_dependencies = LRUCache()
+
+# Variables that are always there, or set by jinja itself
+_builtins = {"loop", "varargs", "kwargs", "caller"}
+# Blocks with these nodes depend on more than data
+_uncacheable = (nodes.Include, nodes.Import, nodes.FromImport)
+_missing = object()
+
+#: Value of ``template`` that selects all templates of an application
+alltemplates = "*"
+
+
+def templatedir(application):
+    """Returns the template directory of an application.
+
+    :param str application: Name of the application
+    :returns: path to the template directory
+    :rtype: str
+    """
+    return f"{jobbergateconfig['apps']['path']}/{application}/templates/"
+
+
+def templates(application):
+    """Lists the templates of an application, cached until its template
+    directory changes.
+
+    :param str application: Name of the application
+    :returns: names of the templates
+    :rtype: tuple[str]
+    """
+    directory = templatedir(application)
+    try:
+        mtime = os.stat(directory).st_mtime_ns
+    except FileNotFoundError:
+        return ()
+    cached = _templates.get(directory)
+    if cached is None or cached[0] != mtime:
+        appdir = os.path.join(jobbergateconfig["apps"]["path"], application)
+        cached = (mtime, tuple(read_templates(appdir)))
+        _templates[directory] = cached
+    return cached[1]
+
+
+def default_template(application, data):
+    """Returns the template to render if none is chosen: ``default_template``
+    from `data`, ``job_template.j2`` or the only template of the application.
+
+    :param str application: Name of the application
+    :param dict data: All data
+    :rtype: str
+    """
+    if data.get("default_template"):
+        return data["default_template"]
+    found = templates(application)
+    if len(found) == 1 and "job_template.j2" not in found:
+        return found[0]
+    return "job_template.j2"
+
+
+def bytecode_cache():
+    """Creates the bytecode cache configured in ``jobbergate.yaml``.
+
+    :returns: the bytecode cache or ``None`` if not configured
+    :rtype: jinja2.FileSystemBytecodeCache
+    """
+    directory = (jobbergateconfig.get("jinja") or {}).get("bytecode_cache")
+    if not directory:
+        return None
+    if directory is True:
+        return FileSystemBytecodeCache()
+    os.makedirs(directory, exist_ok=True)
+    return FileSystemBytecodeCache(directory)
+
+
+def get_environment(directory):
+    """Returns the shared environment for a template directory.
+
+    Templates are reloaded automatically when they change on disk.
+
+    :param str directory: Directory with templates
+    :rtype: jinja2.Environment
+    """
+    directory = os.path.abspath(directory)
+    environment = _environments.get(directory)
+    if environment is None:
+        with _lock:
+            environment = _environments.get(directory)
+            if environment is None:
+                environment = Environment(
+                    loader=FileSystemLoader(directory),
+                    auto_reload=True,
+                    bytecode_cache=bytecode_cache(),
+                )
+                _environments[directory] = environment
+    return environment
+
+
+def get_template(directory, template):
+    """Returns a compiled template.
+
+    :param str directory: Directory with templates
+    :param str template: Name of template in `directory`
+    :rtype: jinja2.Template
+    """
+    return get_environment(directory).get_template(template)
+
+
+def template_path(application, data, templatefile=None):
+    """Finds the template to render.
+
+    :param string application: Name of the application
+    :param dict data: All data, could select template with ``template`` or
+        ``default_template``, see :func:`default_template`
+    :param string templatefile: (optional) Full path to a template file
+        that overrides the application's templates
+    :returns: template directory and template name
+    :rtype: tuple(string, string)
+    """
+    if templatefile:
+        return str(Path(templatefile).parent), Path(templatefile).name
+    template = data.get("template", None) or default_template(application, data)
+    return templatedir(application), template
+
+
+def _reads(block, environment):
+    """Returns the keys of ``data`` that a block reads, ``None`` if it reads
+    all of ``data`` or ``False`` if the block can't be cached."""
+    if block.scoped or next(block.find_all(_uncacheable), None) is not None:
+        return False
+    keys = set()
+    keyed = set()
+    for node in block.find_all((nodes.Getattr, nodes.Getitem)):
+        if not isinstance(node.node, nodes.Name) or node.node.name != "data":
+            continue
+        if isinstance(node, nodes.Getattr) and not hasattr(dict, node.attr):
+            keys.add(node.attr)
+        elif isinstance(node, nodes.Getitem) and isinstance(node.arg, nodes.Const):
+            keys.add(node.arg.value)
+        else:
+            # data.items(), data[variable] and so on
+            continue
+        keyed.add(id(node.node))
+
+    assigned = {
+        name.name
+        for name in block.find_all(nodes.Name)
+        if name.ctx in ("store", "param")
+    }
+    for name in block.find_all(nodes.Name):
+        if name.ctx != "load" or name.name in assigned:
+            continue
+        if name.name in _builtins or name.name in environment.globals:
+            continue
+        if name.name == "data" and id(name) in keyed:
+            continue
+        # data as a whole, variables set outside the block, self and super
+        return None
+    return frozenset(keys)
+
+
+def block_dependencies(template):
+    """Finds the keys of ``data`` that every block of a template reads.
+
+    :param jinja2.Template template: The template
+    :returns: name of every block that could be cached, with the keys it
+        reads or ``None`` if it reads all of ``data``
+    :rtype: dict
+    """
+    dependencies = _dependencies.get(template)
+    if dependencies is None:
+        dependencies = {}
+        environment = template.environment
+        if template.name is not None and environment.loader is not None:
+            source, _, _ = environment.loader.get_source(environment, template.name)
+            ast = environment.parse(source, template.name)
+            for block in ast.find_all(nodes.Block):
+                keys = _reads(block, environment)
+                if keys is not False:
+                    dependencies[block.name] = keys
+        _dependencies.set(template, dependencies)
+    return dependencies
+
+
+def _cached_block(template, name, keys, block):
+    """Wraps a block render function with :data:`blockcache`."""
+
+    def cached(context):
+        data = context.resolve_or_missing("data")
+        if not isinstance(data, Mapping):
+            yield from block(context)
+            return
+        if keys is None:
+            key = (template, name, fingerprint(data))
+        else:
+            key = (
+                template,
+                name,
+                tuple((key, fingerprint(data.get(key, _missing))) for key in keys),
+            )
+        output = blockcache.get(key)
+        if output is None:
+            output = template.environment.concat(block(context))
+            blockcache.set(key, output)
+        yield output
+
+    return cached
+
+
+def _context(template, data):
+    """Creates the context to render `template` in, with the blocks that
+    could be cached wrapped if ``jinja: incremental:`` is set."""
+    context = template.new_context({"data": data})
+    if (jobbergateconfig.get("jinja") or {}).get("incremental"):
+        for name, keys in block_dependencies(template).items():
+            blocks = context.blocks.get(name)
+            if blocks:
+                blocks[0] = _cached_block(template, name, keys, blocks[0])
+    return context
+
+
+def render(template, data):
+    """Renders a template with `data`.
+
+    With ``jinja: incremental:`` blocks that only read answers that are the
+    same as in an earlier render are taken from :data:`blockcache`.
+
+    :param jinja2.Template template: The template
+    :param dict data: All data
+    :rtype: str
+    """
+    context = _context(template, data)
+    try:
+        return template.environment.concat(template.root_render_func(context))
+    except Exception:
+        return template.environment.handle_exception()
+
+
+def streaming():
+    """Checks if output should be streamed, ``jinja: stream:``.
+
+    :rtype: bool
+    """
+    return bool((jobbergateconfig.get("jinja") or {}).get("stream"))
+
+
+def generate(template, data, size=None):
+    """Renders a template with `data` in chunks, so the whole output never
+    has to be in memory.
+
+    :param jinja2.Template template: The template
+    :param dict data: All data
+    :param int size: (optional) Characters per chunk, defaults to
+        ``jinja: stream_buffer:`` or 65536
+    :returns: the output in chunks of about `size` characters
+    :rtype: iterator[str]
+    """
+    if size is None:
+        size = (jobbergateconfig.get("jinja") or {}).get("stream_buffer", 65536)
+    context = _context(template, data)
+    buffered = []
+    length = 0
+    try:
+        for chunk in template.root_render_func(context):
+            buffered.append(chunk)
+            length += len(chunk)
+            if length >= size:
+                yield "".join(buffered)
+                buffered = []
+                length = 0
+    except Exception:
+        template.environment.handle_exception()
+    if buffered:
+        yield "".join(buffered)
+
+
+def output_name(template):
+    """Returns the name of the file a template is rendered to: the name of
+    the template without ``.j2``, with ``.sh`` if that leaves no extension.
+
+    :param str template: Name of the template
+    :rtype: str
+    """
+    name = template[: -len(".j2")] if template.endswith(".j2") else template
+    return name if os.path.splitext(name)[1] else f"{name}.sh"
+
+
+def _render_template(directory, template, data):
+    return render(get_template(directory, template), data)
+
+
+def render_many(application, data, names=None, workers=None):
+    """Renders several templates of an application with the same `data`,
+    concurrently. `data` is shared between the templates and must not be
+    changed while they render.
+
+    :param str application: Name of the application
+    :param dict data: All data
+    :param list[str] names: (optional) Templates to render, defaults to all
+        templates of the application, see :func:`templates`
+    :param int workers: (optional) Number of threads, defaults to
+        ``jinja: workers:`` or the number of CPUs
+    :returns: the output by template name, in the order of `names`
+    :rtype: dict
+    :raises jinja2.TemplateNotFound: if a template doesn't exist
+    """
+    names = list(dict.fromkeys(names or templates(application)))
+    directory = templatedir(application)
+    if len(names) <= 1:
+        return {name: _render_template(directory, name, data) for name in names}
+    if workers is None:
+        workers = (jobbergateconfig.get("jinja") or {}).get("workers")
+    workers = min(workers or os.cpu_count() or 1, len(names))
+    with ThreadPoolExecutor(workers, thread_name_prefix="jobbergate-render") as pool:
+        outputs = pool.map(_render_template, repeat(directory), names, repeat(data))
+        return dict(zip(names, outputs))
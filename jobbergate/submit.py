@@ -0,0 +1,278 @@
+"""
+submit
+======
+
+Submits rendered scripts to a scheduler, in the background. Scripts are
+queued and submitted by a bounded pool of worker threads, failed submissions
+are retried with exponential backoff, and the job id of every submission is
+recorded.
+
+Submission is configured in ``jobbergate.yaml``:
+
+.. code-block:: yaml
+
+    submit:
+      backend: sbatch   # sbatch or local
+      workers: 4        # concurrent submissions
+      queue: 100        # submissions waiting for a worker
+      retries: 3
+      backoff: 1        # seconds before the first retry, doubled every retry
+      log: /var/log/jobbergate-jobs.jsonl
+
+Other options are passed to the backend, like ``command``, ``options`` and
+``timeout`` for :class:`SbatchBackend` and ``path`` and ``run`` for
+:class:`LocalBackend`, a stand-in for ``sbatch`` when testing.
+
+Scripts are submitted by the process running jobbergate. From the web,
+jobs therefore run as the account of the web service, not as the user
+logged in with LDAP."""
+
+import itertools
+import json
+import logging
+import os
+import secrets
+import subprocess
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from jobbergate.lib import LRUCache
+
+logger = logging.getLogger(__name__)
+
+
+class SubmitError(Exception):
+    """The scheduler didn't accept a script."""
+
+
+class QueueFull(Exception):
+    """All workers are busy and the queue is full."""
+
+
+class SbatchBackend:
+    """Submits scripts with Slurm's ``sbatch``.
+
+    :param str command: (optional) The ``sbatch`` command
+    :param list[str] options: (optional) Extra arguments to ``sbatch``
+    :param float timeout: (optional) Seconds to wait for ``sbatch``
+    """
+
+    def __init__(self, command="sbatch", options=(), timeout=60):
+        self.command = command
+        self.options = list(options)
+        self.timeout = timeout
+
+    def submit(self, script):
+        """Submits a script.
+
+        :param str script: The script
+        :returns: job id
+        :rtype: str
+        """
+        try:
+            result = subprocess.run(
+                [self.command, "--parsable"] + self.options,
+                input=script,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                universal_newlines=True,
+                timeout=self.timeout,
+            )
+        except subprocess.TimeoutExpired:
+            raise SubmitError(f"{self.command} timed out after {self.timeout}s")
+        if result.returncode != 0:
+            raise SubmitError(result.stderr.strip() or f"exit code {result.returncode}")
+        # --parsable prints "jobid" or "jobid;cluster"
+        return result.stdout.strip().split(";")[0]
+
+
+class LocalBackend:
+    """Stand-in for ``sbatch`` that saves scripts as ``<jobid>.sh`` in a
+    directory, and optionally runs them in the background with output to
+    ``<jobid>.out``.
+
+    :param str path: (optional) Directory for the scripts
+    :param bool run: (optional) Run the scripts with ``sh``
+    """
+
+    def __init__(self, path=None, run=False):
+        self.path = path or os.path.join(tempfile.gettempdir(), "jobbergate-jobs")
+        self.run = run
+        self._jobids = itertools.count(int(time.time() * 1000))
+        os.makedirs(self.path, exist_ok=True)
+
+    def submit(self, script):
+        jobid = str(next(self._jobids))
+        scriptfile = os.path.join(self.path, f"{jobid}.sh")
+        with open(scriptfile, "w") as jobfile:
+            jobfile.write(script)
+        if self.run:
+            with open(os.path.join(self.path, f"{jobid}.out"), "w") as output:
+                subprocess.Popen(
+                    ["sh", scriptfile],
+                    cwd=self.path,
+                    stdout=output,
+                    stderr=subprocess.STDOUT,
+                    start_new_session=True,
+                )
+        return jobid
+
+
+class Submission:
+    """A script queued for submission.
+
+    :param str application: Name of the application that rendered the script
+    """
+
+    def __init__(self, application):
+        self.id = secrets.token_hex(8)
+        self.application = application
+        self.state = "queued"
+        self.jobid = None
+        self.attempts = 0
+        self.error = None
+        self.created = time.time()
+        self.future = None
+
+    def wait(self, timeout=None):
+        """Waits until the submission is done or has failed.
+
+        :param float timeout: (optional) Seconds to wait
+        :rtype: Submission
+        """
+        self.future.result(timeout)
+        return self
+
+    def to_dict(self):
+        """Returns the submission as a JSON serializable dict.
+
+        :rtype: dict
+        """
+        return {
+            "id": self.id,
+            "application": self.application,
+            "state": self.state,
+            "jobid": self.jobid,
+            "attempts": self.attempts,
+            "error": self.error,
+            "created": self.created,
+        }
+
+
+class Submitter:
+    """Submits scripts through a backend with a bounded pool of workers.
+
+    :param backend: Backend with a ``submit(script)`` method that returns the
+        job id
+    :param int workers: (optional) Number of concurrent submissions
+    :param int queue: (optional) Number of submissions that could wait for a
+        worker before :exc:`QueueFull` is raised
+    :param int retries: (optional) Retries of failed submissions
+    :param float backoff: (optional) Seconds before the first retry, doubled
+        for every retry
+    :param str log: (optional) JSON lines file where every finished
+        submission is recorded
+    """
+
+    def __init__(self, backend, workers=4, queue=100, retries=3, backoff=1, log=None):
+        self.backend = backend
+        self.retries = retries
+        self.backoff = backoff
+        self.log = log
+        self.submissions = LRUCache(maxsize=10000)
+        self._slots = threading.BoundedSemaphore(workers + queue)
+        self._executor = ThreadPoolExecutor(workers, thread_name_prefix="submit")
+        self._loglock = threading.Lock()
+
+    def submit(self, script, application="", block=False):
+        """Queues a script for submission.
+
+        :param str script: The script
+        :param str application: (optional) Name of the application
+        :param bool block: (optional) Wait for room in the queue instead of
+            raising :exc:`QueueFull`
+        :returns: the submission, that is updated when done
+        :rtype: Submission
+        :raises QueueFull: if no more submissions could be queued
+        """
+        if not self._slots.acquire(blocking=block):
+            raise QueueFull("Too many submissions waiting, try again later")
+        submission = Submission(application)
+        self.submissions.set(submission.id, submission)
+        try:
+            submission.future = self._executor.submit(self._run, submission, script)
+        except Exception:
+            self._slots.release()
+            raise
+        return submission
+
+    def get(self, submissionid):
+        """Returns a submission by id.
+
+        :param str submissionid: id of the submission
+        :rtype: Submission
+        """
+        return self.submissions.get(submissionid)
+
+    def shutdown(self, wait=True):
+        """Stops the workers, after the queued submissions if `wait`."""
+        self._executor.shutdown(wait)
+
+    def _run(self, submission, script):
+        try:
+            submission.state = "submitting"
+            while True:
+                submission.attempts += 1
+                try:
+                    submission.jobid = self.backend.submit(script)
+                    submission.state = "submitted"
+                    submission.error = None
+                    break
+                except (SubmitError, OSError) as err:
+                    submission.error = str(err)
+                    if submission.attempts > self.retries:
+                        submission.state = "failed"
+                        break
+                except Exception as err:
+                    # A broken backend, retrying won't help
+                    logger.exception("Submission %s failed", submission.id)
+                    submission.error = f"{type(err).__name__}: {err}"
+                    submission.state = "failed"
+                    break
+                time.sleep(self.backoff * 2 ** (submission.attempts - 1))
+            self._record(submission)
+        finally:
+            self._slots.release()
+
+    def _record(self, submission):
+        if not self.log:
+            return
+        with self._loglock:
+            with open(self.log, "a") as logfile:
+                logfile.write(json.dumps(submission.to_dict()) + "\n")
+
+
+backends = {"sbatch": SbatchBackend, "local": LocalBackend}
+
+
+def from_config(config):
+    """Creates the submitter configured in `config`.
+
+    :param dict config: ``jobbergate.yaml`` configuration
+    :returns: the submitter, or ``None`` if submission isn't configured
+    :rtype: Submitter
+    """
+    if not config.get("submit"):
+        return None
+    options = dict(config["submit"])
+    backend = options.pop("backend", "sbatch")
+    if backend not in backends:
+        raise ValueError(f"Unknown submit backend {backend!r}")
+    submitteroptions = {
+        name: options.pop(name)
+        for name in ("workers", "queue", "retries", "backoff", "log")
+        if name in options
+    }
+    return Submitter(backends[backend](**options), **submitteroptions)
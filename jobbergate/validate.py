@@ -0,0 +1,278 @@
+"""
+validate
+========
+
+Checks many answer sets of an application at once, without running its
+workflows or rendering anything, for example before a large
+``jobbergate batch`` sweep:
+
+.. code-block:: console
+
+    $ flask jobbergate validate simple sweep.jsonl answers/*.json
+    sweep.jsonl:3: cores: 128 is more than 64
+    answers/b.json: partition: 'gpu2' is not one of 'cpu', 'gpu'
+    Checked 1002 answer sets, 2 with errors
+
+The questions of the application are taken from its compiled question graph,
+see :mod:`jobbergate.graph`, and compiled into one check function per
+question once. Every answer set then only runs these functions:
+
+- answers without a default are required, like in ``jobbergate batch``;
+  questions in the unused branch of a ``BooleanList`` are left out
+- ``Integer`` answers must be integers within ``minval`` and ``maxval``
+- ``List`` answers must be one of the choices, ``Checkbox`` answers a list
+  of them
+- ``Confirm`` and ``BooleanList`` answers must be booleans
+- ``Directory`` and ``File`` answers with ``exists`` must be an existing
+  directory or file. Paths are only looked up once for all answer sets.
+
+Answer sets follow the workflows like the cli does: through ``flows``,
+``nextworkflow`` from ``Const`` questions and ``workflow`` for the workflows
+registered with :func:`jobbergate.appform.workflow`. Workflows that only
+``post_``-functions lead to can't be known without running them, and are
+not checked."""
+
+import os
+import stat
+
+from jobbergate import graph
+from jobbergate.registry import registry
+
+_missing = object()
+
+
+class StatCache:
+    """Looks up every path once.
+
+    Relative paths are looked up from the current directory."""
+
+    def __init__(self):
+        self._modes = {}
+
+    def mode(self, path):
+        """Returns the file type and mode of `path`, ``None`` if it doesn't
+        exist.
+
+        :param str path: The path
+        :rtype: int
+        """
+        try:
+            return self._modes[path]
+        except KeyError:
+            pass
+        try:
+            mode = os.stat(path).st_mode
+        except (OSError, ValueError):
+            mode = None
+        self._modes[path] = mode
+        return mode
+
+    def isdir(self, path):
+        mode = self.mode(path)
+        return mode is not None and stat.S_ISDIR(mode)
+
+    def isfile(self, path):
+        mode = self.mode(path)
+        return mode is not None and stat.S_ISREG(mode)
+
+
+def _choices(question):
+    """Returns the values that answer a ``List`` or ``Checkbox`` question,
+    the second item of ``(label, value)`` choices included."""
+    values = []
+    for choice in question.get("choices") or ():
+        if isinstance(choice, list) and len(choice) == 2:
+            values.append(choice[1])
+        values.append(choice)
+    return values
+
+
+def _describe(choices):
+    return ", ".join(repr(choice) for choice in choices)
+
+
+def _is_integer(value):
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, int):
+        return True
+    try:
+        int(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+
+def _value_check(question, stats):
+    """Compiles the checks of an answer's value, ``None`` if every value is
+    valid."""
+    kind = question["type"]
+    if kind == "Integer":
+        minval, maxval = question.get("minval"), question.get("maxval")
+
+        def check(value):
+            if not _is_integer(value):
+                return f"{value!r} is not an integer"
+            if minval is not None and int(value) < minval:
+                return f"{value} is less than {minval}"
+            if maxval is not None and int(value) > maxval:
+                return f"{value} is more than {maxval}"
+
+        return check
+
+    if kind == "List":
+        choices = _choices(question)
+
+        def check(value):
+            if value not in choices:
+                return f"{value!r} is not one of {_describe(question['choices'])}"
+
+        return check
+
+    if kind == "Checkbox":
+        choices = _choices(question)
+
+        def check(value):
+            if not isinstance(value, list):
+                return f"{value!r} is not a list"
+            wrong = [item for item in value if item not in choices]
+            if wrong:
+                return f"{_describe(wrong)} not in {_describe(question['choices'])}"
+
+        return check
+
+    if kind in ("Confirm", "BooleanList"):
+
+        def check(value):
+            if not isinstance(value, bool):
+                return f"{value!r} is not true or false"
+
+        return check
+
+    if kind in ("Directory", "File") and question.get("exists"):
+        exists = stats.isdir if kind == "Directory" else stats.isfile
+        what = "directory" if kind == "Directory" else "file"
+
+        def check(value):
+            if not isinstance(value, str) or not exists(value):
+                return f"{value!r} is not an existing {what}"
+
+        return check
+    return None
+
+
+def compile_question(question, stats):
+    """Compiles the checks of a serialized question, see
+    :func:`jobbergate.graph.serialize`.
+
+    :param dict question: The question
+    :param StatCache stats: Looks up paths
+    :returns: a function that takes the answers, the effective answers so
+        far (with defaults) and a list to append errors to
+    """
+    name = question["variablename"]
+    default = question.get("default")
+    kind = question["type"]
+    check = _value_check(question, stats)
+    branches = {}
+    if kind == "BooleanList":
+        branches = {
+            True: [compile_question(item, stats) for item in question["whentrue"]],
+            False: [compile_question(item, stats) for item in question["whenfalse"]],
+        }
+
+    def validate(answers, effective, errors):
+        value = answers.get(name, _missing)
+        if value is _missing:
+            if default is None:
+                errors.append(f"{name}: missing")
+                return
+            value = default
+        elif check is not None and kind != "Const":
+            error = check(value)
+            if error is not None:
+                errors.append(f"{name}: {error}")
+                return
+        effective[name] = value
+        for branch in branches.get(bool(value), ()):
+            branch(answers, effective, errors)
+
+    return validate
+
+
+class Validator:
+    """The compiled checks of an application.
+
+    :param dict compiled: The question graph, see
+        :func:`jobbergate.graph.compile_application`
+    :param workflows: (optional) Names of the workflows registered with
+        :func:`jobbergate.appform.workflow`
+    :param StatCache stats: (optional) Looks up paths, shared by all answer
+        sets
+    """
+
+    def __init__(self, compiled, workflows=(), stats=None):
+        self.stats = stats or StatCache()
+        self.workflows = list(workflows)
+        self.nodes = {
+            name: [
+                compile_question(question, self.stats) for question in node["questions"]
+            ]
+            for name, node in compiled["nodes"].items()
+        }
+
+    def validate(self, answers):
+        """Checks one answer set.
+
+        :param dict answers: The answers
+        :returns: the errors
+        :rtype: list[str]
+        """
+        errors = []
+        effective = {}
+        flows = answers.get("flows") or {}
+        current = "mainflow"
+        visited = set()
+        while current is not None and current not in visited:
+            visited.add(current)
+            if current not in self.nodes:
+                errors.append(f"workflow: no workflow {current}")
+                break
+            effective.pop("nextworkflow", None)
+            for check in self.nodes[current]:
+                check(answers, effective, errors)
+            current = flows.get(current) or effective.get("nextworkflow")
+
+        if self.workflows:
+            workflow = answers.get("workflow")
+            if workflow is None:
+                errors.append("workflow: missing")
+            elif workflow not in self.workflows:
+                errors.append(
+                    f"workflow: {workflow!r} is not one of {_describe(self.workflows)}"
+                )
+            elif workflow not in visited and workflow in self.nodes:
+                for check in self.nodes[workflow]:
+                    check(answers, effective, errors)
+        return errors
+
+    def validate_many(self, answersets):
+        """Checks many answer sets.
+
+        :param answersets: The answer sets
+        :returns: the errors of every answer set, in the same order
+        :rtype: list[list[str]]
+        """
+        validate = self.validate
+        return [validate(answers) for answers in answersets]
+
+
+def validator(application):
+    """Compiles the checks of an application from its question graph, with
+    a new :class:`StatCache`.
+
+    :param str application: Name of the application
+    :rtype: Validator
+    """
+    compiled = graph.load(application)
+    return Validator(compiled, registry.get(application).workflows)
@@ -4,28 +4,26 @@ views
 
 The web part of jobbergate.
 """
-import sys
-from copy import deepcopy
-from pathlib import Path
-from collections import deque
-from jinja2 import Environment, FileSystemLoader
-import yaml
-
+import io
+import zipfile
 
 from flask import (
     Blueprint,
     Response,
+    abort,
     current_app,
-    json,
+    jsonify,
     redirect,
     render_template,
     session,
     url_for,
     request,
+    stream_with_context,
 )
 from flask_login import login_user, logout_user, login_required
 from flask_ldap3_login.forms import LDAPLoginForm
 from flask_wtf import FlaskForm
+from jinja2 import TemplateNotFound
 from wtforms.fields import (
     BooleanField,
     HiddenField,
@@ -38,7 +36,12 @@ from wtforms.fields import (
 )
 from wtforms.validators import InputRequired, NumberRange
 
-from jobbergate.lib import jobbergateconfig, fullpath_import
+from jobbergate.catalog import catalog
+from jobbergate.lib import LRUCache, read_config
+from jobbergate.profiling import phase
+from jobbergate.registry import registry
+from jobbergate.submit import QueueFull
+from jobbergate import graph, hooks, outputcache, render
 from jobbergate import appform
 from jobbergate.models import User
 
@@ -46,6 +49,9 @@ from jobbergate import users
 
 main_blueprint = Blueprint("main", __name__, template_folder="templates")
 
+#: Generated form classes, see :func:`form_generator`
+formclasses = LRUCache(maxsize=512)
+
 
 def parse_field(form, field, render_kw=None):
     """Parses the question field and populates a FlaskForm with the fields.
@@ -178,19 +184,164 @@ def parse_field(form, field, render_kw=None):
     return form
 
 
-def form_generator(application_name, templates, workflow):
-    """Generates form from workflow function
+def answer_store():
+    """Returns the answer store of the current app.
+
+    :rtype: jobbergate.answerstore.AnswerStore
+    """
+    return current_app.extensions["answerstore"]
+
+
+def load_answers():
+    """Returns the answers stored for the current session.
+
+    :rtype: dict
+    """
+    if "answers" not in session:
+        return {}
+    return answer_store().load(session["answers"])
+
+
+def save_answers(delta):
+    """Stores the answers that changed in this step of the questionnaire.
+
+    :param dict delta: Changed answers
+    """
+    if not delta:
+        return
+    if "answers" not in session:
+        session["answers"] = answer_store().create()
+    answer_store().append(session["answers"], delta)
+
+
+def clear_answers():
+    """Removes the answers stored for the current session."""
+    if "answers" in session:
+        answer_store().delete(session.pop("answers"))
+
+
+def render_data(application_name, data):
+    """Renders the selected template.
 
     :param string application_name: Name of the application
-    :param list[string] templates: List of availabe templates
-    :param workflow: workflow function
-    :returns: A populated QuestionaryForm
-    :rtype: FlaskForm
+    :param dict data: All data
+    :rtype: string
+    """
+    templatedir, template = render.template_path(application_name, data)
+    with phase("render"):
+        jinjatemplate = render.get_template(templatedir, template)
+        return outputcache.rendered(registry.get(application_name), jinjatemplate, data)
+
+
+def stream_data(application_name, data):
+    """Renders the selected template in chunks.
+
+    :param string application_name: Name of the application
+    :param dict data: All data
+    :rtype: iterator[string]
+    """
+    templatedir, template = render.template_path(application_name, data)
+    with phase("render"):
+        jinjatemplate = render.get_template(templatedir, template)
+        yield from render.generate(jinjatemplate, data)
+
+
+def render_script(application_name, data):
+    """Renders the selected template as a downloadable script.
+
+    :param string application_name: Name of the application
+    :param dict data: All data
+    :rtype: Response
     """
-    if "data" in session:
-        data = json.loads(session["data"])
+    if render.streaming():
+        script = stream_with_context(stream_data(application_name, data))
     else:
-        data = {}
+        script = render_data(application_name, data)
+    return Response(
+        script,
+        mimetype="text/x-shellscript",
+        headers={"Content-Disposition": "attachment;filename=jobfile.sh"},
+    )
+
+
+def render_archive(application_name, data, names=None):
+    """Renders several templates, all by default, with the same data as a
+    downloadable zip archive.
+
+    :param string application_name: Name of the application
+    :param dict data: All data
+    :param list[string] names: (optional) Templates to render
+    :rtype: Response
+    """
+    with phase("render"):
+        try:
+            outputs = render.render_many(application_name, data, names)
+        except TemplateNotFound:
+            abort(404)
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zipped:
+        for template, output in outputs.items():
+            zipped.writestr(render.output_name(template), output)
+    return Response(
+        archive.getvalue(),
+        mimetype="application/zip",
+        headers={"Content-Disposition": f"attachment;filename={application_name}.zip"},
+    )
+
+
+def submit_script(application_name, data):
+    """Renders the selected template and queues it for submission, without
+    waiting for the scheduler.
+
+    :param string application_name: Name of the application
+    :param dict data: All data
+    :rtype: Response
+    """
+    script = render_data(application_name, data)
+    try:
+        submission = current_app.extensions["submitter"].submit(
+            script, application_name
+        )
+    except QueueFull:
+        abort(503)
+    return (
+        render_template(
+            "main/submitted.html",
+            submission=submission,
+            application_name=application_name,
+        ),
+        202,
+    )
+
+
+def finish(application_name, data):
+    """Ends a questionnaire by submitting the script if submission is
+    configured, otherwise by downloading it.
+
+    :param string application_name: Name of the application
+    :param dict data: All data
+    :rtype: Response
+    """
+    if data.get("template") == render.alltemplates:
+        return render_archive(application_name, data)
+    if current_app.extensions.get("submitter") is None:
+        return render_script(application_name, data)
+    return submit_script(application_name, data)
+
+
+def build_form_class(
+    application_name, templates, questions, workflows, default_template
+):
+    """Creates a form class with fields for all questions.
+
+    :param string application_name: Name of the application
+    :param list[string] templates: List of availabe templates
+    :param list[jobbergate.appform.QuestionBase] questions: The questions
+    :param workflows: Names of workflows the user could select from
+    :param string default_template: Template selected by default
+    :returns: A QuestionaryForm class
+    :rtype: type
+    """
 
     class QuestioneryForm(FlaskForm):
         pass
@@ -198,28 +349,61 @@ def form_generator(application_name, templates, workflow):
     if len(templates) == 1:
         QuestioneryForm.template = HiddenField(default=templates[0][0])
     elif len(templates) > 1:
-        if "default_template" in data:
-            default_template = data["default_template"]
-        else:
-            default_template = None
+        choices = list(templates)
+        choices.append((render.alltemplates, "All templates (zip archive)"))
         QuestioneryForm.template = SelectField(
-            "Select template", choices=templates, default=default_template
+            "Select template", choices=choices, default=default_template
         )
-    questions = workflow(data)
-    while questions:
-        field = questions.pop(0)
+    for field in questions:
         QuestioneryForm = parse_field(QuestioneryForm, field)
 
-    if appform.workflows:
+    if workflows:
         choices = [(None, "--- Select ---")]
-        choices.extend([(k, k) for k in appform.workflows.keys()])
+        choices.extend([(k, k) for k in workflows])
         QuestioneryForm.workflow = SelectField("Select workflow", choices=choices)
-        appform.workflows = {}
 
     QuestioneryForm.application = HiddenField("application", default=application_name)
     QuestioneryForm.submit = SubmitField()
 
-    return QuestioneryForm()
+    return QuestioneryForm
+
+
+def form_generator(application_name, templates, workflow, workflows=None, data=None):
+    """Generates form from workflow function
+
+    Form classes are cached, and only created again when the workflow returns
+    different questions.
+
+    :param string application_name: Name of the application
+    :param list[string] templates: List of availabe templates
+    :param workflow: workflow function
+    :param dict workflows: (optional) Workflows the user could select from
+    :param dict data: (optional) All data, defaults to the stored answers
+    :returns: A populated QuestionaryForm
+    :rtype: FlaskForm
+    """
+    if data is None:
+        data = load_answers()
+
+    with phase("questions"):
+        questions = workflow(data)
+    default_template = render.default_template(application_name, data)
+    with phase("form"):
+        key = (
+            application_name,
+            workflow.__qualname__,
+            tuple(templates),
+            default_template,
+            tuple(workflows or ()),
+            appform.fingerprint(questions),
+        )
+        QuestioneryForm = formclasses.get(key)
+        if QuestioneryForm is None:
+            QuestioneryForm = build_form_class(
+                application_name, templates, questions, workflows, default_template
+            )
+            formclasses.set(key, QuestioneryForm)
+        return QuestioneryForm()
 
 
 @main_blueprint.route("/")
@@ -227,10 +411,7 @@ def home():
     """route for /
 
     Clears out session data and renders home.html template"""
-    if "data" in session:
-        del session["data"]
-    if "templates" in session:
-        del session["templates"]
+    clear_answers()
     if "LDAP_HOST" not in current_app.config:
         user = User("temp", "temp", "temp")
         login_user(user)
@@ -248,32 +429,66 @@ def about():
 def applications():
     """route for /apps/
 
-    Lets users select from available applications"""
+    Lets users select from available applications, the ones matching
+    ``?q=`` if given"""
 
     class AppForm(FlaskForm):
         application = SelectField("Select application")
         submit = SubmitField()
 
-    appdir = Path(jobbergateconfig["apps"]["path"])
+    query = request.args.get("q", "")
 
     appwebform = AppForm()
     appwebform.application.choices = [
-        (x.name, x.stem) for x in appdir.iterdir() if x.is_dir()
+        (name, name) for name in (catalog.search(query) if query else catalog.names())
     ]
 
     if appwebform.validate_on_submit():
         application_name = appwebform.data["application"]
-        templatedir = Path(
-            f"{jobbergateconfig['apps']['path']}/{application_name}/templates/"
-        )
-        session["templates"] = json.dumps(
-            [template.name for template in templatedir.glob("*.j2")]
-        )
         return redirect(url_for("main.application", application_name=application_name))
 
     return render_template("main/form.html", form=appwebform)
 
 
+@main_blueprint.route("/apps/search")
+@login_required
+def search_applications():
+    """route for /apps/search?q=
+
+    Returns the applications matching the words in ``q`` as JSON, with the
+    first line of their README, templates and workflows"""
+    found = []
+    for name in catalog.search(request.args.get("q", "")):
+        info = catalog.info(name)
+        found.append(
+            {
+                "name": name,
+                "help": info["help"].strip(),
+                "templates": info["templates"],
+                "workflows": info["workflows"],
+            }
+        )
+    return jsonify(found)
+
+
+@main_blueprint.route("/graph/<application_name>")
+@login_required
+def question_graph(application_name):
+    """route for /graph/<application_name>
+
+    :param application_name: Name of application
+
+    Returns the compiled question graph of <application_name> as JSON, see
+    :mod:`jobbergate.graph`. Graphs are compiled with ``flask jobbergate
+    compile``, not here, since that runs the pre_/post_-functions."""
+    if not catalog.exists(application_name):
+        abort(404)
+    compiled = graph.kept(application_name)
+    if compiled is None:
+        abort(409, "The question graph isn't compiled or out of date")
+    return jsonify(compiled)
+
+
 @main_blueprint.route("/app/<application_name>", methods=["GET", "POST"])
 @login_required
 def application(application_name):
@@ -283,48 +498,46 @@ def application(application_name):
 
     Renders base questions for <application_name> and lets users answer them."""
 
-    templates = [(template, template) for template in json.loads(session["templates"])]
-    importedlib = fullpath_import(application_name, "views")
-
-    data = {}
-    data["jobbergateconfig"] = deepcopy(jobbergateconfig)
-    try:
-        with open(
-            f"{jobbergateconfig['apps']['path']}/{application_name}/config.yaml", "r"
-        ) as ymlfile:
-            data.update(yaml.safe_load(ymlfile))
-    except FileNotFoundError:
-        pass
-
-    try:
-        appcontroller = fullpath_import(f"{application_name}", "controller")
+    templates = [
+        (template, template) for template in render.templates(application_name)
+    ]
+    with phase("import"):
+        loaded = registry.get(application_name)
+    prefuncs = loaded.prefuncs
+    postfuncs = loaded.postfuncs
 
-        prefuncs = appcontroller.workflow.prefuncs
-        postfuncs = appcontroller.workflow.postfuncs
-    except ModuleNotFoundError:
-        prefuncs = {}
-        postfuncs = {}
+    with phase("config"):
+        data = read_config(application_name)
     if request.method == "GET":
+        # A new questionnaire starts here
+        clear_answers()
         # If the is a pre_-function in the controller, run that before all
         # questions
         if "" in prefuncs.keys():
-            data.update(prefuncs[""](data) or {})
+            with phase("pre"):
+                delta = hooks.call(prefuncs[""], data) or {}
+            data.update(delta)
+            save_answers(delta)
+    else:
+        with phase("answers"):
+            data.update(load_answers())
 
-    questionsform = form_generator(application_name, templates, importedlib.mainflow)
+    questionsform = form_generator(
+        application_name, templates, loaded.views.mainflow, loaded.workflows, data
+    )
 
     if questionsform.validate_on_submit():
-        data.update(json.loads(session["data"]))
-        data.update(questionsform.data)
-        session["data"] = json.dumps(data)
+        delta = dict(questionsform.data)
+        data.update(delta)
         if "mainflow" in postfuncs:
-            data.update(postfuncs["mainflow"](data) or {})
-
-        if "workflow" or "nextworkflow" in questionsform:
-            workflow = questionsform.data.get("workflow") or questionsform.data.get(
-                "nextworkflow"
-            )
-            if "views" in sys.modules:
-                del sys.modules["views"]
+            with phase("post"):
+                result = hooks.call(postfuncs["mainflow"], data) or {}
+            data.update(result)
+            delta.update(result)
+        save_answers(delta)
+
+        workflow = delta.get("workflow") or delta.get("nextworkflow")
+        if workflow:
             return redirect(
                 url_for(
                     "main.renderworkflow",
@@ -332,23 +545,8 @@ def application(application_name):
                     workflow=workflow,
                 )
             )
-        templatedir = (
-            f"{jobbergateconfig['apps']['path']}/{application_name}/templates/"
-        )
-        template = data.get("template", None) or data.get(
-            "default_template", "job_template.j2"
-        )
-        jinjaenv = Environment(loader=FileSystemLoader(templatedir))
-        jinjatemplate = jinjaenv.get_template(template)
-        return Response(
-            jinjatemplate.render(data=data),
-            mimetype="text/x-shellscript",
-            headers={"Content-Disposition": "attachment;filename=jobfile.sh"},
-        )
+        return finish(application_name, data)
 
-    session["data"] = json.dumps(data)
-    if "views" in sys.modules:
-        del sys.modules["views"]
     return render_template(
         "main/form.html",
         form=questionsform,
@@ -368,72 +566,57 @@ def renderworkflow(application_name, workflow):
 
     Renders <workflow> for <application_name> and lets user answer questions."""
 
-    appview = fullpath_import(f"{application_name}", "views")
-    data = json.loads(session["data"])
-    try:
-        appcontroller = fullpath_import(f"{application_name}", "controller")
+    with phase("import"):
+        loaded = registry.get(application_name)
+    appview = loaded.views
+    prefuncs = loaded.prefuncs
+    postfuncs = loaded.postfuncs
 
-        prefuncs = appcontroller.workflow.prefuncs
-        postfuncs = appcontroller.workflow.postfuncs
-    except ModuleNotFoundError:
-        prefuncs = {}
-        postfuncs = {}
+    with phase("config"):
+        data = read_config(application_name)
+    with phase("answers"):
+        data.update(load_answers())
 
+    delta = {}
     if workflow in prefuncs.keys():
-        data.update(prefuncs[workflow](data) or {})
+        with phase("pre"):
+            delta.update(hooks.call(prefuncs[workflow], data) or {})
+        data.update(delta)
 
-    appview.appform.questions = deque()
-    if workflow in appview.appform.workflows:
-        wfquestions = appview.appform.workflows[workflow]
+    if workflow in loaded.workflows:
+        wfquestions = loaded.workflows[workflow]
     else:
         if workflow not in appview.__dict__:
             raise NameError(f"Couldn't find workflow {workflow}")
 
         wfquestions = appview.__dict__[workflow]
 
-    # "Instantiate" workflow questions
-    wfquestions(data)
-
     # Ask workflow questions
-    appview.appform.workflows = {}
-    questionsform = form_generator(application_name, [], wfquestions)
+    questionsform = form_generator(application_name, [], wfquestions, data=data)
 
     if questionsform.validate_on_submit():
-        data.update(json.loads(session["data"]))
+        delta.update(questionsform.data)
         data.update(questionsform.data)
-        session["data"] = json.dumps(data)
         # If selected workflow have a post_-function, run that now
         if workflow in postfuncs.keys():
-            data.update(postfuncs[workflow](data) or {})
-        if ("workflow" or "nextworkflow" in questionsform) or ("nextworkflow" in data):
-            workflow = (
-                questionsform.data.get("workflow")
-                or questionsform.data.get("nextworkflow")
-                or data["nextworkflow"]
-            )
-            if workflow:
-                return redirect(
-                    url_for(
-                        "main.renderworkflow",
-                        application_name=application_name,
-                        workflow=workflow,
-                    )
+            with phase("post"):
+                result = hooks.call(postfuncs[workflow], data) or {}
+            data.update(result)
+            delta.update(result)
+        save_answers(delta)
+
+        # Only a workflow selected in this step leads on, an earlier
+        # nextworkflow would loop forever
+        workflow = delta.get("workflow") or delta.get("nextworkflow")
+        if workflow:
+            return redirect(
+                url_for(
+                    "main.renderworkflow",
+                    application_name=application_name,
+                    workflow=workflow,
                 )
-        # FIXME: Same as in apps function.
-        # DRY
-        templatedir = (
-            f"{jobbergateconfig['apps']['path']}/{application_name}/templates/"
-        )
-        template = data.get("template", None) or data.get(
-            "default_template", "job_template.j2"
-        )
-        jinjaenv = Environment(loader=FileSystemLoader(templatedir))
-        jinjatemplate = jinjaenv.get_template(template)
-        return Response(
-            jinjatemplate.render(data=data),
-            mimetype="text/x-shellscript",
-            headers={"Content-Disposition": "attachment;filename=jobfile.sh"},
-        )
+            )
+        return finish(application_name, data)
 
     return render_template(
         "main/form.html",
@@ -442,6 +625,52 @@ def renderworkflow(application_name, workflow):
     )
 
 
+@main_blueprint.route("/script/<application_name>")
+@login_required
+def script(application_name):
+    """route for /script/<application_name>
+
+    :param application_name: Name of application
+
+    Downloads the script rendered from the answers of the last questionnaire."""
+    data = read_config(application_name)
+    data.update(load_answers())
+    if data.get("template") == render.alltemplates:
+        return render_archive(application_name, data)
+    return render_script(application_name, data)
+
+
+@main_blueprint.route("/archive/<application_name>")
+@login_required
+def archive(application_name):
+    """route for /archive/<application_name>
+
+    :param application_name: Name of application
+
+    Downloads a zip archive with all templates, or the ones given with
+    ``?template=``, rendered from the answers of the last questionnaire."""
+    data = read_config(application_name)
+    data.update(load_answers())
+    return render_archive(
+        application_name, data, request.args.getlist("template") or None
+    )
+
+
+@main_blueprint.route("/submission/<submission_id>")
+@login_required
+def submission(submission_id):
+    """route for /submission/<submission_id>
+
+    :param submission_id: id of the submission
+
+    Returns the state and job id of a submission as JSON."""
+    submitter = current_app.extensions.get("submitter")
+    queued = submitter.get(submission_id) if submitter else None
+    if queued is None:
+        abort(404)
+    return jsonify(queued.to_dict())
+
+
 @main_blueprint.route("/login/", methods=["GET", "POST"])
 def login():
     loginform = LDAPLoginForm()
@@ -6,14 +6,43 @@ Work flow module that could add pre and post functions to workflows"""
 
 from functools import partial, wraps
 
+from jobbergate import hooks, memoize
+from jobbergate.lib import loading
+
+# Functions from modules that are not loaded through jobbergate.registry
 prefuncs = {}
 postfuncs = {}
 
 
-def logic(func=None, *, name=None, prepost=None):
+def logic(
+    func=None,
+    *,
+    name=None,
+    prepost=None,
+    requires=None,
+    provides=None,
+    ttl=None,
+    key=None,
+    deterministic=True,
+):
     """A decorator that registers functions as either pre or post to workflows.
 
+    Several functions could be registered for the same workflow. Functions
+    that declare `requires` and/or `provides` are run in parallel with the
+    ones they don't depend on, see :mod:`jobbergate.hooks`.
+
     :param name: (optional) Descriptive name that is used when choosing workflow
+    :param prepost: (optional) ``"pre"`` or ``"post"``, defaults to the
+        prefix of the function name
+    :param requires: (optional) Keys of ``data`` the function reads
+    :param provides: (optional) Keys of ``data`` the function returns
+    :param ttl: (optional) Seconds to remember the results of the function,
+        see :mod:`jobbergate.memoize`
+    :param key: (optional) Keys of ``data`` remembered results depend on,
+        defaults to `requires`
+    :param deterministic: (optional) ``False`` if the function could return
+        something else for the same data, which keeps the application's
+        scripts out of :mod:`jobbergate.outputcache`
 
 
     Hooking a pre-function to eigen implicit by function name:
@@ -47,7 +76,16 @@ def logic(func=None, *, name=None, prepost=None):
             print("Post function that is run after all questions")
     """
     if func is None:
-        return partial(logic, name=name, prepost=prepost)
+        return partial(
+            logic,
+            name=name,
+            prepost=prepost,
+            requires=requires,
+            provides=provides,
+            ttl=ttl,
+            key=key,
+            deterministic=deterministic,
+        )
 
     @wraps(func)
     def wrapper(*args, **kvargs):
@@ -62,12 +100,25 @@ def logic(func=None, *, name=None, prepost=None):
             name = func.__name__[5:]
             prepost = "post"
 
+    application = loading.get()
+
+    if ttl is not None:
+        func = memoize.memoize(
+            func,
+            ttl,
+            key or requires or (),
+            application.name if application else func.__module__,
+        )
+        wrapper.invalidate = func.invalidate
+
     if prepost == "pre":
-        prefuncs[name] = func
+        registered = prefuncs if application is None else application.prefuncs
+        hooks.register(registered, name, func, requires, provides, deterministic)
         return wrapper
 
     if prepost == "post":
-        postfuncs[name] = func
+        registered = postfuncs if application is None else application.postfuncs
+        hooks.register(registered, name, func, requires, provides, deterministic)
         return wrapper
 
     raise NameError
@@ -32,6 +32,7 @@ setup(
         "inquirer==2.6.3",
         "flask-ldap3-login==0.9.16",
     ],
+    extras_require={"asgi": ["asgiref>=3.2"]},
     classifiers=[
         "Development Status :: 5 - Production/Stable",
         "Programming Language :: Python :: 3",
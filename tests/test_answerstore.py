@@ -0,0 +1,50 @@
+import pytest
+
+from jobbergate.answerstore import FileStore, MemoryStore, from_config
+from jobbergate.lib import freeze
+
+
+@pytest.fixture(params=["memory", "file"])
+def store(request, tmp_path):
+    if request.param == "memory":
+        return MemoryStore()
+    return FileStore(str(tmp_path))
+
+
+def test_deltas_are_merged(store):
+    answersid = store.create()
+    store.append(answersid, {"a": 1, "b": 1})
+    store.append(answersid, {"b": 2})
+    assert store.load(answersid) == {"a": 1, "b": 2}
+    store.delete(answersid)
+    assert store.load(answersid) == {}
+
+
+def test_prune_is_throttled(store, monkeypatch):
+    pruned = []
+    monkeypatch.setattr(store, "prune", lambda: pruned.append(True))
+    store.create()
+    store.create()
+    assert len(pruned) == 1
+    store.prune_interval = 0
+    store.create()
+    assert len(pruned) == 2
+
+
+def test_file_store_rejects_invalid_id(tmp_path):
+    with pytest.raises(ValueError):
+        FileStore(str(tmp_path)).load("../secret")
+
+
+def test_from_config(tmp_path):
+    store = from_config({"answers": {"backend": "file", "path": str(tmp_path)}})
+    assert store.path == str(tmp_path)
+    with pytest.raises(ValueError):
+        from_config({"answers": {"backend": "cookie"}})
+
+
+def test_frozen_config_is_stored():
+    store = MemoryStore()
+    answersid = store.create()
+    store.append(answersid, {"slurm": freeze({"partitions": ["a"]})})
+    assert store.load(answersid) == {"slurm": {"partitions": ["a"]}}
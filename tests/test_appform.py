@@ -0,0 +1,57 @@
+from jobbergate import appform
+
+
+def questions(default=1):
+    return [
+        appform.Text("name", "Name"),
+        appform.BooleanList(
+            "gpu",
+            "Use gpu?",
+            whentrue=[appform.Integer("gpus", "Gpus", default=default)],
+        ),
+        appform.List("partition", "Partition", choices=["a", "b"]),
+    ]
+
+
+def test_fingerprint():
+    assert appform.fingerprint(questions()) == appform.fingerprint(questions())
+    assert appform.fingerprint(questions()) != appform.fingerprint(questions(2))
+    assert appform.fingerprint(questions()) != appform.fingerprint(questions(True))
+    hash(appform.fingerprint(questions()))
+
+
+def test_questions_are_compact():
+    first, second = questions(), questions()
+    assert not hasattr(first[0], "__dict__")
+    assert first[2].choices == ("a", "b")
+    assert first[2].choices is second[2].choices
+    assert appform.attributes(first[0]) == [
+        ("variablename", "name"),
+        ("message", "Name"),
+        ("default", None),
+    ]
+
+
+def test_boolean_list_predicates():
+    question = questions()[1]
+    assert question.ignore({"gpu": True})
+    assert question.noignore({"gpu": False})
+    assert "ignore" not in dict(appform.attributes(question))
+
+
+def test_unhashable_choices():
+    question = appform.Checkbox("list", "List", choices=[["a"], ["b"]])
+    assert question.choices == (["a"], ["b"])
+    hash(appform.fingerprint([question]))
+
+
+def test_equal_choices_of_other_types_are_not_shared():
+    floats = appform.List("a", "m", [1.0, 2.0])
+    ints = appform.List("b", "m", [1, 2])
+    assert [type(choice) for choice in ints.choices] == [int, int]
+    assert floats.choices is not ints.choices
+    assert appform.List("c", "m", [1, 2]).choices is ints.choices
+    booleans = appform.List("d", "m", [True, False])
+    ones = appform.List("e", "m", [1, 0])
+    assert [type(choice) for choice in booleans.choices] == [bool, bool]
+    assert [type(choice) for choice in ones.choices] == [int, int]
@@ -0,0 +1,129 @@
+import json
+
+from jobbergate import cli, create_app
+from jobbergate.catalog import Catalog, read_workflows
+from jobbergate.cli import ApplicationGroup
+
+
+def make_app(path, name, readme):
+    (path / name).mkdir()
+    (path / name / "README").write_text(f"{readme}\nMore text\n")
+
+
+def test_catalog_without_index(tmp_path):
+    make_app(tmp_path, "first", "First app")
+    (tmp_path / "somefile").write_text("")
+    catalog = Catalog(str(tmp_path))
+    assert catalog.names() == ["first"]
+    assert catalog.info("first") == {
+        "help": "First app\n",
+        "parameters": "",
+        "templates": [],
+        "workflows": [],
+    }
+
+
+def test_catalog_without_index_is_kept_in_memory(tmp_path, mocker):
+    make_app(tmp_path, "first", "First app")
+    catalog = Catalog(str(tmp_path))
+    read = mocker.spy(catalog, "read")
+    scan = mocker.spy(catalog, "scan")
+    assert catalog.names() == ["first"]
+    assert catalog.names() == ["first"]
+    assert catalog.info("first")["help"] == "First app\n"
+    assert (read.call_count, scan.call_count) == (1, 1)
+
+
+def test_catalog_index_rebuilt_on_new_app(tmp_path):
+    apps = tmp_path / "apps"
+    apps.mkdir()
+    indexfile = tmp_path / "index.json"
+    make_app(apps, "first", "First app")
+    catalog = Catalog(str(apps), str(indexfile))
+    assert catalog.names() == ["first"]
+    assert json.loads(indexfile.read_text())["apps"]["first"]["help"] == "First app\n"
+
+    make_app(apps, "second", "Second app")
+    assert Catalog(str(apps), str(indexfile)).names() == ["first", "second"]
+    assert catalog.info("second")["help"] == "Second app\n"
+
+
+def test_group_creates_commands_on_demand(tmp_path):
+    make_app(tmp_path, "first", "First app")
+    group = ApplicationGroup(applications=Catalog(str(tmp_path)))
+    assert group.list_commands(None) == ["first"]
+    assert group.get_command(None, "missing") is None
+    command = group.get_command(None, "first")
+    assert command.get_short_help_str() == "First app"
+    assert [param.name for param in command.params][-1] == "prefill"
+
+
+def test_read_workflows(tmp_path):
+    (tmp_path / "views.py").write_text(
+        "from jobbergate import appform\n"
+        "from jobbergate.appform import workflow\n"
+        "def mainflow(data): pass\n"
+        "@appform.workflow\n"
+        "def debug(data): pass\n"
+        "@workflow(name='Second step')\n"
+        "def step2(data): pass\n"
+    )
+    assert read_workflows(str(tmp_path)) == ["debug", "Second step"]
+
+
+def test_catalog_index_updated_incrementally(tmp_path, mocker):
+    apps = tmp_path / "apps"
+    apps.mkdir()
+    make_app(apps, "first", "First app")
+    make_app(apps, "second", "Second app")
+    catalog = Catalog(str(apps), str(tmp_path / "index.json"))
+    catalog.names()
+
+    (apps / "second" / "templates").mkdir()
+    (apps / "second" / "templates" / "job.j2").write_text("")
+    make_app(apps, "third", "Third app")
+    read = mocker.spy(catalog, "read")
+    assert catalog.names() == ["first", "second", "third"]
+    assert sorted(call.args[0] for call in read.call_args_list) == ["second", "third"]
+    assert catalog.info("second")["templates"] == ["job.j2"]
+
+    (apps / "first" / "README").write_text("Changed app\n")
+    assert catalog.info("first")["help"] == "First app\n"
+    catalog.refresh()
+    assert catalog.info("first")["help"] == "Changed app\n"
+
+
+def test_search(tmp_path):
+    make_app(tmp_path, "gromacs", "Molecular dynamics")
+    make_app(tmp_path, "dynamo", "Something else")
+    make_app(tmp_path, "vasp", "Electronic structure")
+    catalog = Catalog(str(tmp_path))
+    assert catalog.search("DYN") == ["dynamo", "gromacs"]
+    assert catalog.search("molecular dyn") == ["gromacs"]
+    assert catalog.search("missing") == []
+
+
+def test_list_and_search_commands():
+    runner = create_app().test_cli_runner()
+    result = runner.invoke(cli.tools, ["list"])
+    assert "test_find_application_with_mainflow\t" in result.output
+    result = runner.invoke(cli.tools, ["search", "with", "mainflow"])
+    assert result.output.split("\t")[0] == "test_find_application_with_mainflow"
+
+
+def test_search_endpoint(monkeypatch):
+    monkeypatch.setenv("APP_SETTINGS", "jobbergate.config.TestingConfig")
+    client = create_app().test_client()
+    client.get("/")
+    result = client.get("/apps/search?q=with_mainflow")
+    assert result.get_json() == [
+        {
+            "name": "test_find_application_with_mainflow",
+            "help": "",
+            "templates": ["job_template.j2"],
+            "workflows": [],
+        }
+    ]
+    result = client.get("/apps/?q=no_view")
+    assert b"test_find_application_no_view" in result.data
+    assert b"test_find_application_with_mainflow" not in result.data
@@ -1,3 +1,6 @@
+import click
+import pytest
+
 from jobbergate.cli import flatten, parse_field, ask_questions
 import inquirer
 from jobbergate import appform
@@ -26,3 +29,10 @@ def test_ask_questions(mocker):
         [appform.Text("var", "Variable"), appform.Integer("int", "Integer")], {}
     )
     assert questions == {"var": "Variable", "int": "Integer"}
+
+
+def test_ask_questions_not_interactive():
+    questions = [appform.Text("var", "Variable", default="x"), appform.Text("req", "")]
+    with pytest.raises(click.UsageError):
+        ask_questions(questions, {}, interactive=False)
+    assert ask_questions(questions, {"req": 1}, interactive=False) == {"var": "x"}
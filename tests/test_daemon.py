@@ -0,0 +1,55 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from jobbergate import client
+
+
+@pytest.fixture
+def socketpath(tmp_path):
+    path = str(tmp_path / "jobbergate.sock")
+    # A new interpreter, forking pytest with its threads could deadlock
+    process = subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            f"from jobbergate import daemon; daemon.serve({path!r}, 1)",
+        ]
+    )
+    for _ in range(200):
+        with socket.socket(socket.AF_UNIX) as probe:
+            if probe.connect_ex(path) == 0:
+                break
+        time.sleep(0.05)
+    yield path
+    process.terminate()
+    process.wait()
+
+
+def run(socketpath, tmp_path, argv):
+    with open(os.devnull) as stdin, open(tmp_path / "out", "w+") as stdout:
+        status = client.run(argv, socketpath, (stdin.fileno(), stdout.fileno(), 2))
+        stdout.seek(0)
+        return status, stdout.read()
+
+
+def test_daemon_runs_commands(socketpath, tmp_path):
+    argv = ["test_find_application_with_mainflow", "-"]
+    assert run(socketpath, tmp_path, argv) == (0, "10")
+    # The worker is replaced after every run
+    assert run(socketpath, tmp_path, argv) == (0, "10")
+    status, _ = run(socketpath, tmp_path, ["test_find_application_no_mainflow", "-"])
+    assert status == 1
+
+
+def test_daemon_for_other_path(socketpath, tmp_path, monkeypatch):
+    monkeypatch.setenv("JOBBERGATE_PATH", str(tmp_path))
+    assert run(socketpath, tmp_path, ["--help"]) == (None, "")
+
+
+def test_no_daemon(tmp_path):
+    assert client.run(["--help"], str(tmp_path / "missing.sock")) is None
@@ -1,4 +1,12 @@
-from jobbergate import cli, create_app
+import io
+import os
+import subprocess
+import sys
+import zipfile
+
+from jobbergate import cli, create_app, graph
+from jobbergate.lib import jobbergateconfig
+from jobbergate.submit import LocalBackend, Submitter
 
 
 def get_result(cmds, testname, arguments=None):
@@ -26,3 +34,208 @@ def test_find_application_no_mainflow():
 def test_find_application_with_mainflow():
     result = get_result(cli.cmds, "test_find_application_with_mainflow")
     assert result.output == "10"
+
+
+def test_batch(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text('{"val": 3}\n\n{}\n')
+    runner = create_app().test_cli_runner()
+    result = runner.invoke(
+        cli.tools,
+        ["batch", "test_find_application_with_mainflow", str(manifest), str(tmp_path)],
+    )
+    assert result.exit_code == 0
+    assert (tmp_path / "00001.sh").read_text() == "3"
+    assert (tmp_path / "00002.sh").read_text() == "10"
+
+
+def test_batch_reports_failed_rows(tmp_path):
+    manifest = tmp_path / "manifest.csv"
+    manifest.write_text("val\n3\n")
+    runner = create_app().test_cli_runner()
+    result = runner.invoke(
+        cli.tools,
+        ["batch", "test_find_application_no_mainflow", str(manifest), str(tmp_path)],
+    )
+    assert result.exit_code == 1
+    assert "Row 1: AttributeError" in result.output
+
+
+def test_batch_names_checked(tmp_path):
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text('{"val": 1}\n{"val": 2}\n{"val": 1}\n{"val": "../x"}\n')
+    outputdir = tmp_path / "out"
+    runner = create_app().test_cli_runner()
+    result = runner.invoke(
+        cli.tools,
+        [
+            "batch",
+            "test_find_application_with_mainflow",
+            str(manifest),
+            str(outputdir),
+            "--name",
+            "{data[val]}.sh",
+        ],
+    )
+    assert result.exit_code == 1
+    assert f"Row 3: Same file as row 1: {outputdir / '1.sh'}" in result.output
+    assert "Row 4: ValueError" in result.output
+    assert sorted(os.listdir(outputdir)) == ["1.sh", "2.sh"]
+    assert (outputdir / "1.sh").read_text() == "1"
+    assert not (tmp_path / "x.sh").exists()
+
+
+def test_web_questionnaire(monkeypatch):
+    monkeypatch.setenv("APP_SETTINGS", "jobbergate.config.TestingConfig")
+    client = create_app().test_client()
+    client.get("/")
+    client.post("/apps/", data={"application": "test_find_application_with_mainflow"})
+    url = "/app/test_find_application_with_mainflow"
+    assert client.get(url).status_code == 200
+    result = client.post(url, data={"val": "20", "template": "job_template.j2"})
+    assert result.data == b"20"
+    with client.session_transaction() as session:
+        assert "data" not in session
+        assert len(session["answers"]) == 32
+
+
+def test_web_graph_is_compiled_ahead(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_SETTINGS", "jobbergate.config.TestingConfig")
+    monkeypatch.setitem(jobbergateconfig, "graph", {"path": str(tmp_path)})
+    client = create_app().test_client()
+    client.get("/")
+    url = "/graph/test_find_application_with_mainflow"
+    assert client.get(url).status_code == 409
+    assert not os.listdir(tmp_path)
+    graph.build("test_find_application_with_mainflow")
+    assert "mainflow" in client.get(url).get_json()["nodes"]
+    assert client.get("/graph/no_such_application").status_code == 404
+
+
+def test_batch_submit(tmp_path, monkeypatch):
+    monkeypatch.setitem(
+        jobbergateconfig,
+        "submit",
+        {"backend": "local", "path": str(tmp_path / "jobs"), "backoff": 0},
+    )
+    manifest = tmp_path / "manifest.jsonl"
+    manifest.write_text('{"val": 3}\n')
+    runner = create_app().test_cli_runner()
+    result = runner.invoke(
+        cli.tools,
+        [
+            "batch",
+            "test_find_application_with_mainflow",
+            str(manifest),
+            str(tmp_path),
+            "--submit",
+        ],
+    )
+    assert result.exit_code == 0
+    assert "Row 1: submitted job" in result.output
+    assert [job.read_text() for job in (tmp_path / "jobs").iterdir()] == ["3"]
+
+
+def test_web_submit(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_SETTINGS", "jobbergate.config.TestingConfig")
+    app = create_app()
+    app.extensions["submitter"] = Submitter(LocalBackend(str(tmp_path)))
+    client = app.test_client()
+    client.get("/")
+    client.post("/apps/", data={"application": "test_find_application_with_mainflow"})
+    url = "/app/test_find_application_with_mainflow"
+    client.get(url)
+    result = client.post(url, data={"val": "20", "template": "job_template.j2"})
+    assert result.status_code == 202
+    submissionid = result.get_data(as_text=True).split("/submission/")[1][:16]
+    submission = app.extensions["submitter"].get(submissionid).wait()
+    status = client.get(f"/submission/{submissionid}").get_json()
+    assert status["jobid"] == submission.jobid
+    assert (tmp_path / f"{submission.jobid}.sh").read_text() == "20"
+    assert client.get(url.replace("/app/", "/script/")).data == b"20"
+
+
+def test_web_stream(monkeypatch):
+    monkeypatch.setenv("APP_SETTINGS", "jobbergate.config.TestingConfig")
+    monkeypatch.setitem(jobbergateconfig, "jinja", {"stream": True})
+    client = create_app().test_client()
+    client.get("/")
+    client.post("/apps/", data={"application": "test_find_application_with_mainflow"})
+    url = "/app/test_find_application_with_mainflow"
+    client.get(url)
+    result = client.post(url, data={"val": "20", "template": "job_template.j2"})
+    assert result.is_streamed
+    assert result.data == b"20"
+
+
+def test_cli_stream(monkeypatch):
+    monkeypatch.setitem(jobbergateconfig, "jinja", {"stream": True})
+    result = get_result(cli.cmds, "test_find_application_with_mainflow")
+    assert result.output == "10"
+
+
+def test_cli_app_without_web_extensions():
+    code = (
+        "import sys, jobbergate\n"
+        "runner = jobbergate.create_cli_app().test_cli_runner()\n"
+        "result = runner.invoke(args=['test_find_application_with_mainflow', '-'])\n"
+        "print(result.output)\n"
+        "print(sorted(set(jobbergate.extensions) & set(vars(jobbergate))))\n"
+        "print([name for name in sys.modules if name.startswith('flask_')])\n"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        stdout=subprocess.PIPE,
+        universal_newlines=True,
+        check=True,
+    )
+    assert result.stdout.splitlines() == ["10", "[]", "[]"]
+
+
+def multitemplate_app(tmp_path, monkeypatch):
+    appdir = tmp_path / "apps" / "steps"
+    (appdir / "templates").mkdir(parents=True)
+    (appdir / "views.py").write_text(
+        "from jobbergate import appform\n\n\n"
+        "def mainflow(data):\n"
+        "    return [appform.Integer('val', 'Value', default=1)]\n"
+    )
+    for step in ("prepare", "compute"):
+        (appdir / "templates" / f"{step}.j2").write_text(f"{step} {{{{ data.val }}}}")
+    monkeypatch.setitem(jobbergateconfig, "apps", {"path": str(tmp_path / "apps")})
+
+
+def test_render_templates(tmp_path, monkeypatch):
+    multitemplate_app(tmp_path, monkeypatch)
+    runner = create_app().test_cli_runner()
+    outputdir = tmp_path / "out"
+    result = runner.invoke(
+        cli.tools, ["render", "steps", str(outputdir), "-p", "val=3"]
+    )
+    assert result.exit_code == 0
+    assert (outputdir / "prepare.sh").read_text() == "prepare 3"
+    assert (outputdir / "compute.sh").read_text() == "compute 3"
+
+    result = runner.invoke(
+        cli.tools, ["render", "steps", str(outputdir), "-f", "-T", "missing.j2"]
+    )
+    assert result.exit_code == 2
+    assert "No template missing.j2 in steps" in result.output
+
+
+def test_web_archive(tmp_path, monkeypatch):
+    monkeypatch.setenv("APP_SETTINGS", "jobbergate.config.TestingConfig")
+    multitemplate_app(tmp_path, monkeypatch)
+    client = create_app().test_client()
+    client.get("/")
+    client.get("/app/steps")
+    result = client.post("/app/steps", data={"val": "4", "template": "*"})
+    assert result.mimetype == "application/zip"
+    with zipfile.ZipFile(io.BytesIO(result.data)) as archive:
+        assert sorted(archive.namelist()) == ["compute.sh", "prepare.sh"]
+        assert archive.read("compute.sh") == b"compute 4"
+
+    result = client.get("/archive/steps?template=prepare.j2")
+    with zipfile.ZipFile(io.BytesIO(result.data)) as archive:
+        assert archive.namelist() == ["prepare.sh"]
+    assert client.get("/archive/steps?template=missing.j2").status_code == 404
@@ -0,0 +1,108 @@
+import pytest
+
+from jobbergate import graph
+from jobbergate.lib import jobbergateconfig
+from jobbergate.registry import ApplicationRegistry
+
+VIEWS = """from jobbergate import appform
+
+
+def mainflow(data):
+    return [
+        appform.Text("name", "Name", default="job"),
+        appform.BooleanList(
+            "gpu",
+            "Use GPU",
+            default=False,
+            whentrue=[appform.Const("nextworkflow", default="gpu")],
+            whenfalse=[appform.Integer("cores", "Cores", default=4)],
+        ),
+    ]
+
+
+def gpu(data):
+    return [appform.Integer("gpus", "GPUs", default=1)]
+
+
+@appform.workflow(name="Debug run")
+def debug(data):
+    return [appform.Const("nextworkflow", default="missing")]
+
+
+def broken(data):
+    return [data["undefined"]]
+"""
+
+CONTROLLER = """from jobbergate import workflow
+
+
+@workflow.logic
+def post_mainflow(data):
+    if data["cores"] > 2:
+        return {"nextworkflow": "broken"}
+"""
+
+
+@pytest.fixture
+def application(tmp_path, monkeypatch):
+    appdir = tmp_path / "apps" / "app"
+    appdir.mkdir(parents=True)
+    (appdir / "views.py").write_text(VIEWS)
+    (appdir / "controller.py").write_text(CONTROLLER)
+    monkeypatch.setitem(jobbergateconfig, "apps", {"path": str(tmp_path / "apps")})
+    monkeypatch.setitem(jobbergateconfig, "graph", {"path": str(tmp_path / "graph")})
+    registry = ApplicationRegistry()
+    monkeypatch.setattr(graph, "registry", registry)
+    return registry.get("app")
+
+
+def test_compile_application(application):
+    compiled = graph.compile_application(application)
+    nodes = compiled["nodes"]
+    assert sorted(nodes) == ["Debug run", "broken", "gpu", "mainflow"]
+    assert nodes["mainflow"]["next"] == ["gpu", "broken", "Debug run"]
+    gpu = nodes["mainflow"]["questions"][1]
+    assert gpu["type"] == "BooleanList"
+    assert gpu["whenfalse"] == [
+        {
+            "type": "Integer",
+            "variablename": "cores",
+            "message": "Cores",
+            "default": 4,
+            "maxval": None,
+            "minval": None,
+        }
+    ]
+    assert compiled["errors"] == [
+        "broken: KeyError: 'undefined'",
+        "Debug run leads to missing workflow missing",
+    ]
+
+
+def test_compile_without_hooks(application):
+    compiled = graph.compile_application(application, run_hooks=False)
+    assert "broken" not in compiled["nodes"]
+
+
+def test_graph_kept_until_application_changes(application, tmp_path, mocker):
+    built = graph.build("app")
+    assert (tmp_path / "graph" / "app.json").exists()
+    compile_application = mocker.spy(graph, "compile_application")
+    assert graph.load("app") == built
+    assert compile_application.call_count == 0
+
+    (tmp_path / "apps" / "app" / "views.py").write_text(
+        VIEWS.replace('default="job"', 'default="other"')
+    )
+    assert graph.load("app")["nodes"]["mainflow"]["questions"][0]["default"] == "other"
+    assert compile_application.call_count == 1
+
+
+def test_kept_graph_is_not_compiled(application, tmp_path, mocker):
+    compile_application = mocker.spy(graph, "compile_application")
+    assert graph.kept("app") is None
+    built = graph.build("app")
+    assert graph.kept("app") == built
+    (tmp_path / "apps" / "app" / "views.py").write_text(VIEWS + "\n")
+    assert graph.kept("app") is None
+    assert compile_application.call_count == 1
@@ -0,0 +1,79 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from jobbergate import hooks
+
+
+def test_call_plain_function():
+    assert hooks.call(lambda data: {"val": data["val"] + 1}, {"val": 1}) == {"val": 2}
+
+
+def test_call_coroutine_function():
+    async def pre_(data):
+        await asyncio.sleep(0)
+        return {"val": data["val"] + 1}
+
+    assert hooks.call(pre_, {"val": 1}) == {"val": 2}
+
+
+def test_coroutines_run_concurrently():
+    async def pre_(data):
+        await asyncio.sleep(0.2)
+        return data
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(10) as executor:
+        results = list(executor.map(lambda val: hooks.call(pre_, val), range(10)))
+    assert results == list(range(10))
+    assert time.perf_counter() - started < 1
+
+
+def test_independent_hooks_run_in_parallel():
+    registered = {}
+
+    def slow(key, value):
+        def hook(data):
+            time.sleep(0.2)
+            return {key: value, "order": key}
+
+        return hook
+
+    hooks.register(registered, "", slow("groups", ["a"]), provides=["groups"])
+    hooks.register(registered, "", slow("quota", 10), provides=["quota"])
+
+    def accounts(data):
+        return {"accounts": len(data["groups"]) * data["quota"]}
+
+    hooks.register(
+        registered, "", accounts, requires=["groups", "quota"], provides=["accounts"]
+    )
+    hooklist = registered[""]
+    assert [len(step) for step in hooklist.steps()] == [2, 1]
+
+    started = time.perf_counter()
+    result = hooks.call(hooklist, {})
+    assert time.perf_counter() - started < 0.35
+    assert result == {"groups": ["a"], "quota": 10, "order": "quota", "accounts": 10}
+
+
+def test_undeclared_hooks_run_alone():
+    registered = {}
+    hooks.register(registered, "", lambda data: {"a": 1}, provides=["a"])
+    hooks.register(registered, "", lambda data: None)
+    assert [len(step) for step in registered[""].steps()] == [1, 1]
+
+
+def test_cycle():
+    def first(data):
+        pass
+
+    def second(data):
+        pass
+
+    registered = {}
+    hooks.register(registered, "", first, requires=["b"], provides=["a"])
+    with pytest.raises(ValueError):
+        hooks.register(registered, "", second, requires=["a"], provides=["b"])
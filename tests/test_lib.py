@@ -0,0 +1,37 @@
+import copy
+import json
+import os
+import pickle
+
+import pytest
+
+from jobbergate.lib import ConfigCache, freeze
+
+
+def test_freeze():
+    frozen = freeze({"slurm": {"partitions": ["a", "b"]}})
+    assert frozen["slurm"]["partitions"] == ["a", "b"]
+    with pytest.raises(TypeError):
+        frozen["slurm"]["default"] = "a"
+    with pytest.raises(TypeError):
+        frozen["slurm"]["partitions"].append("c")
+    assert json.dumps(frozen) == '{"slurm": {"partitions": ["a", "b"]}}'
+    for copied in (copy.deepcopy(frozen), pickle.loads(pickle.dumps(frozen))):
+        copied["slurm"]["partitions"].append("c")
+        assert copied == {"slurm": {"partitions": ["a", "b", "c"]}}
+    assert frozen == {"slurm": {"partitions": ["a", "b"]}}
+
+
+def test_config_cache(tmp_path):
+    configfile = tmp_path / "config.yaml"
+    configfile.write_text("partitions:\n  - a\n")
+    cache = ConfigCache()
+    first = cache.get(str(configfile))
+    assert cache.get(str(configfile)) is first
+    assert cache.parses == 1
+    configfile.write_text("partitions:\n  - b\n")
+    os.utime(configfile, ns=(0, 0))
+    assert cache.get(str(configfile))["partitions"] == ["b"]
+    assert cache.parses == 2
+    configfile.unlink()
+    assert cache.get(str(configfile), {}) == {}
@@ -0,0 +1,107 @@
+import os
+import time
+
+import pytest
+
+from jobbergate import hooks, memoize
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, monkeypatch, tmp_path):
+    if request.param == "memory":
+        backend = memoize.MemoryBackend()
+    else:
+        backend = memoize.SQLiteBackend(str(tmp_path / "memoize.sqlite"))
+    monkeypatch.setattr(memoize, "_backend", backend)
+    return backend
+
+
+def counting(result):
+    calls = []
+
+    def pre_(data):
+        calls.append(data)
+        return result
+
+    return pre_, calls
+
+
+def test_results_are_remembered(backend):
+    pre_, calls = counting({"partitions": ["debug", "long"]})
+    memoized = memoize.memoize(pre_, 60, application="app")
+    assert memoized({}) == {"partitions": ["debug", "long"]}
+    assert memoized({}) == {"partitions": ["debug", "long"]}
+    assert len(calls) == 1
+
+
+def test_results_expire(backend):
+    pre_, calls = counting({"val": 1})
+    memoized = memoize.memoize(pre_, 0.1, application="app")
+    memoized({})
+    time.sleep(0.2)
+    memoized({})
+    assert len(calls) == 2
+
+
+def test_results_depend_on_key(backend):
+    def pre_(data):
+        return {"accounts": [data["username"]]}
+
+    memoized = memoize.memoize(pre_, 60, ["username"], "app")
+    assert memoized({"username": "a", "other": 1}) == {"accounts": ["a"]}
+    assert memoized({"username": "b", "other": 1}) == {"accounts": ["b"]}
+    assert memoized({"username": "a", "other": 2}) == {"accounts": ["a"]}
+
+
+def test_invalidate(backend):
+    pre_, calls = counting({"val": 1})
+    post_, postcalls = counting({"val": 2})
+    memoized = memoize.memoize(pre_, 60, application="app")
+    other = memoize.memoize(post_, 60, application="other")
+    memoized({})
+    other({})
+
+    memoize.invalidate("app", "pre_")
+    memoized({})
+    other({})
+    assert (len(calls), len(postcalls)) == (2, 1)
+
+    memoized.invalidate()
+    memoized({})
+    assert len(calls) == 3
+
+    memoize.invalidate()
+    memoized({})
+    other({})
+    assert (len(calls), len(postcalls)) == (4, 2)
+
+
+def test_coroutine_functions(backend):
+    calls = []
+
+    async def pre_(data):
+        calls.append(data)
+        return {"val": 1}
+
+    memoized = memoize.memoize(pre_, 60, application="app")
+    assert hooks.call(memoized, {}) == {"val": 1}
+    assert hooks.call(memoized, {}) == {"val": 1}
+    assert len(calls) == 1
+
+
+def test_from_config(tmp_path):
+    assert isinstance(memoize.from_config({}), memoize.MemoryBackend)
+    backend = memoize.from_config(
+        {"memoize": {"backend": "sqlite", "path": str(tmp_path / "m.sqlite")}}
+    )
+    assert isinstance(backend, memoize.SQLiteBackend)
+    with pytest.raises(ValueError):
+        memoize.from_config({"memoize": {"backend": "redis"}})
+
+
+def test_sqlite_default_path_is_private(tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path))
+    backend = memoize.SQLiteBackend()
+    assert backend.path == str(tmp_path / "jobbergate" / "memoize" / "memoize.sqlite")
+    assert os.stat(backend.path).st_mode & 0o777 == 0o600
+    assert os.stat(os.path.dirname(backend.path)).st_mode & 0o777 == 0o700
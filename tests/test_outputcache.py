@@ -0,0 +1,94 @@
+import pytest
+
+from jobbergate import outputcache, render
+from jobbergate.lib import jobbergateconfig
+from jobbergate.registry import ApplicationRegistry
+
+CONTROLLER = """from jobbergate import workflow
+
+
+@workflow.logic(deterministic={deterministic})
+def post_(data):
+    return {{"jobname": "job"}}
+"""
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setitem(
+        jobbergateconfig, "render_cache", {"path": str(tmp_path / "cache")}
+    )
+    monkeypatch.setattr(outputcache, "_cache", None)
+    return outputcache.get_cache()
+
+
+def application(tmp_path, deterministic=True):
+    appdir = tmp_path / "apps" / "app"
+    (appdir / "templates").mkdir(parents=True, exist_ok=True)
+    (appdir / "views.py").write_text("def mainflow(data):\n    return []\n")
+    (appdir / "controller.py").write_text(
+        CONTROLLER.format(deterministic=deterministic)
+    )
+    (appdir / "templates" / "job_template.j2").write_text("{{ data.val }}")
+    loaded = ApplicationRegistry(str(tmp_path / "apps")).get("app")
+    template = render.get_template(str(appdir / "templates"), "job_template.j2")
+    return loaded, template
+
+
+def test_canonical():
+    assert outputcache.canonical({"a": [1, (2,)], "b": {3}}) == {
+        "a": [0, 1, [1, 2]],
+        "b": [2, "3"],
+    }
+    values = [1, 1.0, True, [1], (1,), {1}, "1"]
+    assert len({repr(outputcache.canonical(value)) for value in values}) == 7
+    with pytest.raises(TypeError):
+        outputcache.canonical({1: "a"})
+    with pytest.raises(TypeError):
+        outputcache.canonical({"a": object()})
+
+
+def test_rendered_from_cache(cache, tmp_path, mocker):
+    loaded, template = application(tmp_path)
+    assert outputcache.rendered(loaded, template, {"val": 1}) == "1"
+    rendering = mocker.spy(render, "render")
+    assert outputcache.rendered(loaded, template, {"val": 1}) == "1"
+    assert rendering.call_count == 0
+    assert outputcache.rendered(loaded, template, {"val": 1.0}) == "1.0"
+    assert rendering.call_count == 1
+
+    # A changed template renders again
+    (tmp_path / "apps" / "app" / "templates" / "job_template.j2").write_text(
+        "val={{ data.val }}"
+    )
+    template = render.get_template(
+        str(tmp_path / "apps" / "app" / "templates"), "job_template.j2"
+    )
+    assert outputcache.rendered(loaded, template, {"val": 1}) == "val=1"
+
+
+def test_not_deterministic(cache, tmp_path, mocker):
+    loaded, template = application(tmp_path, deterministic=False)
+    assert not loaded.deterministic
+    rendering = mocker.spy(render, "render")
+    outputcache.rendered(loaded, template, {"val": 1})
+    outputcache.rendered(loaded, template, {"val": 1})
+    assert rendering.call_count == 2
+    assert list((tmp_path / "cache").iterdir()) == []
+
+
+def test_least_recently_used_evicted(tmp_path):
+    cache = outputcache.OutputCache(str(tmp_path), maxsize=25)
+    cache.set("a", "a" * 10)
+    cache.set("b", "b" * 10)
+    assert cache.get("a") == "a" * 10
+    cache.set("c", "c" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" * 10
+    assert cache.get("c") == "c" * 10
+
+
+def test_not_configured(monkeypatch):
+    monkeypatch.setattr(outputcache, "_cache", None)
+    monkeypatch.setitem(jobbergateconfig, "render_cache", None)
+    assert outputcache.get_cache() is None
@@ -0,0 +1,36 @@
+import pytest
+
+from jobbergate import profiling
+
+
+@pytest.fixture
+def recording():
+    # Every test starts without a recorder, and leaves none behind
+    token = profiling._recorder.set(None)
+    yield
+    profiling._recorder.reset(token)
+
+
+def test_phases_are_recorded(recording):
+    with profiling.phase("render"):
+        pass
+    recorder = profiling.start("myapp")
+    with profiling.phase("pre"):
+        pass
+    with profiling.phase("pre"):
+        pass
+    assert list(recorder.totals()) == ["pre"]
+    assert len(recorder.timings) == 2
+    assert profiling.server_timing(recorder).startswith("pre;dur=")
+    assert 'jobbergate_phase_seconds_count{application="myapp",phase="pre"} 2' in (
+        profiling.metrics()
+    )
+
+
+def test_application_label():
+    assert profiling.application_label("test_find_application_with_mainflow") == (
+        "test_find_application_with_mainflow"
+    )
+    assert profiling.application_label("no_such_application") == "unknown"
+    assert profiling.application_label("..") == "unknown"
+    assert profiling.application_label("") == ""
@@ -0,0 +1,98 @@
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from jobbergate.registry import ApplicationRegistry
+
+VIEWS = """from jobbergate import appform
+
+
+def mainflow(data):
+    return [appform.Text("name", "Name")]
+
+
+@appform.workflow
+def debug(data):
+    return [appform.Confirm("debug", "Debug?")]
+"""
+
+CONTROLLER = """from jobbergate import workflow
+
+
+@workflow.logic
+def pre_(data):
+    return {"pre": True}
+"""
+
+
+@pytest.fixture
+def appdir(tmp_path):
+    (tmp_path / "app").mkdir()
+    (tmp_path / "app" / "views.py").write_text(VIEWS)
+    (tmp_path / "app" / "controller.py").write_text(CONTROLLER)
+    (tmp_path / "noview").mkdir()
+    return tmp_path
+
+
+def test_registry_caches(appdir):
+    registry = ApplicationRegistry(str(appdir))
+    first = registry.get("app")
+    assert registry.get("app") is first
+    assert registry.stats() == {"hits": 1, "misses": 1, "reloads": 0, "loaded": 1}
+    assert list(first.workflows) == ["debug"]
+    assert first.prefuncs[""]({}) == {"pre": True}
+
+
+def test_registry_reloads_on_change(appdir):
+    registry = ApplicationRegistry(str(appdir))
+    first = registry.get("app")
+    views = appdir / "app" / "views.py"
+    views.write_text(VIEWS + "\n\nEXTRA = 1\n")
+    os.utime(views, ns=(0, 0))
+    second = registry.get("app")
+    assert second is not first
+    assert second.views.EXTRA == 1
+    assert registry.reloads == 1
+
+
+def test_registry_no_views(appdir):
+    registry = ApplicationRegistry(str(appdir))
+    with pytest.raises(ModuleNotFoundError):
+        registry.get("noview")
+
+
+def test_registrations_are_per_application(appdir):
+    (appdir / "other").mkdir()
+    (appdir / "other" / "views.py").write_text(
+        VIEWS.replace("def debug", "def release")
+    )
+    registry = ApplicationRegistry(str(appdir))
+    with ThreadPoolExecutor() as executor:
+        app, other = executor.map(registry.get, ["app", "other"])
+    assert list(app.workflows) == ["debug"]
+    assert list(other.workflows) == ["release"]
+    assert other.prefuncs == {}
+    with pytest.raises(TypeError):
+        app.workflows["release"] = None
+
+
+def test_helpers_per_application(tmp_path):
+    for name in ("first", "second"):
+        (tmp_path / name).mkdir()
+        (tmp_path / name / "helpers.py").write_text(f"NAME = {name!r}\n")
+        (tmp_path / name / "views.py").write_text(
+            "import helpers\n\n\ndef mainflow(data):\n    return []\n"
+        )
+    registry = ApplicationRegistry(str(tmp_path))
+    assert registry.get("first").views.helpers.NAME == "first"
+    assert registry.get("second").views.helpers.NAME == "second"
+    assert "helpers" not in sys.modules
+
+    # Changed helpers reload the application
+    helpers = tmp_path / "first" / "helpers.py"
+    helpers.write_text("NAME = 'changed'\n")
+    os.utime(helpers, ns=(0, 0))
+    assert registry.get("first").views.helpers.NAME == "changed"
+    assert registry.reloads == 1
@@ -0,0 +1,109 @@
+import pytest
+from jinja2 import TemplateNotFound
+
+from jobbergate import render
+from jobbergate.lib import jobbergateconfig
+
+
+def test_environment_is_shared(tmp_path):
+    (tmp_path / "job_template.j2").write_text("{{ data.val }}")
+    environment = render.get_environment(str(tmp_path))
+    assert render.get_environment(f"{tmp_path}/") is environment
+    template = render.get_template(str(tmp_path), "job_template.j2")
+    assert template.render(data={"val": 10}) == "10"
+    assert render.get_template(str(tmp_path), "job_template.j2") is template
+
+
+def test_bytecode_cache(tmp_path, monkeypatch):
+    cachedir = tmp_path / "cache"
+    monkeypatch.setitem(jobbergateconfig, "jinja", {"bytecode_cache": str(cachedir)})
+    (tmp_path / "job_template.j2").write_text("{{ data.val }}")
+    environment = render.Environment(
+        loader=render.FileSystemLoader(str(tmp_path)),
+        bytecode_cache=render.bytecode_cache(),
+    )
+    environment.get_template("job_template.j2")
+    assert len(list(cachedir.iterdir())) == 1
+
+
+TEMPLATE = """{% set n = data.a %}
+{% block a %}{{ data.a }}{% for x in data["items"] %}{{ x }}{% endfor %}{% endblock %}
+{% block b %}{{ data.b | upper }}{% block c %}{{ data.c }}{% endblock %}{% endblock %}
+{% block n %}{{ n }}{% endblock %}
+{% block scoped scoped %}{{ data.a }}{% endblock %}"""
+
+
+def test_block_dependencies(tmp_path):
+    (tmp_path / "job_template.j2").write_text(TEMPLATE)
+    template = render.get_template(str(tmp_path), "job_template.j2")
+    assert render.block_dependencies(template) == {
+        "a": {"a", "items"},
+        "b": {"b", "c"},
+        "c": {"c"},
+        "n": None,
+    }
+
+
+def test_incremental_render(tmp_path, monkeypatch):
+    monkeypatch.setitem(jobbergateconfig, "jinja", {"incremental": True})
+    (tmp_path / "job_template.j2").write_text(TEMPLATE)
+    template = render.get_template(str(tmp_path), "job_template.j2")
+    data = {"a": 1, "items": [2, 3], "b": "b", "c": 4}
+    assert render.render(template, data) == template.render(data=data)
+    hits = render.blockcache.hits
+    data["b"] = "changed"
+    assert render.render(template, data) == template.render(data=data)
+    # a and c are reused, b and n are rendered again
+    assert render.blockcache.hits == hits + 2
+
+
+def test_generate(tmp_path):
+    (tmp_path / "job_template.j2").write_text(
+        "{% for i in range(data.n) %}{{ i }}\n{% endfor %}"
+    )
+    template = render.get_template(str(tmp_path), "job_template.j2")
+    chunks = list(render.generate(template, {"n": 1000}, size=100))
+    assert "".join(chunks) == render.render(template, {"n": 1000})
+    assert all(len(chunk) >= 100 for chunk in chunks[:-1])
+    assert len(chunks) > 1
+
+
+def test_templates_cached_until_directory_changes(tmp_path, monkeypatch, mocker):
+    monkeypatch.setitem(jobbergateconfig, "apps", {"path": str(tmp_path)})
+    templates = tmp_path / "app" / "templates"
+    templates.mkdir(parents=True)
+    (templates / "single.j2").write_text("")
+    assert render.templates("app") == ("single.j2",)
+    assert render.default_template("app", {}) == "single.j2"
+
+    listing = mocker.spy(render, "read_templates")
+    render.templates("app")
+    assert listing.call_count == 0
+
+    (templates / "job_template.j2").write_text("")
+    assert render.templates("app") == ("job_template.j2", "single.j2")
+    assert render.default_template("app", {}) == "job_template.j2"
+    assert render.default_template("app", {"default_template": "x.j2"}) == "x.j2"
+    assert render.templates("missing") == ()
+
+
+def test_render_many(tmp_path, monkeypatch):
+    monkeypatch.setitem(jobbergateconfig, "apps", {"path": str(tmp_path)})
+    templates = tmp_path / "app" / "templates"
+    templates.mkdir(parents=True)
+    for step in ("prepare", "compute", "postprocess"):
+        (templates / f"{step}.j2").write_text(f"{step} {{{{ data.val }}}}")
+    assert render.render_many("app", {"val": 1}) == {
+        "compute.j2": "compute 1",
+        "postprocess.j2": "postprocess 1",
+        "prepare.j2": "prepare 1",
+    }
+    outputs = render.render_many("app", {"val": 2}, ["prepare.j2", "compute.j2"])
+    assert list(outputs.items()) == [
+        ("prepare.j2", "prepare 2"),
+        ("compute.j2", "compute 2"),
+    ]
+    with pytest.raises(TemplateNotFound):
+        render.render_many("app", {}, ["prepare.j2", "missing.j2"])
+    assert render.output_name("prepare.j2") == "prepare.sh"
+    assert render.output_name("prepare.py.j2") == "prepare.py"
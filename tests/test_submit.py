@@ -0,0 +1,100 @@
+import threading
+
+import pytest
+
+from jobbergate.submit import (
+    LocalBackend,
+    QueueFull,
+    SubmitError,
+    Submitter,
+    from_config,
+)
+
+
+class FlakyBackend:
+    def __init__(self, failures):
+        self.failures = failures
+
+    def submit(self, script):
+        if self.failures:
+            self.failures -= 1
+            raise SubmitError("Socket timed out")
+        return "42"
+
+
+def test_local_backend(tmp_path):
+    submitter = Submitter(LocalBackend(str(tmp_path)))
+    submission = submitter.submit("echo hello", "app").wait()
+    assert submission.state == "submitted"
+    assert (tmp_path / f"{submission.jobid}.sh").read_text() == "echo hello"
+    assert submitter.get(submission.id) is submission
+
+
+def test_retries(tmp_path):
+    log = tmp_path / "jobs.jsonl"
+    submitter = Submitter(FlakyBackend(2), retries=2, backoff=0, log=str(log))
+    submission = submitter.submit("echo hello").wait()
+    assert (submission.state, submission.jobid, submission.attempts) == (
+        "submitted",
+        "42",
+        3,
+    )
+    assert '"jobid": "42"' in log.read_text()
+
+    submission = Submitter(FlakyBackend(2), retries=1, backoff=0).submit("").wait()
+    assert submission.state == "failed"
+    assert submission.error == "Socket timed out"
+
+
+def test_queue_is_bounded():
+    release = threading.Event()
+
+    class BlockingBackend:
+        def submit(self, script):
+            release.wait()
+            return "1"
+
+    submitter = Submitter(BlockingBackend(), workers=1, queue=1)
+    first = submitter.submit("")
+    submitter.submit("")
+    with pytest.raises(QueueFull):
+        submitter.submit("")
+    release.set()
+    assert first.wait().state == "submitted"
+
+
+def test_submit_blocks_until_queued():
+    release = threading.Event()
+
+    class BlockingBackend:
+        def submit(self, script):
+            release.wait()
+            return "1"
+
+    submitter = Submitter(BlockingBackend(), workers=1, queue=0)
+    submitter.submit("")
+    threading.Timer(0.1, release.set).start()
+    assert submitter.submit("", block=True).wait().state == "submitted"
+
+
+def test_unexpected_errors_fail():
+    class BrokenBackend:
+        def submit(self, script):
+            raise KeyError("jobid")
+
+    submitter = Submitter(BrokenBackend(), workers=1, queue=0)
+    submission = submitter.submit("").wait()
+    assert (submission.state, submission.attempts) == ("failed", 1)
+    assert submission.error == "KeyError: 'jobid'"
+    # The worker slot is free again
+    assert submitter.submit("").wait().state == "failed"
+
+
+def test_from_config(tmp_path):
+    assert from_config({}) is None
+    submitter = from_config(
+        {"submit": {"backend": "local", "path": str(tmp_path), "workers": 2}}
+    )
+    assert submitter.backend.path == str(tmp_path)
+    with pytest.raises(ValueError):
+        from_config({"submit": {"backend": "pbs"}})
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+
+from jobbergate import cli, create_app, graph, validate
+from jobbergate.lib import jobbergateconfig
+from jobbergate.registry import ApplicationRegistry
+
+VIEWS = """from jobbergate import appform
+
+
+def mainflow(data):
+    return [
+        appform.Text("name", "Name"),
+        appform.Integer("cores", "Cores", minval=1, maxval=64, default=4),
+        appform.List("partition", "Partition", ["cpu", "gpu"], default="cpu"),
+        appform.Checkbox("modules", "Modules", ["gcc", "mpi"], default=[]),
+        appform.BooleanList(
+            "input",
+            "Read input",
+            default=False,
+            whentrue=[appform.File("inputfile", "Input", exists=True)],
+            whenfalse=[appform.Const("nextworkflow", default="generate")],
+        ),
+    ]
+
+
+def generate(data):
+    return [appform.Directory("outdir", "Output", exists=True)]
+"""
+
+
+@pytest.fixture
+def application(tmp_path, monkeypatch):
+    appdir = tmp_path / "apps" / "app"
+    appdir.mkdir(parents=True)
+    (appdir / "views.py").write_text(VIEWS)
+    monkeypatch.setitem(jobbergateconfig, "apps", {"path": str(tmp_path / "apps")})
+    monkeypatch.setitem(jobbergateconfig, "graph", {"path": str(tmp_path / "graph")})
+    registry = ApplicationRegistry()
+    monkeypatch.setattr(graph, "registry", registry)
+    monkeypatch.setattr(validate, "registry", registry)
+    (tmp_path / "input.txt").write_text("")
+    return "app"
+
+
+def test_validate(application, tmp_path, mocker):
+    checks = validate.validator(application)
+    inputfile = str(tmp_path / "input.txt")
+    results = checks.validate_many(
+        [
+            {"name": "a", "outdir": str(tmp_path)},
+            {"name": "b", "input": True, "inputfile": inputfile},
+            {"cores": 128, "partition": "gpu2", "modules": ["gcc", "x"]},
+            {"name": "d", "cores": "x", "input": "yes"},
+            {"name": "e", "input": True, "inputfile": str(tmp_path)},
+            {"name": "f", "outdir": str(tmp_path / "missing")},
+        ]
+    )
+    assert results == [
+        [],
+        [],
+        [
+            "name: missing",
+            "cores: 128 is more than 64",
+            "partition: 'gpu2' is not one of 'cpu', 'gpu'",
+            "modules: 'x' not in 'gcc', 'mpi'",
+            "outdir: missing",
+        ],
+        ["cores: 'x' is not an integer", "input: 'yes' is not true or false"],
+        [f"inputfile: {str(tmp_path)!r} is not an existing file"],
+        [f"outdir: {str(tmp_path / 'missing')!r} is not an existing directory"],
+    ]
+
+    # Paths are looked up once
+    stat = mocker.spy(validate.os, "stat")
+    checks.validate_many([{"name": "g", "outdir": str(tmp_path)}] * 100)
+    assert stat.call_count == 0
+
+
+def test_validate_command(application, tmp_path):
+    manifest = tmp_path / "sweep.jsonl"
+    manifest.write_text('{"name": "a"}\n{"cores": 0}\n')
+    answerfile = tmp_path / "answers.json"
+    answerfile.write_text(json.dumps({"name": "b"}))
+    runner = create_app().test_cli_runner()
+    result = runner.invoke(
+        cli.tools,
+        [
+            "validate",
+            application,
+            str(manifest),
+            str(answerfile),
+            "-p",
+            f"outdir={tmp_path}",
+        ],
+    )
+    assert result.exit_code == 1
+    assert result.output.splitlines() == [
+        f"{manifest}:2: name: missing",
+        f"{manifest}:2: cores: 0 is less than 1",
+        "Checked 3 answer sets, 1 with errors",
+    ]
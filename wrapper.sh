@@ -10,4 +10,13 @@ wrappername=$(basename $0)
 # Remove .sh at the end if it exists, otherwise do notihing
 applicationname=${wrappername%%.sh}
 
-flask $applicationname $@
+# Only the cli, without the web extensions
+export FLASK_APP="jobbergate:create_cli_app"
+
+# Run in the warm process of `flask jobbergate daemon` if it is running
+socket=${JOBBERGATE_SOCKET:-${XDG_RUNTIME_DIR:-${TMPDIR:-/tmp}}/jobbergate-$(id -u).sock}
+if [ -S "$socket" ]; then
+    exec python3 -m jobbergate.client "$applicationname" "$@"
+fi
+
+flask "$applicationname" "$@"